@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# coding: UTF-8
+
+"""
+Compare the batch placement (greedy placement improved by local search) with the greedy interference-aware placement.
+
+A burst of jobs with random workloads from the solorun profiles is placed on nodes which already host some workloads.
+Both methods respect the same capacity (`--max-workloads`). For each method, the total predicted slowdown of all
+co-located pairs after the placement and the time to place the burst are reported, over several seeds.
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Callable, List, Tuple
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from libs.jobs import Job  # noqa: E402
+from libs.node import Node  # noqa: E402
+from libs.node_index import NodeIndex  # noqa: E402
+from libs.placement import BatchPlacement, InterferenceAwarePlacement, InterferencePredictor  # noqa: E402
+from libs.placement import PlacementPolicy  # noqa: E402
+from libs.solorun_data.datas import data_map  # noqa: E402
+
+
+def total_slowdown(predictor: InterferencePredictor, nodes: List[Node]) -> float:
+    """ sum of the predicted slowdowns over every ordered pair of co-located workloads """
+    slowdown = predictor.slowdown_matrix
+    total = 0.0
+    for node in nodes:
+        residents = predictor.resident_counts(node)
+        total += residents @ slowdown @ residents - residents @ np.diag(slowdown)
+    return float(total)
+
+
+def run(num_nodes: int, num_jobs: int, max_workloads: int, factory: Callable, seed: int) \
+        -> Tuple[float, float, int]:
+    rng = random.Random(seed)
+    names = sorted(data_map) + ['unprofiled']
+
+    node_index = NodeIndex()
+    predictor = InterferencePredictor(data_map)
+    policy: PlacementPolicy = factory(node_index, predictor, max_workloads)
+
+    nodes = [Node(f'10.0.{idx // 256}.{idx % 256}', '10010', 'gpu_node') for idx in range(num_nodes)]
+    for node in nodes:
+        node.aggr_contention = 0.0
+        node_index.update(node)
+        for _ in range(rng.randrange(max_workloads // 2 + 1)):
+            predictor.add_resident(node, rng.choice(names))
+
+    jobs = [Job(rng.choice(names), 'bg', 'gpu', 'throughput') for _ in range(num_jobs)]
+
+    start = time.perf_counter()
+    placements = policy.select_nodes(jobs)
+    elapsed = time.perf_counter() - start
+
+    return total_slowdown(predictor, nodes), elapsed, len(placements)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Compare batch and greedy placement.')
+    parser.add_argument('-n', '--nodes', type=int, nargs='+', default=[10, 50, 200])
+    parser.add_argument('-j', '--jobs-per-node', type=float, default=1.5, help='burst size relative to the nodes')
+    parser.add_argument('-w', '--max-workloads', type=int, default=4, help='workloads a node can host')
+    parser.add_argument('-s', '--seeds', type=int, nargs='+', default=[0, 1, 2, 3, 4])
+    parser.add_argument('--max-solve-time', type=float, default=20.0, help='in milliseconds')
+    args = parser.parse_args()
+
+    methods = (
+        ('greedy', lambda index, predictor, max_wls: InterferenceAwarePlacement(index, predictor, max_wls)),
+        ('batch', lambda index, predictor, max_wls: BatchPlacement(index, predictor, max_wls,
+                                                                   args.max_solve_time / 1000)),
+    )
+
+    print(f'{"nodes":>6} {"jobs":>6} {"seed":>5} {"method":>8} {"placed":>7} {"total slowdown":>15} '
+          f'{"solve time(ms)":>15}')
+    for num_nodes in args.nodes:
+        num_jobs = int(num_nodes * args.jobs_per_node)
+        for seed in args.seeds:
+            for name, factory in methods:
+                slowdown, elapsed, placed = run(num_nodes, num_jobs, args.max_workloads, factory, seed)
+                print(f'{num_nodes:>6} {num_jobs:>6} {seed:>5} {name:>8} {placed:>7} {slowdown:>15.2f} '
+                      f'{elapsed * 1e3:>15.2f}')
+
+
+if __name__ == '__main__':
+    main()
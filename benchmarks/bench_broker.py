@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# coding: UTF-8
+
+"""
+Throughput of the in-process broker, alone and driving the job submission path of the scheduler.
+
+`raw`: producer threads publish small messages which a consumer thread acknowledges one by one.
+`submission`: a producer publishes jobs (CSV messages or binary frames) which the polling thread of the scheduler
+consumes into the pending job queue, without RabbitMQ.
+`tracking`: the nodes report themselves and publish metric messages which the node tracker consumes.
+A batch size of 1 hands every message over and acknowledges it on its own.
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+from threading import Event, Thread
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from libs.broker import BrokerChannel, InProcBroker  # noqa: E402
+from libs.jobs import Job  # noqa: E402
+from libs.metric_container.basic_metric import BasicMetric  # noqa: E402
+from libs.wire import TrackingReport, encode_jobs, encode_metrics, encode_tracking, job_to_csv  # noqa: E402
+from node_tracker import NodeTracker  # noqa: E402
+from pending_job_queue import PendingJobQueue  # noqa: E402
+from polling_thread import PollingThread  # noqa: E402
+
+
+def bench_raw(num_messages: int, num_producers: int, prefetch_count: int) -> float:
+    broker = InProcBroker()
+    per_producer = num_messages // num_producers
+    total = per_producer * num_producers
+    done = Event()
+    consumed = 0
+
+    def on_message(ch: BrokerChannel, delivery_tag: int, _: bytes) -> None:
+        nonlocal consumed
+        ch.basic_ack(delivery_tag)
+        consumed += 1
+        if consumed == total:
+            ch.stop_consuming()
+
+    def consume() -> None:
+        channel = broker.channel()
+        channel.queue_declare('bench')
+        channel.basic_qos(prefetch_count)
+        channel.basic_consume('bench', on_message)
+        ready.set()
+        channel.start_consuming()
+        done.set()
+
+    def produce() -> None:
+        channel = broker.channel()
+        body = b'x' * 64
+        for _ in range(per_producer):
+            channel.basic_publish('bench', body)
+
+    ready = Event()
+    consumer = Thread(target=consume, daemon=True)
+    consumer.start()
+    ready.wait()
+
+    start = time.perf_counter()
+    producers = [Thread(target=produce) for _ in range(num_producers)]
+    for producer in producers:
+        producer.start()
+    for producer in producers:
+        producer.join()
+    done.wait()
+    return total / (time.perf_counter() - start)
+
+
+def bench_submission(num_jobs: int, batch_size: int, delivery_batch_size: int) -> float:
+    broker = InProcBroker()
+    pending_jobs = PendingJobQueue()
+    polling_thread = PollingThread(50, pending_jobs, None, (num_jobs + 1, num_jobs), 0, broker=broker,
+                                   delivery_batch=(delivery_batch_size, 0.005))
+    polling_thread.start()
+
+    jobs = [Job(f'SparkWorkload{idx % 20}', 'bg', 'cpu', ('latency', 'throughput')[idx % 2])
+            for idx in range(num_jobs)]
+    if batch_size > 1:
+        bodies = [encode_jobs(jobs[idx:idx + batch_size]) for idx in range(0, num_jobs, batch_size)]
+    else:
+        bodies = [job_to_csv(job).encode() for job in jobs]
+
+    channel = broker.channel()
+    channel.queue_declare('job_submission')
+    start = time.perf_counter()
+    for body in bodies:
+        channel.basic_publish('job_submission', body)
+    while len(pending_jobs) < num_jobs:
+        time.sleep(0.0005)
+    return num_jobs / (time.perf_counter() - start)
+
+
+def bench_tracking(num_messages: int, delivery_batch_size: int) -> float:
+    broker = InProcBroker()
+    tracker = NodeTracker(50, broker=broker, prefetch_count=0, delivery_batch=(delivery_batch_size, 0.01))
+    tracker.start()
+
+    channel = broker.channel()
+    channel.queue_declare('tracking_nodes')
+    nodes = [('147.46.242.201', 'gpu'), ('147.46.242.243', 'gpu'), ('147.46.242.219', 'cpu'),
+             ('147.46.242.206', 'cpu')]
+    channel.basic_publish('tracking_nodes', encode_tracking(TrackingReport(ip_addr, 1.0, 1, 1, 0, node_type)
+                                                            for ip_addr, node_type in nodes))
+    node_queues = [f'{node_type}_node_({ip_addr})' for ip_addr, node_type in nodes]
+    while any(broker.find(queue) is None for queue in node_queues):
+        time.sleep(0.001)
+
+    body = encode_metrics([BasicMetric(10 ** 7, 10 ** 6, 10 ** 8, 10 ** 8, 0, 0, 0, 0, 200)])
+    last_body = encode_metrics([BasicMetric(10 ** 7, 10 ** 6, 10 ** 8, 10 ** 8, 0, 0, 0, 0, 999)])
+    per_node = num_messages // len(nodes)
+    start = time.perf_counter()
+    for _ in range(per_node - 1):
+        for queue in node_queues:
+            channel.basic_publish(queue, body)
+    for queue in node_queues:
+        channel.basic_publish(queue, last_body)
+
+    cluster_nodes = tracker.cluster_nodes.values()
+    while not all(node.metrics and node.metrics[0].interval == 999 for node in cluster_nodes):
+        time.sleep(0.0005)
+    return per_node * len(nodes) / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Throughput of the in-process broker.')
+    parser.add_argument('-n', '--messages', type=int, default=1000000)
+    parser.add_argument('-p', '--producers', type=int, nargs='+', default=[1, 4])
+    parser.add_argument('--prefetch-count', type=int, default=0)
+    parser.add_argument('-j', '--jobs', type=int, default=100000)
+    parser.add_argument('-b', '--batch-size', type=int, default=64, help='jobs per binary frame')
+    parser.add_argument('-d', '--delivery-batch-size', type=int, default=64,
+                        help='messages handed over to the consumers at once')
+    parser.add_argument('-m', '--metrics', type=int, default=200000)
+    args = parser.parse_args()
+
+    print(f'{"case":>28} {"msg/s":>12}')
+    for num_producers in args.producers:
+        rate = bench_raw(args.messages, num_producers, args.prefetch_count)
+        print(f'{f"raw ({num_producers} producers)":>28} {rate:>12,.0f}')
+
+    # the polling thread and the node tracker are singletons, so a single case of each runs per process
+    rate = bench_submission(args.jobs, args.batch_size, args.delivery_batch_size)
+    fmt = f'binary x{args.batch_size}' if args.batch_size > 1 else 'csv'
+    print(f'{f"submission ({fmt}, jobs/s)":>28} {rate:>12,.0f}')
+    rate = bench_tracking(args.metrics, args.delivery_batch_size)
+    print(f'{f"tracking (batch {args.delivery_batch_size})":>28} {rate:>12,.0f}')
+
+
+if __name__ == '__main__':
+    main()
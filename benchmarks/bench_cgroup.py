@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+# coding: UTF-8
+
+"""
+Compare the direct cgroupfs backend with forking a process per control file access, as `cgget`/`cgset` did.
+It runs on a mock cgroup tree in a temporary directory, so the fork is timed with `cat` and `sh -c 'echo'`,
+which are lighter than the libcgroup tools: the speedup over them is a lower bound.
+"""
+
+import argparse
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from libs.utils.cgroup import CgroupFs, CpuSet  # noqa: E402
+
+
+def ops_per_second(operation: Callable[[int], None], repeat: int) -> float:
+    start = time.perf_counter()
+    for idx in range(repeat):
+        operation(idx)
+    return repeat / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Compare the cgroupfs backend with a process per access.')
+    parser.add_argument('-n', '--repeat', type=int, default=2000)
+    parser.add_argument('--fork-repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        group = 'bench_0'
+        group_dir = Path(root) / 'cpuset' / group
+        group_dir.mkdir(parents=True)
+        cpus_path = group_dir / 'cpuset.cpus'
+        cpus_path.write_text('0-3\n')
+        (group_dir / 'cpuset.mems').write_text('0\n')
+        (group_dir / 'cpuset.memory_migrate').write_text('0\n')
+
+        cpuset = CpuSet(group, CgroupFs(root))
+        core_sets = ((0, 1, 2, 3), (0, 1))
+
+        results = (
+            ('read (fork)', ops_per_second(
+                    lambda _: subprocess.check_output(('cat', str(cpus_path))), args.fork_repeat)),
+            ('read (fs)', ops_per_second(lambda _: cpuset.read_cpus(), args.repeat)),
+            ('write (fork)', ops_per_second(
+                    lambda idx: subprocess.check_call(('sh', '-c', f'echo {idx % 4} > {cpus_path}')),
+                    args.fork_repeat)),
+            ('write (fs)', ops_per_second(lambda idx: cpuset.assign_cpus(core_sets[idx % 2]), args.repeat)),
+            # the cpusets are always written, but the other files skip the value they already have
+            ('same write (fs)', ops_per_second(lambda _: cpuset.set_memory_migrate(True), args.repeat)),
+        )
+
+    print(f'{"operation":>16} {"ops/s":>12} {"us/op":>9}')
+    for name, rate in results:
+        print(f'{name:>16} {rate:>12,.0f} {1e6 / rate:>9.1f}')
+
+
+if __name__ == '__main__':
+    main()
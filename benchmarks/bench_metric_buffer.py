@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# coding: UTF-8
+
+"""
+Compare the array-backed metric ring buffer with the bounded deque of `BasicMetric` it replaces:
+memory per kept metric, appends per second and the average of the last metrics.
+"""
+
+import argparse
+import random
+import sys
+import time
+import tracemalloc
+from collections import deque
+from pathlib import Path
+from typing import Callable, Deque, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from libs.metric_container.basic_metric import BasicMetric  # noqa: E402
+from libs.metric_container.metric_buffer import MetricRingBuffer  # noqa: E402
+from libs.wire import decode_metrics, encode_metrics  # noqa: E402
+
+
+def deque_buffer(capacity: int) -> Tuple[Deque[BasicMetric], Callable[[BasicMetric], None]]:
+    que: Deque[BasicMetric] = deque()
+
+    def append(metric: BasicMetric) -> None:
+        # as the node tracker used to trim it
+        if len(que) == capacity:
+            que.pop()
+        que.appendleft(metric)
+
+    return que, append
+
+
+def ring_buffer(capacity: int) -> Tuple[MetricRingBuffer, Callable[[BasicMetric], None]]:
+    ring = MetricRingBuffer(capacity)
+    return ring, ring.appendleft
+
+
+def bytes_per_metric(capacity: int, rows: List[tuple], kind: str) -> float:
+    # the metrics are decoded from a message as the node tracker does, so that every value is a new object
+    message = encode_metrics(BasicMetric(*row) for row in rows[:capacity])
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    if kind == 'deque':
+        kept = deque(decode_metrics(message))
+    else:
+        kept = MetricRingBuffer(capacity)
+        for metric in decode_metrics(message):
+            kept.appendleft(metric)
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del kept
+    return used / capacity
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Compare the metric ring buffer with a deque of BasicMetric.')
+    parser.add_argument('-c', '--capacity', type=int, nargs='+', default=[50, 1000, 10000])
+    parser.add_argument('-n', '--metrics', type=int, default=200000)
+    parser.add_argument('-w', '--window', type=int, default=30, help='metrics averaged by the isolators')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    rows = [(rng.randrange(10 ** 8), rng.randrange(10 ** 7), rng.randrange(10 ** 9), rng.randrange(10 ** 9),
+             rng.uniform(0, 100), rng.randrange(10 ** 9), rng.uniform(0, 100), rng.randrange(10 ** 9), 200)
+            for _ in range(max(args.capacity + [args.metrics]))]
+    metrics = [BasicMetric(*row) for row in rows[:args.metrics]]
+
+    print(f'{"capacity":>9} {"kind":>6} {"bytes/metric":>13} {"appends/s":>12} {"avg(us)":>9}')
+    for capacity in args.capacity:
+        for kind, make_buffer in (('deque', deque_buffer), ('ring', ring_buffer)):
+            buffer, append = make_buffer(capacity)
+            start = time.perf_counter()
+            for metric in metrics:
+                append(metric)
+            append_rate = len(metrics) / (time.perf_counter() - start)
+
+            repeat = 1000
+            start = time.perf_counter()
+            for _ in range(repeat):
+                if kind == 'deque':
+                    BasicMetric.calc_avg(buffer, args.window)
+                else:
+                    buffer.mean(args.window)
+            avg_us = (time.perf_counter() - start) / repeat * 1e6
+
+            size = bytes_per_metric(capacity, rows, kind)
+            print(f'{capacity:>9} {kind:>6} {size:>13,.0f} {append_rate:>12,.0f} {avg_us:>9.1f}')
+
+
+if __name__ == '__main__':
+    main()
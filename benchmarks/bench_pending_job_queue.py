@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+# coding: UTF-8
+
+"""
+Microbenchmark of PendingJobQueue under concurrent producers.
+Producer threads push jobs while a single consumer drains them in batches, as the polling thread and the scheduler do.
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+from threading import Thread
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from libs.jobs import Job  # noqa: E402
+from pending_job_queue import PendingJobQueue  # noqa: E402
+
+
+def run(num_producers: int, jobs_per_producer: int, batch_size: int) -> None:
+    queue = PendingJobQueue()
+    total = num_producers * jobs_per_producer
+    objectives = ('latency', 'throughput')
+
+    jobs = [[Job(f'job{p}_{i}', 'bg', 'cpu', objectives[i % 2]) for i in range(jobs_per_producer)]
+            for p in range(num_producers)]
+
+    def produce(my_jobs) -> None:
+        for job in my_jobs:
+            queue.add(job)
+
+    consumed = 0
+    producers = [Thread(target=produce, args=(my_jobs,)) for my_jobs in jobs]
+
+    start = time.perf_counter()
+    for producer in producers:
+        producer.start()
+
+    while consumed < total:
+        drained = queue.drain(batch_size)
+        if not drained:
+            time.sleep(0)
+        consumed += len(drained)
+
+    elapsed = time.perf_counter() - start
+    for producer in producers:
+        producer.join()
+
+    print(f'producers: {num_producers:>3}, jobs: {total:>8}, batch: {batch_size:>5} '
+          f'-> {elapsed:7.3f}s, {total / elapsed:>12,.0f} push+pop/s')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Benchmark PendingJobQueue with concurrent producers.')
+    parser.add_argument('-p', '--producers', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('-n', '--jobs', type=int, default=200_000, help='total number of jobs (default : 200000)')
+    parser.add_argument('-b', '--batch-size', type=int, default=256, help='drain batch size (default : 256)')
+    args = parser.parse_args()
+
+    for num_producers in args.producers:
+        run(num_producers, args.jobs // num_producers, args.batch_size)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# coding: UTF-8
+
+"""
+Compare the exact-min and the power-of-d-choices placement on a simulated cluster.
+
+Each simulated node runs its jobs with processor sharing, so a node with k jobs runs each of them at 1/k speed.
+Nodes report their contention (number of running jobs) only every `--report-interval` seconds,
+so the placement works on stale contentions between two reports like the real scheduler does.
+Unless `--no-reservation` is given, each placement reserves contention on its node until the next report.
+Jobs arrive in bursts and the makespan (time to finish all jobs) and the cost of a placement decision are measured.
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from libs.jobs import Job  # noqa: E402
+from libs.node import Node  # noqa: E402
+from libs.node_index import NodeIndex  # noqa: E402
+from libs.placement import MinContentionPlacement, PlacementPolicy, PowerOfDPlacement  # noqa: E402
+
+TIME_STEP = 0.05    # seconds
+
+
+def simulate(num_nodes: int, policy_factory, num_jobs: int, burst_size: int, burst_interval: float,
+             report_interval: float, reservation: bool, seed: int) -> Tuple[float, float]:
+    rng = random.Random(seed)
+    random.seed(seed)
+
+    node_index = NodeIndex()
+    nodes = [Node(f'10.0.{idx // 256}.{idx % 256}', '10010', 'cpu_node') for idx in range(num_nodes)]
+    running: Dict[Node, List[float]] = dict((node, list()) for node in nodes)  # node -> remaining work of jobs
+    for node in nodes:
+        node.aggr_contention = 0.0
+        node_index.update(node)
+    policy: PlacementPolicy = policy_factory(node_index)
+
+    works = [rng.uniform(1.0, 3.0) for _ in range(num_jobs)]
+    submitted = 0
+    placement_time = 0.0
+    now = 0.0
+    next_burst = 0.0
+    next_report = report_interval
+
+    while submitted < num_jobs or any(running.values()):
+        if submitted < num_jobs and now >= next_burst:
+            for _ in range(min(burst_size, num_jobs - submitted)):
+                job = Job('sim', 'bg', 'cpu', 'throughput')
+                start = time.perf_counter()
+                node = policy.select_node(job)
+                placement_time += time.perf_counter() - start
+                if reservation:
+                    # a simulated job adds exactly one to the contention of its node
+                    node_index.reserve(node, 1.0, now)
+                running[node].append(works[submitted])
+                submitted += 1
+            next_burst += burst_interval
+
+        for node, remaining in running.items():
+            if remaining:
+                progress = TIME_STEP / len(remaining)
+                running[node] = [work - progress for work in remaining if work > progress]
+
+        now += TIME_STEP
+        if now >= next_report:
+            for node in nodes:
+                node.aggr_contention = float(len(running[node]))
+                node_index.update(node)
+                # the report reflects every job placed before it
+                node_index.reconcile(node, 0.0, now)
+            next_report += report_interval
+
+    return now, placement_time / num_jobs
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Compare exact-min and power-of-d placement.')
+    parser.add_argument('-n', '--nodes', type=int, nargs='+', default=[10, 100, 1000])
+    parser.add_argument('-d', '--choices', type=int, nargs='+', default=[2, 4])
+    parser.add_argument('--jobs-per-node', type=int, default=4)
+    parser.add_argument('--burst-size', type=float, default=0.2, help='burst size relative to the number of nodes')
+    parser.add_argument('--burst-interval', type=float, default=0.5, help='seconds between bursts')
+    parser.add_argument('--report-interval', type=float, default=1.0, help='seconds between contention reports')
+    parser.add_argument('--no-reservation', dest='reservation', action='store_false',
+                        help='do not reserve contention on the destination node after each placement')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    policies = [('exact-min', MinContentionPlacement)]
+    for d in args.choices:
+        policies.append((f'pod(d={d})', lambda index, d=d: PowerOfDPlacement(index, d)))
+
+    print(f'{"nodes":>6} {"policy":>12} {"makespan(s)":>12} {"placement(us)":>14}')
+    for num_nodes in args.nodes:
+        for name, factory in policies:
+            makespan, cost = simulate(num_nodes, factory, num_nodes * args.jobs_per_node,
+                                      max(1, int(num_nodes * args.burst_size)), args.burst_interval,
+                                      args.report_interval, args.reservation, args.seed)
+            print(f'{num_nodes:>6} {name:>12} {makespan:>12.2f} {cost * 1e6:>14.2f}')
+
+
+if __name__ == '__main__':
+    main()
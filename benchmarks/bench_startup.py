@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# coding: UTF-8
+
+"""
+Measure the startup time of the scheduler and the node tools: the time to import each of them in a new
+interpreter, without the machine profile cache file (`cold`) and with it (`warm`).
+`--cpuinfo` also times `cpuinfo.get_cpu_info()`, which every process used to call at import.
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+ROOT = Path(__file__).resolve().parent.parent
+
+_IMPORT_TIMER = 'import time; start = time.perf_counter(); import {module}; print(time.perf_counter() - start)'
+
+
+def time_import(module: str, env: Dict[str, str]) -> float:
+    """ :return: seconds to import `module` in a new interpreter """
+    output = subprocess.run((sys.executable, '-c', _IMPORT_TIMER.format(module=module)), cwd=str(ROOT), env=env,
+                            check=True, stdout=subprocess.PIPE, encoding='ASCII').stdout
+    return float(output.split()[-1])
+
+
+def time_cpuinfo() -> float:
+    from cpuinfo import cpuinfo
+    start = time.perf_counter()
+    cpuinfo.get_cpu_info()
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Measure the import time of the scheduler and the node tools.')
+    parser.add_argument('-m', '--modules', nargs='+',
+                        default=['cluster_scheduler', 'node_tracker', 'polling_thread', 'job_submit'])
+    parser.add_argument('-r', '--repeat', type=int, default=5)
+    parser.add_argument('--cpuinfo', action='store_true', help='also time cpuinfo.get_cpu_info()')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cache_file = str(Path(tmp_dir) / 'machine-profile.json')
+        # an empty path disables the cache file, so every process detects the profile
+        envs = (('cold', dict(os.environ, MACHINE_PROFILE_CACHE='')),
+                ('warm', dict(os.environ, MACHINE_PROFILE_CACHE=cache_file)))
+
+        print(f'{"module":>18} {"cache":>6} {"median(ms)":>11} {"min(ms)":>8}')
+        for module in args.modules:
+            for name, env in envs:
+                # the first run fills the cache file and the page cache
+                time_import(module, env)
+                elapsed: List[float] = [time_import(module, env) for _ in range(args.repeat)]
+                print(f'{module:>18} {name:>6} {statistics.median(elapsed) * 1000:>11.1f} '
+                      f'{min(elapsed) * 1000:>8.1f}')
+
+    if args.cpuinfo:
+        print(f'cpuinfo.get_cpu_info(): {time_cpuinfo() * 1000:.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# coding: UTF-8
+
+"""
+Measure the recovery time of the write-ahead log against the number of logged records.
+
+The log is filled like a busy scheduler does: every job is submitted, placed, dispatched and acked
+(or fails now and then), and a node reports its contention after every job.
+Then the log is opened again and the time to rebuild the scheduler state (the snapshot load, the replay and the
+creation of the restored jobs) is measured, with and without snapshots.
+"""
+
+import argparse
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from libs.jobs import Job, JobState  # noqa: E402
+from libs.node import Node  # noqa: E402
+from libs.wal import SchedulerState, WriteAheadLog, job_submitted, job_transited, node_reported  # noqa: E402
+
+NUM_NODES = 100
+
+
+def fill(directory: str, num_records: int, snapshot_every: int, seed: int) -> Tuple[int, float]:
+    rng = random.Random(seed)
+    nodes = [Node(f'10.0.0.{idx}', '10010', 'cpu_node') for idx in range(NUM_NODES)]
+    for node in nodes:
+        node.num_workloads = node.num_of_fg_wls = node.num_of_bg_wls = 0
+
+    wal = WriteAheadLog(directory, SchedulerState(), snapshot_every=snapshot_every)
+    start = time.perf_counter()
+    while wal.last_seq < num_records:
+        job = Job(f'wl{rng.randrange(20)}', 'bg', 'cpu', rng.choice(('latency', 'throughput')))
+        node = rng.choice(nodes)
+        wal.append(job_submitted(job))
+        for state in (JobState.PLACING, JobState.DISPATCHED,
+                      JobState.FAILED if rng.random() < 0.05 else JobState.ACKED):
+            if state is JobState.DISPATCHED:
+                job.dest_ip, job.dest_port = node.ip_addr, node.port
+                job.dispatch_attempts += 1
+            job.state = state
+            wal.append(job_transited(job))
+
+        node.aggr_contention = rng.uniform(0, 10)
+        wal.append(node_reported(node))
+    wal.close()
+    return wal.last_seq, time.perf_counter() - start
+
+
+def recover(directory: str) -> Tuple[float, int, int]:
+    start = time.perf_counter()
+    wal = WriteAheadLog(directory, SchedulerState())
+    jobs = wal.state.restore_jobs()
+    nodes = wal.state.restore_nodes()
+    elapsed = time.perf_counter() - start
+    wal.close()
+    return elapsed, wal.num_recovered, len(jobs) + len(nodes)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Measure the recovery time of the write-ahead log.')
+    parser.add_argument('-n', '--records', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--snapshot-every', type=int, default=50000,
+                        help='records between two snapshots in the snapshot mode')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    print(f'{"records":>9} {"snapshot":>9} {"append(us)":>11} {"replayed":>9} {"restored":>9} {"recovery(ms)":>13}')
+    for num_records in args.records:
+        for snapshot_every in (sys.maxsize, args.snapshot_every):
+            with tempfile.TemporaryDirectory() as directory:
+                num_written, fill_time = fill(directory, num_records, snapshot_every, args.seed)
+                elapsed, num_replayed, num_restored = recover(directory)
+
+            mode = 'off' if snapshot_every == sys.maxsize else str(snapshot_every)
+            print(f'{num_written:>9} {mode:>9} {fill_time / num_written * 1e6:>11.2f} {num_replayed:>9} '
+                  f'{num_restored:>9} {elapsed * 1e3:>13.1f}')
+
+
+if __name__ == '__main__':
+    main()
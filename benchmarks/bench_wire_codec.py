@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# coding: UTF-8
+
+"""
+Compare the encode/decode throughput and the message size of the binary wire format with the old formats
+(CSV for jobs and tracking reports, JSON for metrics).
+The binary format is measured with a record per message (like the old formats) and with batched frames.
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Callable, List, Sequence, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from libs.jobs import Job  # noqa: E402
+from libs.metric_container.basic_metric import BasicMetric  # noqa: E402
+from libs.wire import TrackingReport, encode_jobs, encode_metrics, encode_tracking, job_to_csv, \
+    parse_job_message, parse_metric_message, parse_tracking_message  # noqa: E402
+
+
+def measure(encode: Callable[[Sequence], List[bytes]], decode: Callable[[bytes], list], records: Sequence) \
+        -> Tuple[float, float, float]:
+    """ :return: encoded records per second, decoded records per second, bytes per record """
+    start = time.perf_counter()
+    messages = encode(records)
+    encode_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    num_decoded = sum(len(decode(message)) for message in messages)
+    decode_time = time.perf_counter() - start
+    assert num_decoded == len(records)
+
+    return len(records) / encode_time, len(records) / decode_time, sum(map(len, messages)) / len(records)
+
+
+def batched(encode_batch: Callable[[Sequence], bytes], batch_size: int) -> Callable[[Sequence], List[bytes]]:
+    return lambda records: [encode_batch(records[idx:idx + batch_size]) for idx in range(0, len(records), batch_size)]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Compare the binary wire format with CSV/JSON.')
+    parser.add_argument('-n', '--records', type=int, default=100000)
+    parser.add_argument('-b', '--batch-size', type=int, default=64, help='records per binary message when batched')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    n = args.records
+    jobs = [Job(f'SparkWorkload{idx % 20}', rng.choice(('fg', 'bg')), rng.choice(('cpu', 'gpu')),
+                rng.choice(('latency', 'throughput'))) for idx in range(n)]
+    reports = [TrackingReport(f'147.46.242.{idx % 256}', rng.uniform(0, 10), rng.randrange(8), rng.randrange(4),
+                              rng.randrange(4), rng.choice(('cpu', 'gpu'))) for idx in range(n)]
+    metrics = [BasicMetric(rng.randrange(10 ** 8), rng.randrange(10 ** 7), rng.randrange(10 ** 9),
+                           rng.randrange(10 ** 9), rng.uniform(0, 100), rng.randrange(10 ** 9),
+                           rng.uniform(0, 100), rng.randrange(10 ** 9), 200) for _ in range(n)]
+
+    def metric_to_json(metric: BasicMetric) -> bytes:
+        return json.dumps({'llc_references': metric.llc_references, 'llc_misses': metric.llc_misses,
+                           'instructions': metric.instruction, 'cycles': metric.cycles,
+                           'gpu_core_util': metric.gpu_core_util, 'gpu_core_freq': metric.gpu_core_freq,
+                           'gpu_emc_util': metric.gpu_mem_util, 'gpu_emc_freq': metric.gpu_emc_freq}).encode()
+
+    def report_to_csv(report: TrackingReport) -> bytes:
+        return ','.join(map(str, report)).encode()
+
+    cases = [
+        ('job', 'csv', lambda records: [job_to_csv(job).encode() for job in records], parse_job_message, jobs),
+        ('job', 'binary', batched(encode_jobs, 1), parse_job_message, jobs),
+        ('job', f'binary x{args.batch_size}', batched(encode_jobs, args.batch_size), parse_job_message, jobs),
+        ('tracking', 'csv', lambda records: [report_to_csv(report) for report in records],
+         parse_tracking_message, reports),
+        ('tracking', 'binary', batched(encode_tracking, 1), parse_tracking_message, reports),
+        ('tracking', f'binary x{args.batch_size}', batched(encode_tracking, args.batch_size),
+         parse_tracking_message, reports),
+        ('metric', 'json', lambda records: [metric_to_json(metric) for metric in records],
+         parse_metric_message, metrics),
+        ('metric', 'binary', batched(encode_metrics, 1), parse_metric_message, metrics),
+        ('metric', f'binary x{args.batch_size}', batched(encode_metrics, args.batch_size),
+         parse_metric_message, metrics),
+    ]
+
+    print(f'{"message":>9} {"format":>12} {"encode(rec/s)":>14} {"decode(rec/s)":>14} {"bytes/rec":>10}')
+    for message, fmt, encode, decode, records in cases:
+        encode_rate, decode_rate, size = measure(encode, decode, records)
+        print(f'{message:>9} {fmt:>12} {encode_rate:>14,.0f} {decode_rate:>14,.0f} {size:>10.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -5,91 +5,336 @@ import argparse
 import datetime
 import logging
 import os
+import queue
 import sys
 import time
-from typing import Dict
+from threading import Event
+from typing import ClassVar, Dict, List, Optional, Tuple
 
-import socket
 import libs
 
+from job_dispatcher import DispatchResult, JobDispatcher
 from pending_job_queue import PendingJobQueue
 from polling_thread import PollingThread
+from libs.broker import Broker, rabbitmq_broker
 from libs.node import Node
-from libs.jobs import Job
+from libs.jobs import DispatchAckLog, Job, JobState, JobTable
+from libs.placement import AdmissionController, AdmissionStats, BatchPlacement, ContentionEstimator, InterferenceAwarePlacement, \
+    InterferencePredictor, MinContentionPlacement, PlacementPolicy, PowerOfDPlacement
+from libs.solorun_data.datas import data_map
+from libs.wal import SchedulerState, WriteAheadLog, job_transited
 from node_tracker import NodeTracker
 
 MIN_PYTHON = (3, 6)
 
 
 class ClusterScheduler:
-    def __init__(self, metric_buf_size: int) -> None:
+    _MAX_DISPATCH_ATTEMPTS: ClassVar[int] = 3
+
+    def __init__(self, metric_buf_size: int, dispatch_pool_size: int = 2, dispatch_timeout: float = 3.0,
+                 job_history_size: int = 1000, batch_window: float = 0.005, max_latency: float = 0.05,
+                 placement: str = 'min', pod_choices: int = 2, reservation_delta: float = 1.0,
+                 max_workloads_per_node: int = 4, admission_thresholds: Optional[Dict[str, float]] = None,
+                 backpressure_watermarks: Tuple[int, int] = (1000, 500), prefetch_count: int = 100,
+                 wal_dir: Optional[str] = None, wal_sync_interval: float = 0.01,
+                 wal_snapshot_every: int = 50000, ack_log: Optional[str] = None,
+                 broker: Optional[Broker] = None, submission_batch: Tuple[int, float] = (64, 0.005),
+                 tracking_prefetch_count: int = 1000, tracking_batch: Tuple[int, float] = (256, 0.01),
+                 heartbeat_timeout: float = 10.0, pipelined_dispatch: bool = False) -> None:
         self._pending_job_queue: PendingJobQueue = PendingJobQueue()
+        # The acked dispatches are logged to measure the submit-to-dispatch latency (see load_generator.py)
+        self._ack_log: Optional[DispatchAckLog] = None if ack_log is None else DispatchAckLog(ack_log)
+
+        # Job submissions, job transitions and node reports are logged to restore them after a restart
+        self._wal: Optional[WriteAheadLog] = None
+        if wal_dir is not None:
+            self._wal = WriteAheadLog(wal_dir, SchedulerState(job_history_size), wal_sync_interval,
+                                      wal_snapshot_every)
+
+        self._interval: float = 1.0  # idle scheduling interval (sec). the loop usually wakes up on events
+        self._batch_window: float = batch_window  # quiet period to wait for more events before placement (sec)
+        self._max_latency: float = max_latency  # upper bound of the delay from the first event to placement (sec)
+        self._wakeup: Event = Event()
+
+        self._jobs: JobTable = JobTable(job_history_size, self._on_transition)
+        # The jobs which have become pending since the last placement round (arrived or to be retried).
+        # The other pending jobs are held by the admission control, and placed again only when the nodes change
+        self._arrived_jobs: List[Job] = list()
+        self._placed_version: int = -1   # the version of the node index which the last round saw
+
+        # RabbitMQ on localhost by default. An in-process broker drives the scheduler without it
+        broker = rabbitmq_broker('localhost') if broker is None else broker
+        self._polling_thread = PollingThread(metric_buf_size, self._pending_job_queue, self._wakeup,
+                                             backpressure_watermarks, prefetch_count, self._wal, broker,
+                                             submission_batch)
+        # aggr_metric_bufsize is initially set to 50
+        self._node_tracker = NodeTracker(metric_buf_size=50, wakeup=self._wakeup, wal=self._wal, broker=broker,
+                                         prefetch_count=tracking_prefetch_count, delivery_batch=tracking_batch,
+                                         heartbeat_timeout=heartbeat_timeout)
+        self._dispatcher = JobDispatcher(pool_size=dispatch_pool_size, request_timeout=dispatch_timeout,
+                                         wakeup=self._wakeup, pipelined=pipelined_dispatch)
+
+        self._contention_estimator = ContentionEstimator(data_map, reservation_delta)
+        self._admission = AdmissionController(admission_thresholds or dict(), self._contention_estimator)
 
-        self._interval: float = 1.0  # scheduling interval (sec)
+        node_index = self._node_tracker.node_index
+        if placement == 'min':
+            self._placement: PlacementPolicy = MinContentionPlacement(node_index)
+        elif placement == 'pod':
+            self._placement: PlacementPolicy = PowerOfDPlacement(node_index, pod_choices)
+        elif placement == 'interference':
+            self._placement: PlacementPolicy = InterferenceAwarePlacement(node_index, InterferencePredictor(data_map))
+        elif placement == 'batch':
+            # the search ends well within the batching window
+            self._placement: PlacementPolicy = BatchPlacement(node_index, InterferencePredictor(data_map),
+                                                              max_workloads_per_node, max_solve_time=max_latency / 2)
+        else:
+            raise ValueError(f'Unknown placement mode: {placement}')
 
-        self._dispatch_candidate_jobs: Dict[Job, str] = dict()  #
+        if self._wal is not None:
+            self._restore_jobs()
 
-        self._polling_thread = PollingThread(metric_buf_size, self._pending_job_queue)
-        self._node_tracker = NodeTracker(metric_buf_size=50)  # aggr_metric_bufsize is initially set to 50
+    @property
+    def jobs(self) -> JobTable:
+        return self._jobs
+
+    @property
+    def admission_stats(self) -> AdmissionStats:
+        return self._admission.stats
+
+    def _on_transition(self, job: Job) -> None:
+        if job.state is not JobState.PENDING:
+            # the job does not wait for admission anymore, whether it is dispatched or not
+            self._admission.forget(job)
+        if self._wal is not None:
+            self._wal.append(job_transited(job))
+
+    def _restore_jobs(self) -> None:
+        """
+        This function rebuilds the job table and the pending queue from the write-ahead log.
+        The jobs which were dispatched but not acked yet are dispatched again,
+        because it is unknown whether their dispatch reached the node.
+        :return:
+        """
+        logger = logging.getLogger(__name__)
+        jobs = self._wal.state.restore_jobs()
+        num_requeued = 0
+        for job in jobs:
+            if job.state.is_retired:
+                self._jobs.add(job)
+                continue
+
+            if job.state is not JobState.PENDING:
+                job.state = JobState.PENDING
+                self._on_transition(job)
+            self._pending_job_queue.add(job)
+            num_requeued += 1
+
+        logger.info(f'{len(jobs)} jobs are restored ({num_requeued} pending) '
+                    f'after replaying {self._wal.num_recovered} log records')
 
     def _pick_job_from_pending_queue(self) -> None:
         """
-        This function checks the pending jobs and if there any pending jobs, then dispatch it to least cont node
+        This function moves the pending jobs from the queue to the job table, so that they can be placed
         :return:
         """
         logger = logging.getLogger(__name__)
-        job_queue = self._pending_job_queue
-        while len(job_queue) > 0:
-            if job_queue.lat_jobs > 0:
-                pending_latency_job: Job = self._pending_job_queue.pop('latency')
-                logger.info(f'{pending_latency_job} is created')
-                self._dispatch_candidate_jobs[pending_latency_job] = 'ready to dispatch'
-
-            elif job_queue.lat_jobs == 0 and job_queue.thr_jobs > 0:
-                pending_throughput_job: Job = self._pending_job_queue.pop('throughput')
-                logger.info(f'{pending_throughput_job} is created')
-                self._dispatch_candidate_jobs[pending_throughput_job] = 'ready to dispatch'
+        for pending_job in self._pending_job_queue.drain():
+            logger.info(f'{pending_job} is created')
+            self._jobs.add(pending_job)
+            self._arrived_jobs.append(pending_job)
 
     def dispatch_jobs(self) -> None:
-        logger = logging.getLogger(__name__)
+        """
+        Place the jobs which have become pending since the last round.
+        The jobs which are not placed (no available node or held by the admission control) stay pending in the table
+        without any state change, and all of them are placed again only once a node may have room for them
+        :return:
+        """
+        version = self._node_tracker.node_index.version
+        if version != self._placed_version:
+            pending_jobs = self._jobs.jobs_in(JobState.PENDING)
+        else:
+            pending_jobs = tuple(job for job in self._arrived_jobs if job.state is JobState.PENDING)
+        self._arrived_jobs.clear()
+        self._placed_version = version
+        if len(pending_jobs) == 0:
+            return
+
+        # the held jobs and the arrived ones are mixed, so they are put back in the order of the pending queue
+        pending_jobs = sorted(pending_jobs, key=self._pending_job_queue.priority_of)
+        self._placement.select_nodes(pending_jobs, self._admit_and_dispatch_job)
+
+        num_held = self._jobs.num_jobs_in(JobState.PENDING)
+        self._pending_job_queue.num_held = num_held
+        self._admission.update_queue_stats(self._pending_job_queue.num_waiting)
+        if num_held > 0:
+            logger = logging.getLogger('monitoring.admission')
+            logger.debug(f'{num_held} jobs are held. {self._admission.stats}')
 
-        for job in self._dispatch_candidate_jobs.keys():
-            logger.info('')
-            logger.info(f'*********dispatch of {job.name} ({job.objective} {job.type} job) ***********')
-            self._do_dispatch_job(job)
-            self._dispatch_candidate_jobs[job] = f'dispatch success dest_node ({job.dest_ip}:{job.dest_port})'
+    def _admit_and_dispatch_job(self, job: Job, dest_node: Node) -> None:
+        if self._admission.admit(job, dest_node):
+            self._jobs.transition(job, JobState.PLACING)
+            self._do_dispatch_job(job, dest_node)
+        else:
+            self._placement.release(job, dest_node)
 
-    def _do_dispatch_job(self, job: Job) -> None:
+    def _do_dispatch_job(self, job: Job, dest_node: Node) -> None:
         logger = logging.getLogger(__name__)
-        dest_node: Node = self._node_tracker.min_aggr_cont_node
+        logger.info('')
+        logger.info(f'*********dispatch of {job.name} ({job.objective} {job.type} job) ***********')
+
         job.dest_ip = dest_node.ip_addr
         job.dest_port = dest_node.port
+        job.dispatch_attempts += 1
+        # Reserve the predicted contention until the node reports it, so that the following jobs see it
+        self._node_tracker.node_index.reserve(dest_node, self._contention_estimator.predict(job))
         logger.info(f'{job.name} is dispatched to the {job.type} host-{dest_node.ip_addr}')
-        # FIXME: socket communication is blocking-based. It should be fixed in non-blocking manner
-        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-            s.connect((dest_node.ip_addr, dest_node.port))
-            data = f'{job.name},{job.type},{job.preferences}'
-            s.sendall(data.encode())
-            resp = s.recv(1024)
-            logger.info(f'Received from {resp.decode()} {dest_node.ip_addr}:{dest_node.port}!')
+        self._jobs.transition(job, JobState.DISPATCHED)
+        self._dispatcher.dispatch(job, dest_node)
+
+    def _collect_dispatch_results(self) -> None:
+        """
+        This function applies the acks (or failures) which the dispatcher has received since the last call
+        :return:
+        """
+        logger = logging.getLogger(__name__)
+        while True:
+            try:
+                result: DispatchResult = self._dispatcher.results.get_nowait()
+            except queue.Empty:
+                break
+
+            job = result.job
+            if result.succeeded:
+                logger.info(f'dispatch success {job.name} dest_node ({job.dest_ip}:{job.dest_port})')
+                self._jobs.transition(job, JobState.ACKED)
+                if self._ack_log is not None:
+                    self._ack_log.record(job, result.finished_at)
+                continue
+
+            # the job is not on the node, so neither is the contention reserved for it
+            self._node_tracker.node_index.release(result.node, self._contention_estimator.predict(job))
+            self._placement.release(job, result.node)
+            if job.dispatch_attempts < self._MAX_DISPATCH_ATTEMPTS:
+                logger.warning(f'dispatch of {job.name} to {job.dest_ip}:{job.dest_port} is failed. retry later')
+                self._jobs.transition(job, JobState.PENDING)
+                self._arrived_jobs.append(job)
+            else:
+                logger.error(f'dispatch of {job.name} is failed {job.dispatch_attempts} times. give up')
+                self._jobs.transition(job, JobState.FAILED)
+
+        if self._ack_log is not None:
+            self._ack_log.flush()
+
+    def _wait_for_events(self) -> None:
+        """
+        This function blocks until the scheduler has something to do.
+        After the first event, it keeps collecting events while they arrive within the batching window,
+        but returns at most `max_latency` seconds after the first event.
+        :return:
+        """
+        wakeup = self._wakeup
+        if not wakeup.wait(self._interval):
+            return
+
+        deadline = time.monotonic() + self._max_latency
+        while True:
+            # Events that are set after this point are handled by the next placement round at the latest
+            wakeup.clear()
+            timeout = min(self._batch_window, deadline - time.monotonic())
+            if timeout <= 0 or not wakeup.wait(timeout):
+                return
 
     def run(self) -> None:
         self._polling_thread.start()
         self._node_tracker.start()
+        self._dispatcher.start()
 
         logger = logging.getLogger(__name__)
         logger.info('starting cluster scheduler loop')
-        while True:
-            self._pick_job_from_pending_queue()
+        try:
+            while True:
+                self._wait_for_events()
 
-            time.sleep(self._interval)
-            self.dispatch_jobs()
+                self._pick_job_from_pending_queue()
+                self._collect_dispatch_results()
+                self.dispatch_jobs()
+        finally:
+            if self._wal is not None:
+                self._wal.close()
+            if self._ack_log is not None:
+                self._ack_log.close()
 
 
 def main() -> None:
     parser = argparse.ArgumentParser(description='Run workloads that given by parameter.')
     parser.add_argument('-b', '--metric-buf-size', dest='buf_size', default='50', type=int,
                         help='metric buffer size per thread. (default : 50)')
+    parser.add_argument('--dispatch-pool-size', dest='dispatch_pool_size', default=2, type=int,
+                        help='number of concurrent connections per node used for dispatching jobs. (default : 2)')
+    parser.add_argument('--pipelined-dispatch', dest='pipelined_dispatch', action='store_true',
+                        help='keep the dispatch connections open and pipeline newline-terminated requests on them. '
+                             'every node agent must support this framing. (default : a request per connection)')
+    parser.add_argument('--dispatch-timeout', dest='dispatch_timeout', default=3.0, type=float,
+                        help='timeout of a single dispatch request in seconds. (default : 3.0)')
+    parser.add_argument('--batch-window', dest='batch_window', default=5.0, type=float,
+                        help='quiet period in milliseconds to batch the arriving events before placement. '
+                             '(default : 5.0)')
+    parser.add_argument('--max-latency', dest='max_latency', default=50.0, type=float,
+                        help='maximum delay in milliseconds from the first event to placement. (default : 50.0)')
+    parser.add_argument('--placement', dest='placement', default='min', choices=('min', 'pod', 'interference', 'batch'),
+                        help='placement mode. min: least contended node, '
+                             'pod: least contended node among d sampled nodes, '
+                             'interference: least predicted interference with the residents, '
+                             'batch: least total predicted interference of all pending jobs. (default : min)')
+    parser.add_argument('-d', '--pod-choices', dest='pod_choices', default=2, type=int,
+                        help='number of sampled nodes in the pod placement mode. (default : 2)')
+    parser.add_argument('--max-workloads-per-node', dest='max_workloads_per_node', default=4, type=int,
+                        help='number of workloads a node can host in the batch placement mode. (default : 4)')
+    parser.add_argument('--latency-threshold', dest='latency_threshold', default=None, type=float,
+                        help='hold latency jobs while the predicted contention of the best node exceeds this. '
+                             '(default : no admission control)')
+    parser.add_argument('--throughput-threshold', dest='throughput_threshold', default=None, type=float,
+                        help='hold throughput jobs while the predicted contention of the best node exceeds this. '
+                             '(default : no admission control)')
+    parser.add_argument('--backpressure-high', dest='backpressure_high', default=1000, type=int,
+                        help='stop acknowledging submissions when this many jobs are pending. (default : 1000)')
+    parser.add_argument('--backpressure-low', dest='backpressure_low', default=500, type=int,
+                        help='resume acknowledging submissions when the pending jobs drop to this. (default : 500)')
+    parser.add_argument('--prefetch-count', dest='prefetch_count', default=100, type=int,
+                        help='prefetch count of the job submission consumer. (default : 100)')
+    parser.add_argument('--submission-batch-size', dest='submission_batch_size', default=64, type=int,
+                        help='maximum number of submission messages handled at once. '
+                             'It should not exceed the prefetch count. (default : 64)')
+    parser.add_argument('--submission-batch-delay', dest='submission_batch_delay', default=5.0, type=float,
+                        help='maximum delay in milliseconds to fill a batch of submission messages. (default : 5.0)')
+    parser.add_argument('--tracking-prefetch-count', dest='tracking_prefetch_count', default=1000, type=int,
+                        help='prefetch count of the node report and metric consumer. (default : 1000)')
+    parser.add_argument('--tracking-batch-size', dest='tracking_batch_size', default=256, type=int,
+                        help='maximum number of node report and metric messages handled at once. '
+                             'It should not exceed the tracking prefetch count. (default : 256)')
+    parser.add_argument('--tracking-batch-delay', dest='tracking_batch_delay', default=10.0, type=float,
+                        help='maximum delay in milliseconds to fill a batch of node report and metric messages. '
+                             '(default : 10.0)')
+    parser.add_argument('--heartbeat-timeout', dest='heartbeat_timeout', default=10.0, type=float,
+                        help='seconds without a report after which no job is placed on a node. (default : 10.0)')
+    parser.add_argument('--reservation-delta', dest='reservation_delta', default=1.0, type=float,
+                        help='contention reserved on a node for a dispatched job of average memory intensity. '
+                             '(default : 1.0)')
+
+    parser.add_argument('--wal-dir', dest='wal_dir', default=None, type=str,
+                        help='directory of the write-ahead log. The scheduler state is restored from it on start. '
+                             '(default : no write-ahead log)')
+    parser.add_argument('--wal-sync-interval', dest='wal_sync_interval', default=10.0, type=float,
+                        help='interval in milliseconds to fsync the write-ahead log. (default : 10.0)')
+    parser.add_argument('--wal-snapshot-every', dest='wal_snapshot_every', default=50000, type=int,
+                        help='number of log records between two snapshots. (default : 50000)')
+
+    parser.add_argument('--rmq-host', dest='rmq_host', default='localhost', type=str,
+                        help='host of the RabbitMQ server. (default : localhost)')
+    parser.add_argument('--ack-log', dest='ack_log', default=None, type=str,
+                        help='CSV file to log the acked dispatches for load_generator.py report. (default : no log)')
 
     os.makedirs('logs', exist_ok=True)
 
@@ -116,7 +361,37 @@ def main() -> None:
     monitoring_logger.addHandler(stream_handler)
     monitoring_logger.addHandler(file_handler)
 
-    cluster_scheduler = ClusterScheduler(args.buf_size)
+    dispatcher_logger = logging.getLogger('job_dispatcher')
+    dispatcher_logger.setLevel(logging.INFO)
+    dispatcher_logger.addHandler(stream_handler)
+    dispatcher_logger.addHandler(file_handler)
+
+    admission_thresholds = dict()
+    if args.latency_threshold is not None:
+        admission_thresholds['latency'] = args.latency_threshold
+    if args.throughput_threshold is not None:
+        admission_thresholds['throughput'] = args.throughput_threshold
+
+    cluster_scheduler = ClusterScheduler(args.buf_size, args.dispatch_pool_size, args.dispatch_timeout,
+                                         batch_window=args.batch_window / 1000,
+                                         max_latency=args.max_latency / 1000,
+                                         placement=args.placement, pod_choices=args.pod_choices,
+                                         reservation_delta=args.reservation_delta,
+                                         max_workloads_per_node=args.max_workloads_per_node,
+                                         admission_thresholds=admission_thresholds,
+                                         backpressure_watermarks=(args.backpressure_high, args.backpressure_low),
+                                         prefetch_count=args.prefetch_count,
+                                         wal_dir=args.wal_dir,
+                                         wal_sync_interval=args.wal_sync_interval / 1000,
+                                         wal_snapshot_every=args.wal_snapshot_every,
+                                         ack_log=args.ack_log,
+                                         broker=rabbitmq_broker(args.rmq_host),
+                                         submission_batch=(args.submission_batch_size,
+                                                           args.submission_batch_delay / 1000),
+                                         tracking_prefetch_count=args.tracking_prefetch_count,
+                                         tracking_batch=(args.tracking_batch_size, args.tracking_batch_delay / 1000),
+                                         heartbeat_timeout=args.heartbeat_timeout,
+                                         pipelined_dispatch=args.pipelined_dispatch)
     cluster_scheduler.run()
 
 
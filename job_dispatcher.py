@@ -0,0 +1,269 @@
+# coding: UTF-8
+
+"""
+Dispatch of the jobs to the node agents.
+
+A dispatch request is `name,type,preferences` and the node agent replies with a single line.
+There are two framings of the node protocol:
+- one request per connection (the default, which every node agent understands): the request is sent without a
+  terminator, the agent reads it with a single `recv()`, replies and closes the connection.
+- pipelined (`pipelined=True`, `--pipelined-dispatch`): the connections are kept open, every request ends with
+  `\\n`, and up to `max_in_flight` requests are written back-to-back on a connection. The agent must read the
+  requests line by line and reply with one line per request in order. This is a change of the node protocol,
+  so it must be turned on only when every node agent of the cluster supports it.
+"""
+
+import asyncio
+import logging
+import queue
+import time
+from collections import deque
+from threading import Event, Thread
+from typing import Deque, Dict, List, NamedTuple, Optional, Tuple
+
+from libs.jobs import Job
+from libs.node import Node
+
+
+class DispatchResult(NamedTuple):
+    job: Job
+    node: Node
+    response: Optional[str]
+    error: Optional[Exception]
+    finished_at: float      # when the ack (or the failure) is received (time.time())
+
+    @property
+    def succeeded(self) -> bool:
+        return self.error is None
+
+
+class _NodeConnection:
+    """
+    A long-lived TCP connection to a node.
+    Requests are written back-to-back (pipelined) and the node replies with one line per request in order,
+    so the replies are matched to the requests in FIFO order.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, ip_addr: str, port: int, connect_timeout: float) -> None:
+        self._loop = loop
+        self._ip_addr = ip_addr
+        self._port = port
+        self._connect_timeout = connect_timeout
+
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._reader_task: Optional[asyncio.Future] = None
+        self._connect_lock = asyncio.Lock()
+        self._in_flight: Deque[asyncio.Future] = deque()
+
+    @property
+    def num_in_flight(self) -> int:
+        return len(self._in_flight)
+
+    @property
+    def connected(self) -> bool:
+        return self._writer is not None
+
+    async def _ensure_connected(self) -> None:
+        if self._writer is not None:
+            return
+
+        async with self._connect_lock:
+            if self._writer is not None:
+                return
+
+            self._reader, self._writer = await asyncio.wait_for(
+                    asyncio.open_connection(self._ip_addr, self._port), self._connect_timeout)
+            self._reader_task = asyncio.ensure_future(self._read_responses(self._reader), loop=self._loop)
+
+            logger = logging.getLogger(__name__)
+            logger.debug(f'connection to {self._ip_addr}:{self._port} is established')
+
+    async def _read_responses(self, reader: asyncio.StreamReader) -> None:
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    raise ConnectionResetError(f'{self._ip_addr}:{self._port} closed the connection')
+
+                if self._in_flight:
+                    fut = self._in_flight.popleft()
+                    if not fut.done():
+                        fut.set_result(line.decode().strip())
+
+                # Nodes which do not know about pipelining reply once and close the connection.
+                # In that case the partial line without a trailing newline is returned just before EOF.
+                if not line.endswith(b'\n'):
+                    raise ConnectionResetError(f'{self._ip_addr}:{self._port} closed the connection')
+
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.close(e)
+
+    async def request(self, data: bytes, timeout: float) -> str:
+        await self._ensure_connected()
+
+        fut = self._loop.create_future()
+        # appending the future and writing the request must not be interleaved with other requests
+        self._in_flight.append(fut)
+        self._writer.write(data + b'\n')
+
+        try:
+            await self._writer.drain()
+            return await asyncio.wait_for(fut, timeout)
+        except asyncio.TimeoutError:
+            # The order of the replies is no longer trustworthy on this connection
+            self.close(asyncio.TimeoutError(f'no response from {self._ip_addr}:{self._port} in {timeout}s'))
+            raise
+        except ConnectionError as e:
+            self.close(e)
+            raise
+
+    def close(self, reason: Optional[Exception] = None) -> None:
+        if self._writer is not None:
+            self._writer.close()
+        if self._reader_task is not None and not self._reader_task.done():
+            self._reader_task.cancel()
+
+        self._reader = self._writer = self._reader_task = None
+
+        if reason is None:
+            reason = ConnectionAbortedError(f'connection to {self._ip_addr}:{self._port} is closed')
+        while self._in_flight:
+            fut = self._in_flight.popleft()
+            if not fut.done():
+                fut.set_exception(reason)
+
+
+class _NodeConnectionPool:
+    """
+    Up to `pool_size` concurrent connections to a node.
+    If `pipelined`, they are persistent and the least loaded one serves each request.
+    Otherwise each request opens its own connection, which the node closes after the reply.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, node: Node,
+                 pool_size: int, max_in_flight: int, connect_timeout: float, pipelined: bool = False) -> None:
+        self._node = node
+        self._max_in_flight = max_in_flight
+        self._connect_timeout = connect_timeout
+        self._pipelined = pipelined
+        self._connections: List[_NodeConnection] = list()
+        if pipelined:
+            self._connections = [_NodeConnection(loop, node.ip_addr, int(node.port), connect_timeout)
+                                 for _ in range(pool_size)]
+            self._slots = asyncio.Semaphore(pool_size * max_in_flight)
+        else:
+            self._slots = asyncio.Semaphore(pool_size)
+
+    async def request(self, data: bytes, timeout: float) -> str:
+        async with self._slots:
+            if not self._pipelined:
+                return await self._request_once(data, timeout)
+            conn = min(self._connections, key=lambda c: (c.num_in_flight, not c.connected))
+            return await conn.request(data, timeout)
+
+    async def _request_once(self, data: bytes, timeout: float) -> str:
+        ip_addr, port = self._node.ip_addr, int(self._node.port)
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(ip_addr, port), self._connect_timeout)
+        try:
+            # no terminator, since the node reads the whole request with a single recv()
+            writer.write(data)
+            await writer.drain()
+            resp = await asyncio.wait_for(reader.read(1024), timeout)
+        finally:
+            writer.close()
+
+        if not resp:
+            raise ConnectionResetError(f'{ip_addr}:{port} closed the connection without a reply')
+        return resp.decode().strip()
+
+    def close(self) -> None:
+        for conn in self._connections:
+            conn.close()
+
+
+class JobDispatcher(Thread):
+    """
+    Non-blocking job dispatch engine.
+    It runs an asyncio event loop on its own thread and keeps up to `pool_size` connections to each node,
+    so a slow node only delays the jobs sent to that node.
+    The connections are long-lived and pipelined only if `pipelined` (see the node protocol above).
+    Completed dispatches (both acks and failures) are queued to `results` and picked up by the scheduler loop.
+    """
+
+    def __init__(self, pool_size: int = 2, max_in_flight: int = 32,
+                 request_timeout: float = 3.0, connect_timeout: float = 1.0, wakeup: Optional[Event] = None,
+                 pipelined: bool = False) -> None:
+        super().__init__(daemon=True)
+        self._pool_size = pool_size
+        self._max_in_flight = max_in_flight
+        self._pipelined = pipelined
+        self._request_timeout = request_timeout
+        self._connect_timeout = connect_timeout
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._ready = Event()
+        self._pools: Dict[Tuple[str, str], _NodeConnectionPool] = dict()
+        self._results: 'queue.Queue[DispatchResult]' = queue.Queue()
+        self._wakeup = wakeup
+
+    @property
+    def results(self) -> 'queue.Queue[DispatchResult]':
+        return self._results
+
+    def start(self) -> None:
+        super().start()
+        self._ready.wait()
+
+    def run(self) -> None:
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._ready.set()
+
+        logger = logging.getLogger(__name__)
+        logger.info('starting job dispatcher loop')
+        try:
+            self._loop.run_forever()
+        finally:
+            for pool in self._pools.values():
+                pool.close()
+            self._loop.close()
+
+    def stop(self) -> None:
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+    def dispatch(self, job: Job, node: Node) -> None:
+        """
+        Send `job` to `node` without blocking the caller.
+        This is thread-safe and the outcome is delivered through `results`.
+        :param job: job to dispatch
+        :param node: destination node
+        """
+        data = f'{job.name},{job.type},{job.preferences}'.encode()
+        asyncio.run_coroutine_threadsafe(self._dispatch(job, node, data), self._loop)
+
+    def _get_pool(self, node: Node) -> _NodeConnectionPool:
+        key = (node.ip_addr, node.port)
+        pool = self._pools.get(key)
+        if pool is None:
+            pool = _NodeConnectionPool(self._loop, node, self._pool_size, self._max_in_flight, self._connect_timeout,
+                                       self._pipelined)
+            self._pools[key] = pool
+        return pool
+
+    async def _dispatch(self, job: Job, node: Node, data: bytes) -> None:
+        logger = logging.getLogger(__name__)
+        try:
+            resp = await self._get_pool(node).request(data, self._request_timeout)
+        except Exception as e:
+            logger.warning(f'failed to dispatch {job.name} to {node.ip_addr}:{node.port}: {e!r}')
+            self._results.put(DispatchResult(job, node, None, e, time.time()))
+        else:
+            logger.info(f'Received from {resp} {node.ip_addr}:{node.port}!')
+            self._results.put(DispatchResult(job, node, resp, None, time.time()))
+
+        if self._wakeup is not None:
+            self._wakeup.set()
+
@@ -1,93 +1,197 @@
 #!/usr/bin/env python3
 # coding: UTF-8
 
+import argparse
 import sys
-import pika
 import json
 import logging
 import time
 
-from typing import Dict, Any
+from itertools import islice
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Union
 
 from pathlib import Path
-from logging import Handler, LogRecord
-from pika.adapters.blocking_connection import BlockingChannel
+
+from libs.broker import Broker, BrokerChannel, rabbitmq_broker
+from libs.jobs import Job
+from libs.wire import encode_jobs, job_to_csv
+
+
+def iter_job_file(job_file: Path) -> Iterator[Job]:
+    """
+    Stream the jobs of a job list file line by line, so that a large list is never loaded at once.
+    Each line is either a JSON object (`{"name": ..., "type": ..., "preferences": ..., "objective": ...}`)
+    or a CSV line (`name,type,preferences,objective`). Empty lines and lines starting with '#' are skipped.
+    """
+    logger = logging.getLogger(__name__)
+    with job_file.open() as job_file_fp:
+        for line_num, line in enumerate(job_file_fp, 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+
+            if line.startswith('{'):
+                job_cfg: Dict[str, Any] = json.loads(line)
+                yield Job(job_cfg['name'], job_cfg['type'], job_cfg['preferences'], job_cfg['objective'])
+                continue
+
+            arr = line.split(',')
+            if len(arr) != 4:
+                logger.warning(f'{job_file}:{line_num} is not a job: {line}')
+                continue
+            yield Job(*arr)
 
 
 class JobSubmitter:
-    def __init__(self, submit_interval: float):
+    """
+    Submits jobs to the cluster scheduler through a single connection and channel.
+
+    Unless `confirm` is False, the channel is in the publisher confirm mode,
+    so every publish returns after the broker has taken the message.
+    With the binary wire format (the default), a batch of jobs is a single message and costs a single confirm.
+    The CSV format costs a message and a confirm per job, since a blocking channel waits for the confirm of every
+    publish. It is only for the schedulers older than the binary format.
+    """
+
+    def __init__(self, submit_interval: float, wire_format: str = 'binary', batch_size: int = 100,
+                 host: str = 'localhost', max_retries: int = 3, confirm: bool = True,
+                 broker: Optional[Broker] = None):
         config_file = Path.cwd() / 'submit_config.json'
         self._job_cfg_file = config_file
-        self._job_requests: Dict[int, str] = None
-        self._job_submit_interval: float = submit_interval  # seconds
+        self._job_requests: List[Job] = None
+        self._job_submit_interval: float = submit_interval  # seconds between two batches
+        # binary: a frame per batch, csv: a message per job, for the schedulers which do not know the binary frames
+        self._wire_format = wire_format
+        self._batch_size = batch_size
+        self._max_retries = max_retries
+        self._confirm = confirm
+
+        self._broker: Broker = rabbitmq_broker(host) if broker is None else broker
+        self._queue_name: str = 'job_submission'
+        self._channel: Optional[BrokerChannel] = None
 
     @property
     def job_requests(self):
         return self._job_requests
 
-    def open_and_parse_config(self):
+    def open_and_parse_config(self, config_file: Optional[Path] = None) -> bool:
+        if config_file is not None:
+            self._job_cfg_file = config_file
         if not self._job_cfg_file.exists():
             print(f'{self._job_cfg_file.resolve()} is not exist.', file=sys.stderr)
             return False
 
-        job_requests: Dict[int, str] = dict()   # req_num : req_body
+        job_requests: List[Job] = list()
         with self._job_cfg_file.open() as job_config_fp:
             job_cfg_source: Dict[str, Any] = json.load(job_config_fp)
             job_cfgs = job_cfg_source['jobs']
-            for req_num, job_cfg in enumerate(job_cfgs):
+            for job_cfg in job_cfgs:
                 job_name = job_cfg['name']
                 job_type = job_cfg['type']
                 job_preferences = job_cfg['preferences']
                 job_objective = job_cfg['objective']
-                job_requests[req_num] = f'{job_name},{job_type},{job_preferences},{job_objective}'
-
-    @staticmethod
-    def do_submit(job_request: str):
-        RabbitMQHandler(job_request)
-
-
-class RabbitMQHandler(Handler):
-    def __init__(self, job_request: str):
-        super().__init__()
-        # TODO: upgrade to async version
-        self._connection = pika.BlockingConnection(pika.ConnectionParameters(host='localhost'))
-        self._channel: BlockingChannel = self._connection.channel()
-
-        self._queue_name: str = f'job_submission'
-        self._channel.queue_declare(queue=self._queue_name)
-
-        # Send job description to cluster scheduler's polling thread
-        self._channel.queue_declare(queue=self._queue_name)
-        self._channel.basic_publish(exchange='', routing_key=self._queue_name,
-                                    body=job_request)
-
-    def emit(self, record: LogRecord):
-        formatted: str = self.format(record)
-
-        self._channel.basic_publish(exchange='', routing_key=self._queue_name, body=formatted)
-
-    def close(self):
-        super().close()
-        try:
-            self._channel.queue_delete(self._queue_name)
-        except:
-            pass
-        self._connection.close()
-
-    def __repr__(self):
-        level = logging.getLevelName(self.level)
-        return f'<{self.__class__.__name__} {self._queue_name} ({level})>'
+                job_requests.append(Job(job_name, job_type, job_preferences, job_objective))
+
+        self._job_requests = job_requests
+        return True
+
+    def connect(self) -> None:
+        self._channel = self._broker.channel()
+        self._channel.queue_declare(self._queue_name)
+        if self._confirm:
+            self._channel.confirm_delivery()
+
+    def close(self) -> None:
+        if self._channel is not None and self._channel.is_open:
+            self._channel.close()
+        self._channel = None
+
+    def __enter__(self) -> 'JobSubmitter':
+        self.connect()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+    def _encode(self, jobs: List[Job]) -> List[Union[str, bytes]]:
+        if self._wire_format == 'binary':
+            return [encode_jobs(jobs)]
+        return [job_to_csv(job).encode() for job in jobs]
+
+    def _publish(self, body: Union[str, bytes]) -> None:
+        for attempt in range(1, self._max_retries + 1):
+            # with the publisher confirms, it returns False if the broker nacks or can not route the message
+            if self._channel.basic_publish(self._queue_name, body, mandatory=self._confirm):
+                return
+            logger = logging.getLogger(__name__)
+            logger.warning(f'a submission is not confirmed by the broker (attempt {attempt}/{self._max_retries})')
+        raise RuntimeError(f'a submission is not confirmed after {self._max_retries} attempts')
+
+    def publish(self, jobs: List[Job]) -> None:
+        """ Publish `jobs` right away as a single batch """
+        if self._channel is None:
+            self.connect()
+        for body in self._encode(jobs):
+            self._publish(body)
+
+    def do_submit(self, jobs: Iterable[Job]) -> int:
+        """
+        Publish `jobs` in batches of `batch_size`, waiting `submit_interval` seconds between two batches
+        :return: the number of the submitted jobs
+        """
+        if self._channel is None:
+            self.connect()
+
+        jobs = iter(jobs)
+        num_submitted = 0
+        while True:
+            batch = list(islice(jobs, self._batch_size))
+            if not batch:
+                return num_submitted
+
+            if num_submitted > 0 and self._job_submit_interval > 0:
+                time.sleep(self._job_submit_interval)
+            self.publish(batch)
+            num_submitted += len(batch)
 
 
 def main() -> None:
-    interval = 10.0
-    job_submitter = JobSubmitter(submit_interval=interval)
-    job_submitter.open_and_parse_config()
-
-    number_of_jobs = len(job_submitter.job_requests)
-    left_jobs = number_of_jobs
-    req_count = 0
-    while left_jobs:
-        time.sleep(interval)
-        job_req = job_submitter.job_requests[req_count]
-        job_submitter.do_submit(job_req)
+    parser = argparse.ArgumentParser(description='Submit jobs to the cluster scheduler.')
+    parser.add_argument('-c', '--config', dest='config', default='submit_config.json', type=str,
+                        help='job config file (JSON with a "jobs" list). (default : submit_config.json)')
+    parser.add_argument('-f', '--job-file', dest='job_file', default=None, type=str,
+                        help='stream jobs from this file instead of the config. '
+                             'One JSON object or CSV line (name,type,preferences,objective) per line')
+    parser.add_argument('-i', '--interval', dest='interval', default=10.0, type=float,
+                        help='seconds between two batches. (default : 10.0)')
+    parser.add_argument('-b', '--batch-size', dest='batch_size', default=1, type=int,
+                        help='number of jobs per batch. (default : 1)')
+    parser.add_argument('--wire-format', dest='wire_format', default='binary', choices=('csv', 'binary'),
+                        help='binary: a message per batch, csv: a message per job for the schedulers older than '
+                             'the binary format. (default : binary)')
+    parser.add_argument('--host', dest='host', default='localhost', type=str,
+                        help='host of the RabbitMQ server. (default : localhost)')
+    args = parser.parse_args()
+
+    logging.basicConfig(format='%(asctime)s [%(levelname)s]: %(message)s', level=logging.INFO)
+    logger = logging.getLogger(__name__)
+
+    job_submitter = JobSubmitter(args.interval, args.wire_format, args.batch_size, args.host)
+    if args.job_file is not None:
+        jobs: Iterable[Job] = iter_job_file(Path(args.job_file))
+    elif job_submitter.open_and_parse_config(Path(args.config)):
+        jobs = job_submitter.job_requests
+    else:
+        sys.exit(1)
+
+    with job_submitter:
+        start = time.perf_counter()
+        num_submitted = job_submitter.do_submit(jobs)
+        elapsed = time.perf_counter() - start
+
+    logger.info(f'{num_submitted} jobs are submitted in {elapsed:.3f}s '
+                f'({num_submitted / elapsed if elapsed > 0 else 0:.1f} jobs/s)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,7 @@
+# coding: UTF-8
+
+# `PikaBroker` is not imported here, so that importing this package does not require pika.
+# `rabbitmq_broker()` creates it, or import it from `libs.broker.pika_broker`
+from .base import Broker, BrokerChannel, ConsumerCallback, rabbitmq_broker
+from .batch import BatchCallback, BatchConsumer
+from .inproc import InProcBroker, InProcChannel
@@ -0,0 +1,81 @@
+# coding: UTF-8
+
+from abc import ABCMeta, abstractmethod
+from typing import Callable, Union
+
+# (channel, delivery tag, body)
+ConsumerCallback = Callable[['BrokerChannel', int, bytes], None]
+
+
+class BrokerChannel(metaclass=ABCMeta):
+    """
+    A channel to a message broker with the subset of AMQP that the scheduler uses.
+    Messages are published to and consumed from named queues directly (the default exchange of AMQP).
+    A channel must be used only by the thread which opened it, and the consumer callbacks and the timeouts run on
+    that thread while `start_consuming()` blocks.
+    """
+
+    @abstractmethod
+    def queue_declare(self, queue: str) -> None:
+        pass
+
+    @abstractmethod
+    def basic_qos(self, prefetch_count: int) -> None:
+        """ Stop delivering when `prefetch_count` messages are not acknowledged yet (0 means no limit) """
+        pass
+
+    @abstractmethod
+    def basic_consume(self, queue: str, callback: ConsumerCallback) -> None:
+        pass
+
+    @abstractmethod
+    def basic_publish(self, queue: str, body: Union[str, bytes], mandatory: bool = False) -> bool:
+        """
+        :return: False if the message is nacked by the broker, or it is not routed to any queue while `mandatory`.
+                 It is only known in the publisher confirm mode, so it is always True without `confirm_delivery()`
+        """
+        pass
+
+    @abstractmethod
+    def basic_ack(self, delivery_tag: int, multiple: bool = False) -> None:
+        pass
+
+    @abstractmethod
+    def confirm_delivery(self) -> None:
+        """ Turn on the publisher confirm mode """
+        pass
+
+    @abstractmethod
+    def add_timeout(self, delay: float, callback: Callable[[], None]) -> None:
+        """ Call `callback` once after `delay` seconds while consuming """
+        pass
+
+    @abstractmethod
+    def start_consuming(self) -> None:
+        pass
+
+    @abstractmethod
+    def stop_consuming(self) -> None:
+        pass
+
+    @abstractmethod
+    def close(self) -> None:
+        pass
+
+    @property
+    @abstractmethod
+    def is_open(self) -> bool:
+        pass
+
+
+class Broker(metaclass=ABCMeta):
+    @abstractmethod
+    def channel(self) -> BrokerChannel:
+        """ Open a channel for the calling thread """
+        pass
+
+
+def rabbitmq_broker(host: str = 'localhost') -> Broker:
+    """ The broker on RabbitMQ at `host`. pika is imported here, so the in-process broker works without it """
+    from .pika_broker import PikaBroker
+    return PikaBroker(host)
@@ -0,0 +1,101 @@
+# coding: UTF-8
+
+import functools
+from typing import Callable, List
+
+from .base import BrokerChannel
+
+# (channel, delivery tag of the last message, bodies)
+BatchCallback = Callable[[BrokerChannel, int, List[bytes]], None]
+
+
+class _Batch:
+    __slots__ = ('callback', 'bodies', 'last_tag')
+
+    def __init__(self, callback: BatchCallback) -> None:
+        self.callback = callback
+        self.bodies: List[bytes] = list()
+        self.last_tag: int = 0
+
+
+class BatchConsumer:
+    """
+    Deliver the messages of a channel to the consumer callbacks in batches.
+
+    A batch is handed over once `max_batch` messages are buffered on the channel or `max_delay` seconds after its
+    first message, so the per-message work of the callbacks (waking the scheduler up, updating the node index, ...)
+    is done once per batch.
+    With `auto_ack`, the whole channel is acknowledged with a single cumulative ack after every callback has
+    processed its batch. Otherwise, each callback acknowledges its batch itself with `multiple=True`, which is only
+    safe when it is the sole consumer of the channel.
+    """
+    def __init__(self, channel: BrokerChannel, prefetch_count: int = 256, max_batch: int = 64,
+                 max_delay: float = 0.005, auto_ack: bool = True) -> None:
+        self.check_batch_size(prefetch_count, max_batch)
+
+        self._channel = channel
+        self._max_batch = max_batch
+        self._max_delay = max_delay
+        self._auto_ack = auto_ack
+
+        self._batches: List[_Batch] = list()
+        self._num_buffered: int = 0
+        self._last_tag: int = 0
+        self._timer_armed: bool = False
+
+        channel.basic_qos(prefetch_count)
+
+    @staticmethod
+    def check_batch_size(prefetch_count: int, max_batch: int) -> None:
+        if max_batch < 1:
+            raise ValueError(f'max_batch should be positive: {max_batch}')
+        if prefetch_count != 0 and prefetch_count < max_batch:
+            # the broker would stop delivering before a batch is full, and every batch would wait for `max_delay`
+            raise ValueError(f'prefetch_count ({prefetch_count}) should not be less than max_batch ({max_batch})')
+
+    @property
+    def channel(self) -> BrokerChannel:
+        return self._channel
+
+    @property
+    def num_buffered(self) -> int:
+        return self._num_buffered
+
+    def consume(self, queue: str, callback: BatchCallback) -> None:
+        batch = _Batch(callback)
+        self._batches.append(batch)
+        self._channel.basic_consume(queue, functools.partial(self._on_message, batch))
+
+    def _on_message(self, batch: _Batch, ch: BrokerChannel, delivery_tag: int, body: bytes) -> None:
+        batch.bodies.append(body)
+        batch.last_tag = delivery_tag
+        self._last_tag = delivery_tag
+        self._num_buffered += 1
+
+        if self._num_buffered >= self._max_batch:
+            self.flush()
+        elif not self._timer_armed:
+            self._timer_armed = True
+            ch.add_timeout(self._max_delay, self._on_timeout)
+
+    def _on_timeout(self) -> None:
+        self._timer_armed = False
+        self.flush()
+
+    def flush(self) -> None:
+        """ Hand the buffered messages over to the callbacks """
+        if self._num_buffered == 0:
+            return
+
+        ch = self._channel
+        ready = [(batch, batch.bodies) for batch in self._batches if batch.bodies]
+        for batch, _ in ready:
+            batch.bodies = list()
+        self._num_buffered = 0
+
+        try:
+            for batch, bodies in ready:
+                batch.callback(ch, batch.last_tag, bodies)
+        finally:
+            if self._auto_ack:
+                ch.basic_ack(self._last_tag, multiple=True)
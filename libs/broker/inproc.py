@@ -0,0 +1,182 @@
+# coding: UTF-8
+
+import heapq
+import time
+from collections import OrderedDict, deque
+from itertools import count
+from threading import Event, Lock
+from typing import Callable, ClassVar, Deque, Dict, List, Optional, Tuple, Union
+
+from .base import Broker, BrokerChannel, ConsumerCallback
+
+
+class _InProcQueue:
+    __slots__ = ('messages', 'consumers')
+
+    def __init__(self) -> None:
+        self.messages: Deque[Union[str, bytes]] = deque()
+        self.consumers: List['InProcChannel'] = list()
+
+
+class InProcChannel(BrokerChannel):
+    _MAX_BATCH: ClassVar[int] = 64     # messages delivered from a queue before looking at the others and the timers
+
+    def __init__(self, broker: 'InProcBroker') -> None:
+        self._broker = broker
+        self._consumers: List[Tuple[_InProcQueue, ConsumerCallback]] = list()
+        self._prefetch_count: int = 0
+        self._unacked: 'OrderedDict[int, None]' = OrderedDict()
+        self._next_tag: int = 1
+        self._timers: List[Tuple[float, int, Callable[[], None]]] = list()     # heap of (deadline, seq, callback)
+        self._timer_seq = count()
+
+        self._wakeup = Event()
+        self._sleeping: bool = False
+        self._consuming: bool = False
+        self._open: bool = True
+
+    @property
+    def num_unacked(self) -> int:
+        return len(self._unacked)
+
+    def queue_declare(self, queue: str) -> None:
+        self._broker.declare(queue)
+
+    def basic_qos(self, prefetch_count: int) -> None:
+        self._prefetch_count = prefetch_count
+
+    def basic_consume(self, queue: str, callback: ConsumerCallback) -> None:
+        in_proc_queue = self._broker.declare(queue)
+        self._consumers.append((in_proc_queue, callback))
+        in_proc_queue.consumers.append(self)
+
+    def basic_publish(self, queue: str, body: Union[str, bytes], mandatory: bool = False) -> bool:
+        in_proc_queue = self._broker.find(queue)
+        if in_proc_queue is None:
+            # like the default exchange of AMQP, a message to an unknown queue is dropped
+            return not mandatory
+
+        in_proc_queue.messages.append(body)
+        for consumer in in_proc_queue.consumers:
+            if consumer._sleeping:
+                consumer._wakeup.set()
+        return True
+
+    def basic_ack(self, delivery_tag: int, multiple: bool = False) -> None:
+        unacked = self._unacked
+        if not multiple:
+            unacked.pop(delivery_tag, None)
+            return
+        while unacked and next(iter(unacked)) <= delivery_tag:
+            unacked.popitem(last=False)
+
+    def confirm_delivery(self) -> None:
+        # every message is taken by the queue at once
+        pass
+
+    def add_timeout(self, delay: float, callback: Callable[[], None]) -> None:
+        heapq.heappush(self._timers, (time.monotonic() + delay, next(self._timer_seq), callback))
+
+    def _run_timers(self) -> Optional[float]:
+        """ :return: seconds until the next timer, or None if there is no timer """
+        timers = self._timers
+        while timers:
+            deadline = timers[0][0]
+            now = time.monotonic()
+            if deadline > now:
+                return deadline - now
+            _, _, callback = heapq.heappop(timers)
+            callback()
+        return None
+
+    def _can_deliver(self) -> bool:
+        return self._prefetch_count == 0 or len(self._unacked) < self._prefetch_count
+
+    def _deliver(self) -> int:
+        num_delivered = 0
+        unacked = self._unacked
+        prefetch_count = self._prefetch_count
+        # a callback may add consumers
+        for in_proc_queue, callback in tuple(self._consumers):
+            messages = in_proc_queue.messages
+            for _ in range(self._MAX_BATCH):
+                if prefetch_count and len(unacked) >= prefetch_count:
+                    return num_delivered
+                try:
+                    body = messages.popleft()
+                except IndexError:
+                    break
+                tag = self._next_tag
+                self._next_tag = tag + 1
+                unacked[tag] = None
+                callback(self, tag, body)
+                num_delivered += 1
+        return num_delivered
+
+    def _has_messages(self) -> bool:
+        return self._can_deliver() and any(in_proc_queue.messages for in_proc_queue, _ in self._consumers)
+
+    def start_consuming(self) -> None:
+        self._consuming = True
+        while self._consuming:
+            timeout = self._run_timers()
+            if self._deliver() > 0:
+                continue
+
+            # publishers set the event only for a sleeping consumer, so check the queues again after announcing it
+            self._sleeping = True
+            if not self._has_messages():
+                self._wakeup.wait(timeout)
+                self._wakeup.clear()
+            self._sleeping = False
+
+    def stop_consuming(self) -> None:
+        self._consuming = False
+        self._wakeup.set()
+
+    def close(self) -> None:
+        self.stop_consuming()
+        for in_proc_queue, _ in self._consumers:
+            if self in in_proc_queue.consumers:
+                in_proc_queue.consumers.remove(self)
+        self._consumers.clear()
+        self._open = False
+
+    @property
+    def is_open(self) -> bool:
+        return self._open
+
+
+class InProcBroker(Broker):
+    """
+    Message broker within a process, to drive the scheduler without RabbitMQ in benchmarks and tests.
+
+    A queue is a deque, whose append and popleft are atomic, so the publishers and the consumers in different
+    threads never take a lock on the message path. A consumer which finds its queues empty sleeps on an event,
+    which is set by the next publish to its queues.
+    Unacknowledged messages are not redelivered when a channel is closed.
+    """
+
+    def __init__(self) -> None:
+        self._queues: Dict[str, _InProcQueue] = dict()
+        self._lock = Lock()     # only for declaring queues
+
+    def __repr__(self) -> str:
+        return f'{self.__class__.__name__}({len(self._queues)} queues)'
+
+    def channel(self) -> InProcChannel:
+        return InProcChannel(self)
+
+    def declare(self, queue: str) -> _InProcQueue:
+        in_proc_queue = self._queues.get(queue)
+        if in_proc_queue is None:
+            with self._lock:
+                in_proc_queue = self._queues.setdefault(queue, _InProcQueue())
+        return in_proc_queue
+
+    def find(self, queue: str) -> Optional[_InProcQueue]:
+        return self._queues.get(queue)
+
+    def queue_size(self, queue: str) -> int:
+        in_proc_queue = self._queues.get(queue)
+        return 0 if in_proc_queue is None else len(in_proc_queue.messages)
@@ -0,0 +1,69 @@
+# coding: UTF-8
+
+from typing import Callable, Union
+
+import pika
+from pika import BasicProperties
+from pika.adapters.blocking_connection import BlockingChannel
+from pika.spec import Basic
+
+from .base import Broker, BrokerChannel, ConsumerCallback
+
+
+class PikaChannel(BrokerChannel):
+    """ A channel on its own blocking connection to RabbitMQ (blocking connections are not thread-safe) """
+
+    def __init__(self, host: str) -> None:
+        self._connection = pika.BlockingConnection(pika.ConnectionParameters(host=host))
+        self._channel: BlockingChannel = self._connection.channel()
+
+    def queue_declare(self, queue: str) -> None:
+        self._channel.queue_declare(queue)
+
+    def basic_qos(self, prefetch_count: int) -> None:
+        self._channel.basic_qos(prefetch_count=prefetch_count)
+
+    def basic_consume(self, queue: str, callback: ConsumerCallback) -> None:
+        def on_message(_: BlockingChannel, method: Basic.Deliver, __: BasicProperties, body: bytes) -> None:
+            callback(self, method.delivery_tag, body)
+
+        self._channel.basic_consume(on_message, queue)
+
+    def basic_publish(self, queue: str, body: Union[str, bytes], mandatory: bool = False) -> bool:
+        return self._channel.basic_publish(exchange='', routing_key=queue, body=body, mandatory=mandatory)
+
+    def basic_ack(self, delivery_tag: int, multiple: bool = False) -> None:
+        self._channel.basic_ack(delivery_tag, multiple=multiple)
+
+    def confirm_delivery(self) -> None:
+        self._channel.confirm_delivery()
+
+    def add_timeout(self, delay: float, callback: Callable[[], None]) -> None:
+        self._connection.add_timeout(delay, callback)
+
+    def start_consuming(self) -> None:
+        self._channel.start_consuming()
+
+    def stop_consuming(self) -> None:
+        self._channel.stop_consuming()
+
+    def close(self) -> None:
+        if self._channel.is_open:
+            self._channel.close()
+        if self._connection.is_open:
+            self._connection.close()
+
+    @property
+    def is_open(self) -> bool:
+        return self._connection.is_open and self._channel.is_open
+
+
+class PikaBroker(Broker):
+    def __init__(self, host: str = 'localhost') -> None:
+        self._host = host
+
+    def __repr__(self) -> str:
+        return f'{self.__class__.__name__}({self._host})'
+
+    def channel(self) -> PikaChannel:
+        return PikaChannel(self._host)
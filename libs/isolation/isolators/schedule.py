@@ -7,7 +7,6 @@ from .base import Isolator
 from ...metric_container.basic_metric import MetricDiff
 from ...workload import Workload
 from ...utils.machine_type import MachineChecker, NodeType
-from ...metric_container.basic_metric import BasicMetric
 
 
 class SchedIsolator(Isolator):
@@ -92,7 +91,7 @@ class SchedIsolator(Isolator):
         max_membw = -1
         max_membw_bg = None
         for bg_wl, _ in self._cur_step.items():
-            avg_bg_wl_statistics = BasicMetric.calc_avg(bg_wl.metrics, 30)
+            avg_bg_wl_statistics = bg_wl.metrics.mean(30)
             bg_wl_membw = avg_bg_wl_statistics.llc_miss_ps
             # FIXME: currently, this func. selects max membw bg_wl with at least two cores
             if bg_wl_membw > max_membw and bg_wl.num_cores > 1:
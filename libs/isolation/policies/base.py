@@ -1,23 +1,43 @@
 # coding: UTF-8
 
 import logging
+import time
 from abc import ABCMeta, abstractmethod
-from typing import ClassVar, Dict, Tuple, Type, Set
+from typing import ClassVar, Dict, NamedTuple, Optional, Tuple, Type, Set
 
 from .. import ResourceType
 from ..isolators import Isolator, IdleIsolator, CycleLimitIsolator, FreqThrottleIsolator, SchedIsolator
 # from ..isolators import CacheIsolator, IdleIsolator, Isolator, MemoryIsolator, SchedIsolator
 # from ..isolators.affinity import AffinityIsolator
-from ...metric_container.basic_metric import BasicMetric, MetricDiff
-from ...workload import Workload
+from ...metric_container.basic_metric import MetricDiff
+from ...metric_container.metric_stats import RunningMean
+from ...solorun_data.profile_cache import ProfileCacheKey, SoloRunProfileCache, default_profile_cache
+from ...workload import MetricDiffCacheInfo, Workload
+from ...utils.machine_profile import get_machine_profile
 from ...utils.machine_type import MachineChecker, NodeType
 
 
+class SoloRunPauseInfo(NamedTuple):
+    profilings: int
+    samples: int        # the solorun metrics collected
+    paused: float       # seconds which the backgrounds were paused for
+    saved: float        # seconds of pause which the early stops saved, against the profiling window of the caller
+
+
 class IsolationPolicy(metaclass=ABCMeta):
     _IDLE_ISOLATOR: ClassVar[IdleIsolator] = IdleIsolator()
     _VERIFY_THRESHOLD: ClassVar[int] = 3
 
-    def __init__(self, fg_wl: Workload, bg_wls: Set[Workload]) -> None:
+    # A solorun profiling can stop once the means of the IPC and the LLC miss ratio are known within
+    # `_SOLORUN_TOLERANCE` (relative half width of their 95% confidence intervals), after `_SOLORUN_MIN_SAMPLES`
+    # metrics at least. It stops after `_SOLORUN_MAX_SAMPLES` metrics anyway
+    _SOLORUN_MIN_SAMPLES: ClassVar[int] = 10
+    _SOLORUN_MAX_SAMPLES: ClassVar[int] = 100
+    _SOLORUN_TOLERANCE: ClassVar[float] = 0.02
+    _SOLORUN_CONFIDENCE_Z: ClassVar[float] = 1.96
+
+    def __init__(self, fg_wl: Workload, bg_wls: Set[Workload],
+                 profile_cache: Optional[SoloRunProfileCache] = None) -> None:
         self._fg_wl = fg_wl
         self._bg_wls = bg_wls
 
@@ -37,6 +57,17 @@ class IsolationPolicy(metaclass=ABCMeta):
         self._in_solorun_profile: bool = False
         self._cached_fg_num_threads: int = fg_wl.number_of_threads
         self._solorun_verify_violation_count: int = 0
+        # the profiles measured before, so that a recurring foreground skips the solorun profiling
+        self._profile_cache = default_profile_cache() if profile_cache is None else profile_cache
+        # the key of the cached profile which the solorun data of the foreground came from
+        self._cached_profile_key: Optional[ProfileCacheKey] = None
+
+        # the estimates of the ongoing solorun profiling
+        self._solorun_ipc = RunningMean()
+        self._solorun_llc_miss_ratio = RunningMean()
+        self._solorun_epoch: int = 0        # the epoch of the metrics of the foreground which are estimated
+        self._solorun_started_at: float = 0
+        self._solorun_pause_info = SoloRunPauseInfo(0, 0, 0, 0)
 
     def __hash__(self) -> int:
         return id(self)
@@ -69,6 +100,9 @@ class IsolationPolicy(metaclass=ABCMeta):
         # logger.info(f'backgrounds : {self._bg_wl.calc_metric_diff()}')
         for idx, bg_wl in enumerate(self._bg_wls):
             logger.info(f'background[{idx}] : {bg_wl.calc_metric_diff()}')
+        cache_info = self.metric_diff_cache_info()
+        logger.debug(f'metric diff cache: {cache_info.hits} hits, {cache_info.misses} misses '
+                     f'(hit rate: {cache_info.hit_rate:.2%})')
 
         resources = ((ResourceType.CACHE, metric_diff.llc_hit_ratio),
                      (ResourceType.MEMORY, metric_diff.local_mem_util_ps))
@@ -79,6 +113,12 @@ class IsolationPolicy(metaclass=ABCMeta):
         else:
             return tuple(sorted(resources, key=lambda x: x[1]))
 
+    def metric_diff_cache_info(self) -> MetricDiffCacheInfo:
+        """ The hits and the misses of the `MetricDiff` caches of the workloads in this group """
+        infos = [self._fg_wl.metric_diff_cache_info()]
+        infos.extend(bg_wl.metric_diff_cache_info() for bg_wl in self._bg_wls)
+        return MetricDiffCacheInfo(sum(info.hits for info in infos), sum(info.misses for info in infos))
+
     @property
     def foreground_workload(self) -> Workload:
         return self._fg_wl
@@ -148,20 +188,34 @@ class IsolationPolicy(metaclass=ABCMeta):
             bg_wl.pause()
 
         self._fg_wl.metrics.clear()
+        self._solorun_ipc.reset()
+        self._solorun_llc_miss_ratio.reset()
+        self._solorun_epoch = self._fg_wl.metrics.epoch
+        self._solorun_started_at = time.monotonic()
 
         # store current configuration
         for isolator in self._isolator_map.values():
             isolator.store_cur_config()
             isolator.reset()
 
-    def stop_solorun_profiling(self) -> None:
+    def stop_solorun_profiling(self, window: Optional[float] = None) -> None:
+        """
+        :param window: seconds which the caller would have profiled for without the early stop, to account the pause
+                       saved by stopping now. Nothing is accounted as saved if it is None
+        """
         if not self._in_solorun_profile:
             raise ValueError('Start solorun profiling first!')
 
         logger = logging.getLogger(__name__)
-        logger.debug(f'number of collected solorun data: {len(self._fg_wl.metrics)}')
-        self._fg_wl.avg_solorun_data = BasicMetric.calc_avg(self._fg_wl.metrics, len(self._fg_wl.metrics))
+        # every metric since the profiling started, even if more than the buffer holds
+        stats = self._fg_wl.metrics.stats
+        logger.debug(f'number of collected solorun data: {len(stats)}')
+        self._report_solorun_pause(len(stats), window)
+        self._fg_wl.avg_solorun_data = stats.mean()
+        self._cached_profile_key = None
         logger.debug(f'calculated average solorun data: {self._fg_wl.avg_solorun_data}')
+        self._profile_cache.put(self._solorun_profile_key(self._cached_fg_num_threads),
+                                stats.mean_row().tolist(), stats.std_row().tolist(), len(stats))
 
         logger.debug('Enforcing restored configuration...')
         # restore stored configuration
@@ -176,6 +230,61 @@ class IsolationPolicy(metaclass=ABCMeta):
 
         self._in_solorun_profile = False
 
+    def solorun_profile_converged(self) -> bool:
+        """
+        Update the estimates of the solorun IPC and LLC miss ratio with the metrics arrived since the last call.
+        It is O(1) per metric, so it can be called whenever a metric of the foreground arrives.
+        `poll_solorun_profiling()` calls it and stops the profiling for the caller
+        :return: Decision whether the ongoing solorun profiling has collected enough metrics to stop
+        """
+        if not self._in_solorun_profile:
+            raise ValueError('Start solorun profiling first!')
+
+        metrics = self._fg_wl.metrics
+        num_new = min(metrics.epoch - self._solorun_epoch, len(metrics))
+        self._solorun_epoch = metrics.epoch
+        if num_new > 0:
+            for llc_references, llc_misses, instructions, cycles, *_ in metrics.window(num_new).tolist():
+                if cycles != 0:
+                    self._solorun_ipc.update(instructions / cycles)
+                self._solorun_llc_miss_ratio.update(llc_misses / llc_references if llc_references != 0 else 0)
+
+        num_samples = len(metrics.stats)
+        if num_samples >= self._SOLORUN_MAX_SAMPLES:
+            return True
+        return num_samples >= self._SOLORUN_MIN_SAMPLES and \
+            self._solorun_ipc.converged(self._SOLORUN_TOLERANCE, self._SOLORUN_CONFIDENCE_Z) and \
+            self._solorun_llc_miss_ratio.converged(self._SOLORUN_TOLERANCE, self._SOLORUN_CONFIDENCE_Z)
+
+    def poll_solorun_profiling(self, window: float) -> bool:
+        """
+        Stop the ongoing solorun profiling as soon as its baseline converges, or once `window` seconds have passed.
+        The controller calls this periodically after `start_solorun_profiling()`, instead of stopping the profiling
+        after `window` seconds by itself
+        :param window: the longest seconds to profile, which the controller would have profiled for otherwise
+        :return: Decision whether the profiling is stopped
+        """
+        if self.solorun_profile_converged() or time.monotonic() - self._solorun_started_at >= window:
+            self.stop_solorun_profiling(window)
+            return True
+        return False
+
+    def _report_solorun_pause(self, num_samples: int, window: Optional[float]) -> None:
+        paused = time.monotonic() - self._solorun_started_at
+        # the rest of the window which the backgrounds would have been paused for without the early stop
+        saved = 0.0 if window is None else max(window - paused, 0.0)
+
+        info = self._solorun_pause_info
+        self._solorun_pause_info = SoloRunPauseInfo(info.profilings + 1, info.samples + num_samples,
+                                                    info.paused + paused, info.saved + saved)
+        logger = logging.getLogger(__name__)
+        logger.info(f'solorun profiling of {self.name}: {num_samples} metrics, backgrounds paused for {paused:.2f}s '
+                    f'({saved:.2f}s saved)')
+
+    def solorun_pause_info(self) -> SoloRunPauseInfo:
+        """ The pause of the backgrounds by the solorun profilings of this group so far """
+        return self._solorun_pause_info
+
     def profile_needed(self) -> bool:
         """
         This function checks if the profiling procedure should be called
@@ -184,6 +293,8 @@ class IsolationPolicy(metaclass=ABCMeta):
         logger = logging.getLogger(__name__)
 
         if self._fg_wl.avg_solorun_data is None:
+            if self._load_cached_profile(self._fg_wl.number_of_threads):
+                return False
             logger.debug('initialize solorun data')
             return True
 
@@ -192,15 +303,38 @@ class IsolationPolicy(metaclass=ABCMeta):
 
             if self._solorun_verify_violation_count == self._VERIFY_THRESHOLD:
                 logger.debug(f'fail to verify solorun data. {{{self._fg_wl.calc_metric_diff()}}}')
+                if self._cached_profile_key is not None:
+                    # the cached profile does not describe the workload any more
+                    self._profile_cache.invalidate(self._cached_profile_key)
+                    self._cached_profile_key = None
                 return True
 
         cur_num_threads = self._fg_wl.number_of_threads
         if cur_num_threads is not 0 and self._cached_fg_num_threads != cur_num_threads:
             logger.debug(f'number of threads. cached: {self._cached_fg_num_threads}, current : {cur_num_threads}')
-            return True
+            return not self._load_cached_profile(cur_num_threads)
 
         return False
 
+    def _solorun_profile_key(self, num_threads: int) -> ProfileCacheKey:
+        return ProfileCacheKey(self._fg_wl.name, num_threads, get_machine_profile().node_class, self._fg_wl.num_cores)
+
+    def _load_cached_profile(self, num_threads: int) -> bool:
+        """ Use the cached solorun profile of the foreground with `num_threads` threads if there is a usable one """
+        key = self._solorun_profile_key(num_threads)
+        profile = self._profile_cache.get(key)
+        if profile is None:
+            return False
+
+        logger = logging.getLogger(__name__)
+        logger.debug(f'use the cached solorun data of {key} ({profile.num_samples} metrics, '
+                     f'{profile.age() / 60:.0f} minutes old)')
+        self._fg_wl.avg_solorun_data = profile.metric
+        self._cached_fg_num_threads = num_threads
+        self._cached_profile_key = key
+        self._solorun_verify_violation_count = 0
+        return True
+
     # Swapper related
 
     @property
@@ -1,16 +1,19 @@
 # coding: UTF-8
 
 import logging
+from typing import Optional
 
 from .base import IsolationPolicy
 from .. import ResourceType
 from ..isolators import CacheIsolator, IdleIsolator, MemoryIsolator, SchedIsolator
+from ...solorun_data.profile_cache import SoloRunProfileCache
 from ...workload import Workload
 
 
 class ConservativePolicy(IsolationPolicy):
-    def __init__(self, fg_wl: Workload, bg_wl: Workload) -> None:
-        super().__init__(fg_wl, bg_wl)
+    def __init__(self, fg_wl: Workload, bg_wl: Workload,
+                 profile_cache: Optional[SoloRunProfileCache] = None) -> None:
+        super().__init__(fg_wl, bg_wl, profile_cache)
 
         self._is_llc_isolated = False
         self._is_mem_isolated = False
@@ -1,19 +1,21 @@
 # coding: UTF-8
 
 import logging
-from typing import ClassVar
+from typing import ClassVar, Optional
 
 from .conservative import ConservativePolicy
 from .. import ResourceType
 from ..isolators import CacheIsolator, IdleIsolator, MemoryIsolator, SchedIsolator
+from ...solorun_data.profile_cache import SoloRunProfileCache
 from ...workload import Workload
 
 
 class ConservativeWViolationPolicy(ConservativePolicy):
     VIOLATION_THRESHOLD: ClassVar[int] = 3
 
-    def __init__(self, fg_wl: Workload, bg_wl: Workload) -> None:
-        super().__init__(fg_wl, bg_wl)
+    def __init__(self, fg_wl: Workload, bg_wl: Workload,
+                 profile_cache: Optional[SoloRunProfileCache] = None) -> None:
+        super().__init__(fg_wl, bg_wl, profile_cache)
 
         self._violation_count: int = 0
 
@@ -2,18 +2,20 @@
 
 import logging
 
-from typing import Set
+from typing import Optional, Set
 
 from .base import IsolationPolicy
 from .. import ResourceType
 from ..isolators import IdleIsolator, CycleLimitIsolator, FreqThrottleIsolator, SchedIsolator
+from ...solorun_data.profile_cache import SoloRunProfileCache
 from ...workload import Workload
 from ...utils.machine_type import NodeType
 
 
 class EdgePolicy(IsolationPolicy):
-    def __init__(self, fg_wl: Workload, bg_wls: Set[Workload]) -> None:
-        super().__init__(fg_wl, bg_wls)
+    def __init__(self, fg_wl: Workload, bg_wls: Set[Workload],
+                 profile_cache: Optional[SoloRunProfileCache] = None) -> None:
+        super().__init__(fg_wl, bg_wls, profile_cache)
 
         self._is_mem_isolated = False
 
@@ -1,3 +1,6 @@
 # coding: UTF-8
 
+from .ack_log import DispatchAckLog
 from .base import Job
+from .state import JobState
+from .table import JobTable
@@ -0,0 +1,35 @@
+# coding: UTF-8
+
+import csv
+from pathlib import Path
+from typing import ClassVar, Tuple, Union
+
+from .base import Job
+
+
+class DispatchAckLog:
+    """
+    CSV log of the acked dispatches. `load_generator.py report` joins it with the submission log of the load
+    generator by the submit id to get the submit-to-dispatch latency.
+    The rows are buffered and written by `flush()`, which the scheduler calls once per scheduling round.
+    """
+    FIELDS: ClassVar[Tuple[str, ...]] = \
+        ('submit_id', 'job_id', 'name', 'objective', 'submit_time', 'acked_at', 'dispatch_attempts')
+
+    def __init__(self, path: Union[str, Path]) -> None:
+        path = Path(path)
+        is_new = not path.exists() or path.stat().st_size == 0
+        self._fp = path.open('a', newline='')
+        self._writer = csv.writer(self._fp)
+        if is_new:
+            self._writer.writerow(self.FIELDS)
+
+    def record(self, job: Job, acked_at: float) -> None:
+        self._writer.writerow((job.submit_id or '', job.job_id, job.name, job.objective,
+                               f'{job.submit_time:.6f}', f'{acked_at:.6f}', job.dispatch_attempts))
+
+    def flush(self) -> None:
+        self._fp.flush()
+
+    def close(self) -> None:
+        self._fp.close()
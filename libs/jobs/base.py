@@ -1,16 +1,44 @@
 # coding: UTF-8
 
+import time
+from itertools import count
+from typing import Optional
+
+from .state import JobState
+
 
 class Job:
+    _id_counter = count()
 
-    def __init__(self, job_name: str, job_type: str, job_preferences: str, job_objective) -> None:
+    def __init__(self, job_name: str, job_type: str, job_preferences: str, job_objective,
+                 submit_time: Optional[float] = None, job_id: Optional[int] = None,
+                 submit_id: Optional[str] = None) -> None:
+        # job_id is given only when the job is restored from the write-ahead log
+        self._job_id: int = next(Job._id_counter) if job_id is None else job_id
         self._name = job_name                   # workload name (e.g., SparkDSLRCpu)
         self._type = job_type                   # fg or bg
         # job_preferences: cpu or gpu; If gpu is selected, the cluster scheduler will dispatch this job to GPU Node
         self._preferences = job_preferences
         self._objective = job_objective  # latency or throughput
+        self._submit_time: float = time.time() if submit_time is None else submit_time
+        # given by the submitter to match the job with its submission (e.g., for latency measurements)
+        self._submit_id: Optional[str] = submit_id
         self._dest_ip = None
         self._dest_port = None
+        self._state: JobState = JobState.PENDING
+        self._dispatch_attempts: int = 0
+
+    @classmethod
+    def advance_id_counter(cls, next_id: int) -> None:
+        """ Make sure that the ids of the jobs created from now on are `next_id` or larger """
+        cls._id_counter = count(max(next_id, next(cls._id_counter)))
+
+    def __repr__(self) -> str:
+        return f'{self._name} (id: {self._job_id}, {self._state.name})'
+
+    @property
+    def job_id(self) -> int:
+        return self._job_id
 
     @property
     def name(self):
@@ -28,6 +56,14 @@ class Job:
     def objective(self):
         return self._objective
 
+    @property
+    def submit_time(self) -> float:
+        return self._submit_time
+
+    @property
+    def submit_id(self) -> Optional[str]:
+        return self._submit_id
+
     @property
     def dest_ip(self):
         return self._dest_ip
@@ -36,6 +72,14 @@ class Job:
     def dest_port(self):
         return self._dest_port
 
+    @property
+    def state(self) -> JobState:
+        return self._state
+
+    @property
+    def dispatch_attempts(self) -> int:
+        return self._dispatch_attempts
+
     @dest_ip.setter
     def dest_ip(self, new_ip):
         self._dest_ip = new_ip
@@ -43,3 +87,11 @@ class Job:
     @dest_port.setter
     def dest_port(self, new_port):
         self._dest_port = new_port
+
+    @state.setter
+    def state(self, new_state: JobState):
+        self._state = new_state
+
+    @dispatch_attempts.setter
+    def dispatch_attempts(self, attempts: int):
+        self._dispatch_attempts = attempts
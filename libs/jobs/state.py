@@ -0,0 +1,37 @@
+# coding: UTF-8
+
+from enum import IntEnum
+from typing import Dict, FrozenSet
+
+
+class JobState(IntEnum):
+    PENDING = 0         # waiting for placement
+    PLACING = 1         # a destination node is being chosen
+    DISPATCHED = 2      # sent to the destination node, waiting for its ack
+    ACKED = 3           # the destination node has accepted the job
+    RUNNING = 4
+    FINISHED = 5
+    FAILED = 6
+
+    @property
+    def is_terminal(self) -> bool:
+        return self in (JobState.FINISHED, JobState.FAILED)
+
+    @property
+    def is_retired(self) -> bool:
+        """
+        The scheduler has nothing more to do with the job: the node has accepted it (the scheduler is not told when
+        it finishes) or it has failed. Retired jobs are kept in a bounded history
+        """
+        return self >= JobState.ACKED
+
+
+ALLOWED_TRANSITIONS: Dict[JobState, FrozenSet[JobState]] = {
+    JobState.PENDING: frozenset((JobState.PLACING, JobState.FAILED)),
+    JobState.PLACING: frozenset((JobState.DISPATCHED, JobState.PENDING, JobState.FAILED)),
+    JobState.DISPATCHED: frozenset((JobState.ACKED, JobState.PENDING, JobState.FAILED)),
+    JobState.ACKED: frozenset((JobState.RUNNING, JobState.FINISHED, JobState.FAILED)),
+    JobState.RUNNING: frozenset((JobState.FINISHED, JobState.FAILED)),
+    JobState.FINISHED: frozenset(),
+    JobState.FAILED: frozenset(),
+}
@@ -0,0 +1,88 @@
+# coding: UTF-8
+
+import logging
+from collections import OrderedDict, deque
+from typing import Callable, Deque, Dict, Optional, Sized, Tuple
+
+from .base import Job
+from .state import ALLOWED_TRANSITIONS, JobState
+
+
+class JobTable(Sized):
+    """
+    Jobs indexed by their lifecycle state.
+    Each state keeps its jobs in arrival order, so the scheduler only visits the jobs of the state it is interested in.
+    Jobs that are retired (acked by their node, finished or failed) are moved to a bounded history,
+    so the table only grows with the jobs which the scheduler is still working on.
+    `on_transition` is called with the job after each transition (e.g., to write it to the write-ahead log).
+    """
+
+    def __init__(self, history_size: int = 1000, on_transition: Optional[Callable[[Job], None]] = None) -> None:
+        self._jobs_by_state: Dict[JobState, 'OrderedDict[int, Job]'] = \
+            dict((state, OrderedDict()) for state in JobState if not state.is_retired)
+        self._history: Deque[Job] = deque(maxlen=history_size)
+        self._on_transition = on_transition
+
+    def __len__(self) -> int:
+        return sum(len(jobs) for jobs in self._jobs_by_state.values())
+
+    def __contains__(self, job: Job) -> bool:
+        jobs = self._jobs_by_state.get(job.state)
+        return jobs is not None and job.job_id in jobs
+
+    @property
+    def history(self) -> Tuple[Job, ...]:
+        return tuple(self._history)
+
+    def add(self, job: Job) -> None:
+        if job.state.is_retired:
+            self._history.append(job)
+        else:
+            self._jobs_by_state[job.state][job.job_id] = job
+
+    def remove(self, job: Job) -> None:
+        """ Forget a job which is not retired (e.g., returned to the pending queue) """
+        del self._jobs_by_state[job.state][job.job_id]
+
+    def jobs_in(self, state: JobState) -> Tuple[Job, ...]:
+        if state.is_retired:
+            return tuple(job for job in self._history if job.state is state)
+        return tuple(self._jobs_by_state[state].values())
+
+    def num_jobs_in(self, state: JobState) -> int:
+        if state.is_retired:
+            return sum(1 for job in self._history if job.state is state)
+        return len(self._jobs_by_state[state])
+
+    def get(self, job_id: int) -> Optional[Job]:
+        for jobs in self._jobs_by_state.values():
+            if job_id in jobs:
+                return jobs[job_id]
+        return None
+
+    def transition(self, job: Job, new_state: JobState) -> None:
+        """
+        Move `job` to `new_state`
+        :param job: job which is in this table
+        :param new_state: the next state of the job
+        :return:
+        """
+        cur_state = job.state
+        if new_state not in ALLOWED_TRANSITIONS[cur_state]:
+            raise ValueError(f'{job} can not move from {cur_state.name} to {new_state.name}')
+
+        # a retired job stays where it is in the history (or has already left it)
+        if not cur_state.is_retired:
+            del self._jobs_by_state[cur_state][job.job_id]
+        job.state = new_state
+
+        logger = logging.getLogger(__name__)
+        logger.debug(f'{job.name} (id: {job.job_id}) : {cur_state.name} -> {new_state.name}')
+
+        if not new_state.is_retired:
+            self._jobs_by_state[new_state][job.job_id] = job
+        elif not cur_state.is_retired:
+            self._history.append(job)
+
+        if self._on_transition is not None:
+            self._on_transition(job)
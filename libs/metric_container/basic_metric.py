@@ -1,19 +1,17 @@
 # coding: UTF-8
 
-from statistics import mean
-from typing import Iterable
+from typing import Iterable, Tuple
 from itertools import islice
 
-from cpuinfo import cpuinfo
+from ..utils.machine_profile import get_machine_profile
 from ..utils.machine_type import MachineChecker, NodeType
 
 NODE_TYPE = MachineChecker.get_node_type()
 
-# LLC_SIZE = int(cpuinfo.get_cpu_info()['l3_cache_size'].split()[0]) * 1024  # Xeon Server (BC5) LLC (L3 Cache)
-if NODE_TYPE == NodeType.IntegratedGPU:
-    LLC_SIZE = int(cpuinfo.get_cpu_info()['l2_cache_size'].split()[0]) * 1024   # JETSON TX2 LLC (L2Cache)
-elif NODE_TYPE == NodeType.CPU:
-    LLC_SIZE = int(cpuinfo.get_cpu_info()['l3_cache_size'].split()[0]) * 1024  # Desktop (SDC) LLC (L3Cache)
+
+def llc_size() -> int:
+    """ LLC size in bytes: the L3 cache of the desktop (SDC) or the server (BC5), the L2 cache of Jetson TX2 """
+    return get_machine_profile().llc_size
 
 
 class BasicMetric:
@@ -31,18 +29,20 @@ class BasicMetric:
 
     @classmethod
     def calc_avg(cls, metrics: Iterable['BasicMetric'], metric_num: int) -> 'BasicMetric':
-            metrics = list(islice(metrics, 0, metric_num))
-            return BasicMetric(
-                    mean(metric._llc_references for metric in metrics),
-                    mean(metric._llc_misses for metric in metrics),
-                    mean(metric._instructions for metric in metrics),
-                    mean(metric._cycles for metric in metrics),
-                    mean(metric._gpu_core_util for metric in metrics),
-                    mean(metric._gpu_core_freq for metric in metrics),
-                    mean(metric._gpu_emc_util for metric in metrics),
-                    mean(metric._gpu_emc_freq for metric in metrics),
-                    mean(metric._interval for metric in metrics),
-            )
+        """
+        Average the first `metric_num` metrics in a single pass.
+        The metrics which are kept in `MetricRingBuffer` should be averaged by its `mean()` or `stats` instead
+        """
+        rows = [metric.as_tuple() for metric in islice(metrics, 0, metric_num)]
+        if len(rows) == 0:
+            raise ValueError('calc_avg requires at least one metric')
+        return BasicMetric(*(sum(column) / len(rows) for column in zip(*rows)))
+
+    def as_tuple(self) -> Tuple:
+        """ The values in the order of the constructor arguments """
+        return (self._llc_references, self._llc_misses, self._instructions, self._cycles,
+                self._gpu_core_util, self._gpu_core_freq, self._gpu_emc_util, self._gpu_emc_freq,
+                self._interval)
 
     @property
     def llc_references(self):
@@ -68,6 +68,10 @@ class BasicMetric:
     def gpu_emc_freq(self):
         return self._gpu_emc_freq
 
+    @property
+    def interval(self):
+        return self._interval
+
     @property
     def llc_miss_ps(self) -> float:
         return self._llc_misses * (1000 / self._interval)
@@ -80,6 +84,10 @@ class BasicMetric:
     def instruction_ps(self):
         return self._instructions * (1000 / self._interval)
 
+    @property
+    def cycles(self):
+        return self._cycles
+
     @property
     def ipc(self) -> float:
         return self._instructions / self._cycles
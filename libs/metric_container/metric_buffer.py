@@ -0,0 +1,153 @@
+# coding: UTF-8
+
+from typing import ClassVar, Dict, Iterable, Iterator, Optional, Tuple
+
+import numpy as np
+
+from .basic_metric import BasicMetric
+from .metric_stats import MetricStats
+
+
+class MetricRingBuffer:
+    """
+    The last `capacity` metrics of a node or a workload, a column per counter of `BasicMetric`.
+
+    It is a drop-in replacement for the deques of `BasicMetric` which the metrics were kept in: `appendleft()` adds
+    the newest metric, and indexing and iteration go from the newest to the oldest. The oldest metric is dropped
+    once the buffer is full.
+    Every row is written twice, at its slot and `capacity` rows after, so the last `n` metrics are always
+    contiguous and `window(n)` returns a view of them without copying. It takes 2 * capacity * 9 floats.
+
+    The sums of the last `n` metrics are kept for every `n` of `windows` as the metrics arrive, so `mean(n)` of such
+    a window is O(1). The other windows are averaged over their views. `stats` is updated with every metric.
+    """
+    COLUMNS: ClassVar[Tuple[str, ...]] = ('llc_references', 'llc_misses', 'instruction', 'cycles', 'gpu_core_util',
+                                          'gpu_core_freq', 'gpu_mem_util', 'gpu_emc_freq', 'interval')
+
+    def __init__(self, capacity: int, windows: Iterable[int] = (), stats: Optional[MetricStats] = None) -> None:
+        if capacity < 1:
+            raise ValueError(f'capacity should be positive: {capacity}')
+
+        self._capacity = capacity
+        self._data = np.zeros((2 * capacity, len(self.COLUMNS)), dtype=np.float64)
+        self._pos: int = 0      # slot of the next metric
+        self._len: int = 0
+        self._epoch: int = 0    # changed whenever the newest metric is changed
+
+        self._window_sums: Dict[int, np.ndarray] = dict()
+        for window in windows:
+            if not 0 < window <= capacity:
+                raise ValueError(f'window should be in [1, {capacity}]: {window}')
+            self._window_sums[window] = np.zeros(len(self.COLUMNS))
+        # the sums are recomputed once every `capacity` metrics, so that the rounding errors do not accumulate
+        self._appends_to_resync: int = capacity
+        self._stats = stats
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __bool__(self) -> bool:
+        return self._len > 0
+
+    def __getitem__(self, idx: int) -> BasicMetric:
+        """ The `idx`-th newest metric (0 is the newest, -1 is the oldest) """
+        if idx < 0:
+            idx += self._len
+        if not 0 <= idx < self._len:
+            raise IndexError('metric index out of range')
+        return BasicMetric(*self._data[self._pos + self._capacity - 1 - idx].tolist())
+
+    def __iter__(self) -> Iterator[BasicMetric]:
+        """ From the newest to the oldest """
+        for row in self.window()[::-1].tolist():
+            yield BasicMetric(*row)
+
+    def __repr__(self) -> str:
+        return f'{self.__class__.__name__}({self._len}/{self._capacity})'
+
+    @property
+    def capacity(self) -> int:
+        return self._capacity
+
+    @property
+    def epoch(self) -> int:
+        """ It is increased by every append and clear, so the values derived from the newest metric can be cached """
+        return self._epoch
+
+    @property
+    def stats(self) -> Optional[MetricStats]:
+        return self._stats
+
+    def appendleft(self, metric: BasicMetric) -> None:
+        """ Add the newest metric in O(1) """
+        self.append_row(metric.as_tuple())
+
+    def append_row(self, row: Tuple[float, ...]) -> None:
+        """ Add the newest metric given as the values of `COLUMNS` in O(1) """
+        pos = self._pos
+        data = self._data
+        end = pos + self._capacity
+        for window, window_sum in self._window_sums.items():
+            if self._len >= window:
+                # the oldest metric of the window leaves. it may be overwritten below
+                window_sum -= data[end - window]
+
+        data[pos] = row
+        new_row = data[pos]
+        data[end] = new_row
+        for window_sum in self._window_sums.values():
+            window_sum += new_row
+        if self._stats is not None:
+            self._stats.update(new_row)
+
+        pos += 1
+        self._pos = 0 if pos == self._capacity else pos
+        if self._len < self._capacity:
+            self._len += 1
+        self._epoch += 1
+
+        if self._window_sums:
+            self._appends_to_resync -= 1
+            if self._appends_to_resync == 0:
+                self._resync_window_sums()
+
+    def _resync_window_sums(self) -> None:
+        self._appends_to_resync = self._capacity
+        for window, window_sum in self._window_sums.items():
+            self.window(window).sum(axis=0, out=window_sum)
+
+    def clear(self) -> None:
+        """ Drop every metric and reset `stats` """
+        self._pos = 0
+        self._len = 0
+        self._epoch += 1
+        for window_sum in self._window_sums.values():
+            window_sum.fill(0)
+        self._appends_to_resync = self._capacity
+        if self._stats is not None:
+            self._stats.reset()
+
+    def window(self, n: Optional[int] = None) -> np.ndarray:
+        """
+        A read-only view of the last `n` metrics (every metric if it is None), from the oldest to the newest.
+        The view is overwritten by the metrics added after `capacity - n` more appends.
+        """
+        n = self._len if n is None else min(n, self._len)
+        end = self._pos + self._capacity
+        view = self._data[end - n:end]
+        view.flags.writeable = False
+        return view
+
+    def mean_row(self, n: Optional[int] = None) -> np.ndarray:
+        """ The average of the last `n` metrics (every metric if it is None), in O(1) if `n` is in `windows` """
+        if self._len == 0:
+            raise ValueError('mean requires at least one metric')
+
+        window_sum = self._window_sums.get(n)
+        if window_sum is not None:
+            return window_sum / min(n, self._len)
+        return self.window(n).mean(axis=0)
+
+    def mean(self, n: Optional[int] = None) -> BasicMetric:
+        """ The average of the last `n` metrics (every metric if it is None), in O(1) if `n` is in `windows` """
+        return BasicMetric(*self.mean_row(n).tolist())
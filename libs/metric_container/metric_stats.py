@@ -0,0 +1,205 @@
+# coding: UTF-8
+
+import math
+from typing import Dict, Iterable
+
+import numpy as np
+
+from .basic_metric import BasicMetric
+
+
+class P2Quantiles:
+    """
+    Estimate a quantile of every column of a stream of rows with the P-square algorithm
+    (Jain and Chlamtac, "The P2 algorithm for dynamic calculation of quantiles and histograms without storing
+    observations", 1985). It keeps 5 markers per column, so an update is O(1) regardless of the stream length.
+    """
+
+    def __init__(self, quantile: float, num_columns: int) -> None:
+        if not 0 < quantile < 1:
+            raise ValueError(f'quantile should be in (0, 1): {quantile}')
+
+        self._quantile = quantile
+        self._num_columns = num_columns
+        self._increments = np.array((0, quantile / 2, quantile, (1 + quantile) / 2, 1))
+        self._columns = np.arange(num_columns)
+        self._marker_ids = np.arange(1, 5)[:, None]
+        self.reset()
+
+    @property
+    def quantile(self) -> float:
+        return self._quantile
+
+    def reset(self) -> None:
+        self._count = 0
+        self._heights = np.zeros((5, self._num_columns))
+        self._positions = np.tile(np.arange(5, dtype=np.float64)[:, None], (1, self._num_columns))
+        self._desired = np.tile((4 * self._increments)[:, None], (1, self._num_columns))
+
+    def update(self, row: np.ndarray) -> None:
+        count = self._count
+        self._count = count + 1
+        heights = self._heights
+        if count < 5:
+            heights[count] = row
+            if count == 4:
+                heights.sort(axis=0)
+            return
+
+        # the cell of each column where `row` falls, extending the extreme markers
+        np.minimum(heights[0], row, out=heights[0])
+        np.maximum(heights[4], row, out=heights[4])
+        cells = (row >= heights[1:4]).sum(axis=0)
+        positions = self._positions
+        positions[1:] += self._marker_ids > cells
+        self._desired += self._increments[:, None]
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            for i in range(1, 4):
+                delta = self._desired[i] - positions[i]
+                gap_right = positions[i + 1] - positions[i]
+                gap_left = positions[i - 1] - positions[i]
+                adjust = ((delta >= 1) & (gap_right > 1)) | ((delta <= -1) & (gap_left < -1))
+                if not adjust.any():
+                    continue
+
+                sign = np.sign(delta)
+                height = heights[i]
+                parabolic = height + sign / (positions[i + 1] - positions[i - 1]) * (
+                        (positions[i] - positions[i - 1] + sign) * (heights[i + 1] - height) / gap_right +
+                        (positions[i + 1] - positions[i] - sign) * (height - heights[i - 1]) / -gap_left)
+                neighbour = np.where(sign > 0, i + 1, i - 1)
+                columns = self._columns
+                linear = height + sign * (heights[neighbour, columns] - height) / \
+                    (positions[neighbour, columns] - positions[i])
+                in_order = (heights[i - 1] < parabolic) & (parabolic < heights[i + 1])
+                heights[i] = np.where(adjust, np.where(in_order, parabolic, linear), height)
+                positions[i] += np.where(adjust, sign, 0)
+
+    def value(self) -> np.ndarray:
+        if self._count == 0:
+            raise ValueError('quantile requires at least one row')
+        if self._count < 5:
+            # exact until the markers are initialized
+            return np.percentile(self._heights[:self._count], self._quantile * 100, axis=0)
+        return self._heights[2].copy()
+
+
+class RunningMean:
+    """ The mean of a stream of values and its confidence interval, updated in O(1) per value (Welford's algorithm) """
+
+    def __init__(self) -> None:
+        self.reset()
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def mean(self) -> float:
+        return self._mean
+
+    def reset(self) -> None:
+        self._count = 0
+        self._mean = 0.0
+        self._m2 = 0.0
+
+    def update(self, value: float) -> None:
+        self._count += 1
+        delta = value - self._mean
+        self._mean += delta / self._count
+        self._m2 += delta * (value - self._mean)
+
+    def half_width(self, z: float = 1.96) -> float:
+        """ Half the width of the confidence interval of the mean (1.96 for 95%). infinite below two values """
+        if self._count < 2:
+            return math.inf
+        return z * math.sqrt(self._m2 / (self._count - 1) / self._count)
+
+    def converged(self, tolerance: float, z: float = 1.96) -> bool:
+        """ Whether the confidence interval is within `tolerance` of the mean, relatively """
+        return self.half_width(z) <= tolerance * abs(self._mean)
+
+
+class MetricStats:
+    """
+    Statistics of the metrics of a node or a workload which are updated as the metrics arrive, so that reading them
+    is O(1) however many metrics have arrived: the count, the mean and the variance (Welford's algorithm),
+    an exponentially weighted moving average and the approximate quantiles (P-square algorithm).
+    They cover every metric since the last `reset()`. The averages of the last few metrics are kept by
+    `MetricRingBuffer` instead.
+    """
+
+    def __init__(self, num_columns: int, ewma_alpha: float = 0.2, quantiles: Iterable[float] = (0.95,)) -> None:
+        if not 0 < ewma_alpha <= 1:
+            raise ValueError(f'ewma_alpha should be in (0, 1]: {ewma_alpha}')
+
+        self._num_columns = num_columns
+        self._ewma_alpha = ewma_alpha
+        self._quantiles: Dict[float, P2Quantiles] = \
+            dict((quantile, P2Quantiles(quantile, num_columns)) for quantile in quantiles)
+        self.reset()
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def ewma_alpha(self) -> float:
+        return self._ewma_alpha
+
+    def reset(self) -> None:
+        self._count = 0
+        self._mean = np.zeros(self._num_columns)
+        self._m2 = np.zeros(self._num_columns)      # sum of the squared differences from the mean
+        self._ewma = np.zeros(self._num_columns)
+        for estimator in self._quantiles.values():
+            estimator.reset()
+
+    def update(self, row: np.ndarray) -> None:
+        self._count += 1
+        delta = row - self._mean
+        self._mean += delta / self._count
+        self._m2 += delta * (row - self._mean)
+
+        if self._count == 1:
+            self._ewma[:] = row
+        else:
+            self._ewma += self._ewma_alpha * (row - self._ewma)
+
+        for estimator in self._quantiles.values():
+            estimator.update(row)
+
+    def _check_not_empty(self) -> None:
+        if self._count == 0:
+            raise ValueError('statistics require at least one metric')
+
+    def mean_row(self) -> np.ndarray:
+        self._check_not_empty()
+        return self._mean.copy()
+
+    def variance_row(self) -> np.ndarray:
+        """ Sample variance of every column (0 for a single metric) """
+        self._check_not_empty()
+        return self._m2 / (self._count - 1) if self._count > 1 else np.zeros(self._num_columns)
+
+    def ewma_row(self) -> np.ndarray:
+        self._check_not_empty()
+        return self._ewma.copy()
+
+    def quantile_row(self, quantile: float) -> np.ndarray:
+        estimator = self._quantiles.get(quantile)
+        if estimator is None:
+            raise KeyError(f'quantile {quantile} is not tracked. tracked: {tuple(self._quantiles)}')
+        return estimator.value()
+
+    def mean(self) -> BasicMetric:
+        return BasicMetric(*self.mean_row().tolist())
+
+    def ewma(self) -> BasicMetric:
+        return BasicMetric(*self.ewma_row().tolist())
+
+    def percentile(self, quantile: float) -> BasicMetric:
+        """ Approximate `quantile` of every counter (e.g. 0.95 for p95). It should be given to the constructor """
+        return BasicMetric(*self.quantile_row(quantile).tolist())
+
+    def std_row(self) -> np.ndarray:
+        return np.sqrt(self.variance_row())
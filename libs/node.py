@@ -1,14 +1,21 @@
 # coding: UTF-8
 
+import time
 from collections import deque
 from itertools import chain
 from typing import Deque, Iterable, Optional, Set, Tuple
 
 from .metric_container.basic_metric import BasicMetric, MetricDiff
+from .metric_container.metric_buffer import MetricRingBuffer
+
+
+def node_class_of(node_type: str) -> str:
+    # node types are given as either 'gpu_node' (setup) or 'gpu' (tracking messages)
+    return node_type.split('_')[0]
 
 
 class Node:
-    def __init__(self, ip_addr: str, port: str, node_type: str):
+    def __init__(self, ip_addr: str, port: str, node_type: str, metric_buf_size: int = 50):
         self._ip_addr = ip_addr
         self._port = port
         self._node_type = node_type             # gpu or cpu
@@ -18,8 +25,12 @@ class Node:
         self._num_workloads: int = None
         self._num_of_fg_wls: int = None  # Assumed a single fg wls
         self._num_of_bg_wls: int = None
-        #self._aggr_contention = None     # Diff?
-        self._metrics: Deque[BasicMetric] = deque()
+        self._aggr_contention: Optional[float] = None
+        self._metrics: MetricRingBuffer = MetricRingBuffer(metric_buf_size)
+
+        # Predicted contention of the jobs dispatched since the last report (reserved_at, delta)
+        self._reservations: Deque[Tuple[float, float]] = deque()
+        self._reserved_contention: float = 0.0
 
     @property
     def ip_addr(self):
@@ -37,6 +48,11 @@ class Node:
     def identifier(self):
         return self._identifier
 
+    @property
+    def node_class(self) -> str:
+        """ 'gpu' or 'cpu'. It is comparable with `Job.preferences` """
+        return node_class_of(self._node_type)
+
     @property
     def num_workloads(self):
         return self._num_workloads
@@ -53,6 +69,50 @@ class Node:
     def aggr_contention(self):
         return self._aggr_contention
 
+    @property
+    def reserved_contention(self) -> float:
+        return self._reserved_contention
+
+    @property
+    def effective_contention(self) -> Optional[float]:
+        """ The last reported contention plus the contention reserved by the jobs dispatched after that """
+        if self._aggr_contention is None:
+            return None
+        return self._aggr_contention + self._reserved_contention
+
+    def reserve(self, delta: float, now: Optional[float] = None) -> None:
+        self._reservations.append((time.time() if now is None else now, delta))
+        self._reserved_contention += delta
+
+    def cancel_reservation(self, delta: float) -> bool:
+        """
+        Drop the latest reservation of `delta` (e.g. its job failed to be dispatched)
+        :return: False if it has already been reconciled
+        """
+        reservations = self._reservations
+        for idx in range(len(reservations) - 1, -1, -1):
+            if reservations[idx][1] == delta:
+                del reservations[idx]
+                self._reserved_contention -= delta
+                if not reservations:
+                    self._reserved_contention = 0.0
+                return True
+        return False
+
+    def reconcile_reservations(self, settle_time: float, now: Optional[float] = None) -> None:
+        """
+        Drop the reservations which are older than `settle_time`.
+        The reported contention is assumed to include the jobs which were dispatched that long ago.
+        """
+        deadline = (time.time() if now is None else now) - settle_time
+        reservations = self._reservations
+        while reservations and reservations[0][0] <= deadline:
+            _, delta = reservations.popleft()
+            self._reserved_contention -= delta
+
+        if not reservations:
+            self._reserved_contention = 0.0  # avoid accumulating floating point errors
+
     @num_workloads.setter
     def num_workloads(self, num_wls: int):
         self._num_workloads = num_wls
@@ -74,5 +134,5 @@ class Node:
         self._node_type = node_type
 
     @property
-    def metrics(self) -> Deque[BasicMetric]:
+    def metrics(self) -> MetricRingBuffer:
         return self._metrics
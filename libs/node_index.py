@@ -0,0 +1,126 @@
+# coding: UTF-8
+
+import random
+from threading import Lock
+from typing import Dict, List, Optional
+
+from .node import Node
+from .utils.indexed_heap import IndexedMinHeap
+
+
+class NodeIndex:
+    """
+    Nodes ordered by their contention per node class ('gpu' or 'cpu').
+    It is updated by the node tracker thread and read by the scheduler thread.
+    `version` is advanced whenever a node may have room for more jobs (a report, a released or settled reservation),
+    so the scheduler retries the jobs held by the admission control only then.
+    """
+
+    def __init__(self) -> None:
+        self._index: Dict[str, IndexedMinHeap[Node]] = dict()
+        self._lock = Lock()
+        self._version: int = 0
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(len(heap) for heap in self._index.values())
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    @property
+    def contentions(self) -> Dict[Node, float]:
+        with self._lock:
+            return dict((node, heap.priority(node)) for heap in self._index.values() for node in heap)
+
+    def update(self, node: Node, prev_node_class: Optional[str] = None) -> None:
+        """
+        Reflect the current contention of `node` to the index. It costs O(log n).
+        :param node: node whose contention (or type) is changed
+        :param prev_node_class: the node class which `node` was indexed with, if it is changed
+        :return:
+        """
+        with self._lock:
+            if prev_node_class is not None and prev_node_class != node.node_class:
+                self._index[prev_node_class].discard(node)
+
+            heap = self._index.get(node.node_class)
+            if heap is None:
+                heap = self._index[node.node_class] = IndexedMinHeap()
+
+            if node.aggr_contention is None:
+                heap.discard(node)
+            else:
+                heap.push(node, node.effective_contention)
+            self._version += 1
+
+    def reserve(self, node: Node, delta: float, now: Optional[float] = None) -> None:
+        """ Add the predicted contention of a job which is just dispatched to `node` """
+        with self._lock:
+            node.reserve(delta, now)
+            heap = self._index.get(node.node_class)
+            if heap is not None and node in heap:
+                heap.push(node, node.effective_contention)
+
+    def release(self, node: Node, delta: float) -> None:
+        """ Cancel the reservation of a job which did not reach `node` """
+        with self._lock:
+            if not node.cancel_reservation(delta):
+                return
+            self._version += 1
+            heap = self._index.get(node.node_class)
+            if heap is not None and node in heap:
+                heap.push(node, node.effective_contention)
+
+    def reconcile(self, node: Node, settle_time: float, now: Optional[float] = None) -> None:
+        """ Drop the reservations of `node` which are expected to be reflected in its reported contention """
+        with self._lock:
+            reserved = node.reserved_contention
+            node.reconcile_reservations(settle_time, now)
+            if node.reserved_contention == reserved:
+                return
+            self._version += 1
+            heap = self._index.get(node.node_class)
+            if heap is not None and node in heap:
+                heap.push(node, node.effective_contention)
+
+    def discard(self, node: Node) -> None:
+        with self._lock:
+            heap = self._index.get(node.node_class)
+            if heap is not None:
+                heap.discard(node)
+
+    def find_min(self, node_class: Optional[str] = None) -> Optional[Node]:
+        """
+        Find the least contended node in O(1)
+        :param node_class: 'gpu' or 'cpu' (same as `Job.preferences`). Every node is considered if it is None
+        :return: the least contended node or None if there is no candidate
+        """
+        with self._lock:
+            if node_class is not None:
+                heap = self._index.get(node_class)
+                return None if heap is None else heap.peek()
+
+            candidates = tuple(heap for heap in self._index.values() if len(heap) > 0)
+            if len(candidates) == 0:
+                return None
+            return min(candidates, key=lambda h: h.peek_priority()).peek()
+
+    def nodes(self, node_class: str) -> List[Node]:
+        with self._lock:
+            heap = self._index.get(node_class)
+            return list() if heap is None else list(heap)
+
+    def sample(self, node_class: str, num_samples: int) -> List[Node]:
+        """
+        Pick up to `num_samples` distinct nodes of `node_class` uniformly at random in O(num_samples)
+        """
+        with self._lock:
+            heap = self._index.get(node_class)
+            if heap is None:
+                return list()
+            num_nodes = len(heap)
+            if num_samples >= num_nodes:
+                return list(heap)
+            return [heap.item_at(idx) for idx in random.sample(range(num_nodes), num_samples)]
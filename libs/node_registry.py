@@ -0,0 +1,92 @@
+# coding: UTF-8
+
+import time
+from collections import OrderedDict
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from .node import Node
+
+
+class NodeRegistry:
+    """
+    Membership of the cluster nodes, keyed by their IP addresses.
+    A node is registered once, either from the configuration or by its first report, and stays registered.
+    Every report of a node is its heartbeat. The nodes whose last heartbeat is older than `heartbeat_timeout` are
+    expired until they report again.
+    It is accessed only by the node tracker thread.
+    """
+
+    def __init__(self, heartbeat_timeout: float, default_port: str = '10010', metric_buf_size: int = 50) -> None:
+        self._heartbeat_timeout = heartbeat_timeout
+        self._metric_buf_size = metric_buf_size
+        self._default_port = default_port     # port of the nodes which join the cluster by reporting themselves
+        self._nodes: Dict[str, Node] = dict()
+        # the nodes which are alive, ordered by their last heartbeat (ip address -> time of the last heartbeat)
+        self._heartbeats: 'OrderedDict[str, float]' = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    def __contains__(self, ip_addr: str) -> bool:
+        return ip_addr in self._nodes
+
+    def __iter__(self) -> Iterator[Node]:
+        return iter(self._nodes.values())
+
+    @property
+    def heartbeat_timeout(self) -> float:
+        return self._heartbeat_timeout
+
+    @property
+    def nodes(self) -> Dict[str, Node]:
+        return self._nodes
+
+    @property
+    def num_alive(self) -> int:
+        return len(self._heartbeats)
+
+    def get(self, ip_addr: str) -> Optional[Node]:
+        return self._nodes.get(ip_addr)
+
+    def is_alive(self, ip_addr: str) -> bool:
+        return ip_addr in self._heartbeats
+
+    def register(self, ip_addr: str, node_type: str, port: Optional[str] = None) -> Tuple[Node, bool]:
+        """
+        Register a node unless it is already registered
+        :return: the registered node and whether it is new
+        """
+        node = self._nodes.get(ip_addr)
+        if node is not None:
+            return node, False
+
+        node = self._nodes[ip_addr] = Node(ip_addr, self._default_port if port is None else port, node_type,
+                                           self._metric_buf_size)
+        return node, True
+
+    def heartbeat(self, node: Node, now: Optional[float] = None) -> bool:
+        """
+        Record a heartbeat of `node` in O(1)
+        :return: whether `node` was not alive before
+        """
+        heartbeats = self._heartbeats
+        revived = node.ip_addr not in heartbeats
+        heartbeats[node.ip_addr] = time.monotonic() if now is None else now
+        heartbeats.move_to_end(node.ip_addr)
+        return revived
+
+    def expire(self, now: Optional[float] = None) -> List[Node]:
+        """
+        Expire the nodes which missed their heartbeats. It costs O(1) per expired node
+        :return: the nodes which are expired by this call
+        """
+        deadline = (time.monotonic() if now is None else now) - self._heartbeat_timeout
+        heartbeats = self._heartbeats
+        expired: List[Node] = list()
+        while heartbeats:
+            ip_addr, last_heartbeat = next(iter(heartbeats.items()))
+            if last_heartbeat > deadline:
+                break
+            heartbeats.popitem(last=False)
+            expired.append(self._nodes[ip_addr])
+        return expired
@@ -0,0 +1,10 @@
+# coding: UTF-8
+
+from .admission import AdmissionController, AdmissionStats
+from .base import PlacementPolicy
+from .batch import BatchPlacement
+from .interference import InterferencePredictor
+from .interference_aware import InterferenceAwarePlacement
+from .min_contention import MinContentionPlacement
+from .power_of_d import PowerOfDPlacement
+from .reservation import ContentionEstimator
@@ -0,0 +1,79 @@
+# coding: UTF-8
+
+import logging
+import time
+from typing import Dict, Mapping, Optional
+
+from .reservation import ContentionEstimator
+from ..jobs import Job
+from ..node import Node
+
+
+class AdmissionStats:
+    def __init__(self) -> None:
+        self.queue_depth: int = 0
+        self.num_held_jobs: int = 0
+        self.num_admitted: Dict[str, int] = {'latency': 0, 'throughput': 0}
+        self.num_rejections: Dict[str, int] = {'latency': 0, 'throughput': 0}
+        self.max_hold_time: float = 0.0     # the longest hold time among the jobs held now (sec)
+        self.total_hold_time: float = 0.0   # sum of the hold times of the admitted jobs (sec)
+
+    @property
+    def avg_hold_time(self) -> float:
+        num_admitted = sum(self.num_admitted.values())
+        return self.total_hold_time / num_admitted if num_admitted > 0 else 0.0
+
+    def __repr__(self) -> str:
+        return f'queue depth: {self.queue_depth}, held: {self.num_held_jobs}, ' \
+               f'admitted: {self.num_admitted}, rejections: {self.num_rejections}, ' \
+               f'avg hold time: {self.avg_hold_time:.3f}s, max hold time: {self.max_hold_time:.3f}s'
+
+
+class AdmissionController:
+    """
+    Holds a job back when the predicted contention of its destination node (the effective contention plus the
+    contention the job itself is predicted to add) exceeds the threshold of the job's objective.
+    Held jobs stay in the pending queue and are placed again in a later round.
+    The scheduler calls `forget()` when a job leaves the pending state, so the jobs which are never admitted
+    (e.g. they fail) are not tracked forever.
+    """
+
+    def __init__(self, thresholds: Mapping[str, float], estimator: ContentionEstimator) -> None:
+        self._thresholds: Dict[str, float] = dict(thresholds)
+        self._estimator = estimator
+        self._first_held_at: Dict[int, float] = dict()     # job id -> the time when it was held first
+        self._stats = AdmissionStats()
+
+    @property
+    def stats(self) -> AdmissionStats:
+        return self._stats
+
+    def admit(self, job: Job, node: Node) -> bool:
+        threshold: Optional[float] = self._thresholds.get(job.objective)
+        now = time.time()
+
+        predicted = node.effective_contention + self._estimator.predict(job)
+        if threshold is not None and predicted > threshold:
+            logger = logging.getLogger(__name__)
+            logger.debug(f'{job.name} is held. predicted contention of {node.ip_addr}: {predicted:.3f} '
+                         f'> {threshold:.3f} ({job.objective})')
+            self._first_held_at.setdefault(job.job_id, now)
+            self._stats.num_rejections[job.objective] = self._stats.num_rejections.get(job.objective, 0) + 1
+            return False
+
+        held_at = self._first_held_at.pop(job.job_id, None)
+        if held_at is not None:
+            self._stats.total_hold_time += now - held_at
+        self._stats.num_admitted[job.objective] = self._stats.num_admitted.get(job.objective, 0) + 1
+        return True
+
+    def forget(self, job: Job) -> None:
+        """ Stop tracking the hold time of `job`, which is no longer waiting for admission """
+        self._first_held_at.pop(job.job_id, None)
+
+    def update_queue_stats(self, queue_depth: int) -> None:
+        self._stats.queue_depth = queue_depth
+        self._stats.num_held_jobs = len(self._first_held_at)
+        # the jobs are kept in the order they were held first, so the first one has been held the longest
+        oldest_held_at = next(iter(self._first_held_at.values()), None)
+        self._stats.max_hold_time = 0.0 if oldest_held_at is None else time.time() - oldest_held_at
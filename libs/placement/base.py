@@ -0,0 +1,56 @@
+# coding: UTF-8
+
+from abc import ABCMeta, abstractmethod
+from typing import Callable, Dict, Optional, Sequence
+
+from ..jobs import Job
+from ..node import Node
+from ..node_index import NodeIndex
+
+
+class PlacementPolicy(metaclass=ABCMeta):
+    def __init__(self, node_index: NodeIndex) -> None:
+        self._node_index = node_index
+
+    def __repr__(self) -> str:
+        return self.__class__.__name__
+
+    @abstractmethod
+    def select_node(self, job: Job) -> Optional[Node]:
+        """
+        Choose the destination node of `job` among the nodes of its preferred class
+
+        :return: the destination node or None if no node is available
+        :rtype: Optional[Node]
+        """
+        pass
+
+    def select_nodes(self, jobs: Sequence[Job],
+                     on_placed: Optional[Callable[[Job, Node], None]] = None) -> Dict[Job, Node]:
+        """
+        Choose the destination nodes of the jobs drained in a scheduling round.
+        Jobs which can not be placed now are left out of the result.
+
+        :param jobs: jobs to place
+        :param on_placed: called right after each placement, before the next job is placed
+        :return: the destination node of each placed job
+        """
+        placements: Dict[Job, Node] = dict()
+        unavailable_classes = set()
+        for job in jobs:
+            # No node of that class is available now. The remaining jobs will not find one either.
+            if job.preferences in unavailable_classes:
+                continue
+
+            node = self.select_node(job)
+            if node is None:
+                unavailable_classes.add(job.preferences)
+            else:
+                placements[job] = node
+                if on_placed is not None:
+                    on_placed(job, node)
+        return placements
+
+    def release(self, job: Job, node: Node) -> None:
+        """ Called when `job` which was placed on `node` is not running there anymore (e.g., dispatch failure) """
+        pass
@@ -0,0 +1,180 @@
+# coding: UTF-8
+
+import logging
+import time
+from collections import OrderedDict
+from typing import Callable, ClassVar, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from .interference import InterferencePredictor
+from .interference_aware import InterferenceAwarePlacement
+from ..jobs import Job
+from ..node import Node
+from ..node_index import NodeIndex
+
+
+class BatchPlacement(InterferenceAwarePlacement):
+    """
+    Places all jobs of a scheduling round together, so that the total predicted interference of every co-located
+    pair (including the pairs of jobs placed in the same round) is minimized under the capacity of the nodes.
+
+    The jobs are placed greedily one by one first (as `InterferenceAwarePlacement` with the capacity does, on a matrix
+    of the interference of every job with every node), then the placement is improved by local search: the move of a
+    job to a node with a free slot, or the swap of two jobs on different nodes, which reduces the total interference
+    the most is applied until none reduces it or `max_solve_time` runs out. So a round is never worse than the greedy
+    placement and the search is bounded in time, which should be well below the batching window of the scheduler.
+    """
+    _MAX_SOLVE_TIME: ClassVar[float] = 0.02  # sec
+    _MIN_GAIN: ClassVar[float] = 1e-9
+
+    def __init__(self, node_index: NodeIndex, predictor: InterferencePredictor,
+                 max_workloads_per_node: int = 4, max_solve_time: float = _MAX_SOLVE_TIME) -> None:
+        super().__init__(node_index, predictor, max_workloads_per_node)
+        self._max_solve_time = max_solve_time
+        self._last_solve_time: float = 0.0
+        self._last_num_moves: int = 0
+
+    @property
+    def last_solve_time(self) -> float:
+        return self._last_solve_time
+
+    @property
+    def last_num_moves(self) -> int:
+        """ The number of the moves and the swaps applied to the greedy placement in the last round """
+        return self._last_num_moves
+
+    def select_nodes(self, jobs: Sequence[Job],
+                     on_placed: Optional[Callable[[Job, Node], None]] = None) -> Dict[Job, Node]:
+        start = time.perf_counter()
+        deadline = start + self._max_solve_time
+
+        jobs_by_class: Dict[str, List[Job]] = OrderedDict()
+        for job in jobs:
+            jobs_by_class.setdefault(job.preferences, list()).append(job)
+
+        placements: Dict[Job, Node] = dict()
+        self._last_num_moves = 0
+        for node_class, class_jobs in jobs_by_class.items():
+            self._last_num_moves += self._place_class(node_class, class_jobs, placements, deadline)
+
+        self._last_solve_time = time.perf_counter() - start
+        if self._last_solve_time > self._max_solve_time:
+            logger = logging.getLogger(__name__)
+            logger.debug(f'the search of {len(placements)} jobs is stopped after {self._last_num_moves} moves '
+                         f'({self._last_solve_time * 1e3:.1f}ms)')
+
+        # the callbacks are deferred until the placement is final
+        if on_placed is not None:
+            for job in jobs:
+                node = placements.get(job)
+                if node is not None:
+                    on_placed(job, node)
+        return placements
+
+    def _place_class(self, node_class: str, jobs: List[Job], placements: Dict[Job, Node], deadline: float) -> int:
+        """
+        Place `jobs` on the nodes of `node_class` greedily, then improve the placement by local search until
+        `deadline`. The jobs beyond the capacity are left out of `placements`
+        :return: the number of the applied moves and swaps
+        """
+        nodes = self._node_index.nodes(node_class)
+        predictor = self._predictor
+        for node in nodes:
+            if node.reserved_contention == 0 and node.num_workloads is not None:
+                predictor.reconcile(node, node.num_workloads)
+
+        free = np.array([self.free_slots(node) for node in nodes])
+        if len(nodes) == 0 or free.sum() == 0:
+            return 0
+
+        slowdown = predictor.slowdown_matrix
+        pair = slowdown + slowdown.T    # pair[w, k] : interference between an instance of w and one of k
+
+        # counts[n, w] : the instances of workload w on node n, including the jobs of this round
+        counts = np.array([predictor.resident_counts(node) for node in nodes])
+        all_wls = np.array([predictor.workload_index(job.name) for job in jobs])
+        # marginal[j, n] : interference of job j with the workloads on node n (itself included if it is there)
+        all_marginal = pair[all_wls] @ counts.T
+
+        # the greedy placement of `InterferenceAwarePlacement`, on the matrix
+        contentions = np.array([node.effective_contention for node in nodes])
+        locs_list: List[int] = list()
+        for job_idx in range(len(jobs)):
+            if not free.any():
+                break
+            scores = np.where(free > 0, all_marginal[job_idx], np.inf)
+            ties = np.flatnonzero(scores == scores.min())
+            dest = int(ties[np.argmin(contentions[ties])])
+            free[dest] -= 1
+            counts[dest, all_wls[job_idx]] += 1
+            all_marginal[:, dest] += pair[all_wls, all_wls[job_idx]]
+            locs_list.append(dest)
+
+        num_placed = len(locs_list)
+        jobs = jobs[:num_placed]
+        wls = all_wls[:num_placed]
+        locs = np.array(locs_list, dtype=int)
+        marginal = all_marginal[:num_placed]
+        num_moves = self._search(wls, locs, free, counts, marginal, pair, deadline) if len(nodes) > 1 else 0
+
+        for job, loc in zip(jobs, locs.tolist()):
+            predictor.add_resident(nodes[loc], job.name)
+            placements[job] = nodes[loc]
+        return num_moves
+
+    def _search(self, wls: np.ndarray, locs: np.ndarray, free: np.ndarray, counts: np.ndarray,
+                marginal: np.ndarray, pair: np.ndarray, deadline: float) -> int:
+        """
+        Apply the best job move or swap of two jobs until none reduces the total interference or `deadline` passes.
+        The arguments are updated in place
+        :return: the number of the applied moves and swaps
+        """
+        job_pair = pair[wls]                        # (jobs, workloads)
+        job_idxs = np.arange(len(wls))
+        self_pair = job_pair[job_idxs, wls]
+        between = job_pair[:, wls]                  # between[j, k] : interference between job j and job k
+
+        num_moves = 0
+        while time.perf_counter() < deadline:
+            # the interference which job j has with the others on its node
+            own = marginal[job_idxs, locs] - self_pair
+
+            # move job j to node n
+            move_gain = own[:, None] - marginal
+            move_gain[:, free <= 0] = -np.inf
+            move_gain[job_idxs, locs] = -np.inf
+            best_move = np.unravel_index(np.argmax(move_gain), move_gain.shape)
+
+            # swap job j and job k
+            cross = marginal[:, locs]                   # cross[j, k] : interference of job j with the node of k
+            swap_gain = own[:, None] + own[None, :] - cross - cross.T + 2 * between
+            swap_gain[locs[:, None] == locs[None, :]] = -np.inf
+            best_swap = np.unravel_index(np.argmax(swap_gain), swap_gain.shape)
+
+            if move_gain[best_move] >= swap_gain[best_swap]:
+                if move_gain[best_move] <= self._MIN_GAIN:
+                    break
+                job_idx, dest = best_move
+                free[locs[job_idx]] += 1
+                free[dest] -= 1
+                self._move(job_idx, dest, wls, locs, counts, marginal, job_pair)
+            else:
+                if swap_gain[best_swap] <= self._MIN_GAIN:
+                    break
+                job_idx, other_idx = best_swap
+                dest, other_dest = locs[other_idx], locs[job_idx]
+                self._move(job_idx, dest, wls, locs, counts, marginal, job_pair)
+                self._move(other_idx, other_dest, wls, locs, counts, marginal, job_pair)
+            num_moves += 1
+        return num_moves
+
+    @staticmethod
+    def _move(job_idx: int, dest: int, wls: np.ndarray, locs: np.ndarray, counts: np.ndarray,
+              marginal: np.ndarray, job_pair: np.ndarray) -> None:
+        wl, src = wls[job_idx], locs[job_idx]
+        counts[src, wl] -= 1
+        counts[dest, wl] += 1
+        marginal[:, src] -= job_pair[:, wl]
+        marginal[:, dest] += job_pair[:, wl]
+        locs[job_idx] = dest
@@ -0,0 +1,140 @@
+# coding: UTF-8
+
+from collections import deque
+from typing import ClassVar, Deque, Dict, Iterable, List, Mapping, Sequence
+
+import numpy as np
+
+from ..metric_container.basic_metric import BasicMetric
+from ..node import Node
+
+
+class InterferencePredictor:
+    """
+    Predicts the slowdown caused by co-locating workloads from their solorun profiles.
+
+    Every workload is described by how much it presses each shared resource (memory bandwidth, LLC, GPU memory)
+    and how sensitive it is to the pressure on each of them.
+    `slowdown[i, j]` is the predicted slowdown of workload i caused by a co-running workload j,
+    i.e. the dot product of i's sensitivity and j's pressure.
+    The matrix is computed once for all known workloads (the last row and column stand for unknown workloads),
+    and the residents of each node are kept as a count matrix, so scoring a job against every node is a single
+    matrix multiplication.
+    """
+    _INITIAL_NODE_CAPACITY: ClassVar[int] = 16
+
+    def __init__(self, solorun_profiles: Mapping[str, BasicMetric]) -> None:
+        self._workloads: Dict[str, int] = dict((name, idx) for idx, name in enumerate(sorted(solorun_profiles)))
+        self._unknown_idx: int = len(self._workloads)
+        self._slowdown: np.ndarray = self._build_slowdown_matrix(
+                [solorun_profiles[name] for name in sorted(solorun_profiles)])
+
+        # residents[node_row, workload_idx] : the number of the workload's instances on the node
+        self._residents: np.ndarray = np.zeros((self._INITIAL_NODE_CAPACITY, self._unknown_idx + 1))
+        self._node_rows: Dict[Node, int] = dict()
+        self._resident_order: Dict[Node, Deque[int]] = dict()
+
+    @staticmethod
+    def _build_slowdown_matrix(profiles: Sequence[BasicMetric]) -> np.ndarray:
+        if len(profiles) == 0:
+            return np.zeros((1, 1))
+
+        raw = np.array([(profile.llc_miss_ps,
+                         profile.llc_references * (1000 / profile.interval),
+                         profile.llc_hit_ratio,
+                         profile.gpu_core_util / 100,
+                         profile.gpu_mem_util / 100) for profile in profiles], dtype=np.float64)
+
+        # normalize the rates by the largest one among the known workloads
+        for col in (0, 1):
+            max_val = raw[:, col].max()
+            if max_val > 0:
+                raw[:, col] /= max_val
+        # some profiles report more LLC misses than references, so the ratios are clipped
+        raw[:, 2:] = np.clip(raw[:, 2:], 0, 1)
+        miss_ps, ref_ps, hit_ratio, gpu_core, gpu_emc = raw.T
+
+        # columns: memory bandwidth, LLC, GPU memory
+        pressure = np.stack((miss_ps, ref_ps, gpu_emc), axis=1)
+        sensitivity = np.stack((miss_ps, ref_ps * hit_ratio, gpu_core), axis=1)
+
+        # unknown workloads are assumed to be average ones
+        pressure = np.vstack((pressure, pressure.mean(axis=0)))
+        sensitivity = np.vstack((sensitivity, sensitivity.mean(axis=0)))
+
+        return sensitivity @ pressure.T
+
+    @property
+    def slowdown_matrix(self) -> np.ndarray:
+        return self._slowdown
+
+    @property
+    def unknown_index(self) -> int:
+        """ The index which stands for the workloads without a solorun profile """
+        return self._unknown_idx
+
+    def workload_index(self, workload_name: str) -> int:
+        return self._workloads.get(workload_name, self._unknown_idx)
+
+    def _row_of(self, node: Node) -> int:
+        row = self._node_rows.get(node)
+        if row is None:
+            row = len(self._node_rows)
+            if row == self._residents.shape[0]:
+                self._residents = np.vstack((self._residents, np.zeros_like(self._residents)))
+            self._node_rows[node] = row
+            self._resident_order[node] = deque()
+        return row
+
+    def add_resident(self, node: Node, workload_name: str) -> None:
+        wl_idx = self.workload_index(workload_name)
+        row = self._row_of(node)    # this may grow the residents matrix
+        self._residents[row, wl_idx] += 1
+        self._resident_order[node].append(wl_idx)
+
+    def remove_resident(self, node: Node, workload_name: str) -> None:
+        wl_idx = self.workload_index(workload_name)
+        row = self._node_rows.get(node)
+        if row is None or self._residents[row, wl_idx] == 0:
+            return
+        self._residents[row, wl_idx] -= 1
+        self._resident_order[node].remove(wl_idx)
+
+    def reconcile(self, node: Node, num_workloads: int) -> None:
+        """
+        The node reports `num_workloads` running workloads.
+        If fewer workloads are running than tracked, the oldest residents are assumed to be finished.
+        """
+        order = self._resident_order.get(node)
+        if order is None:
+            return
+        row = self._node_rows[node]
+        while len(order) > num_workloads:
+            self._residents[row, order.popleft()] -= 1
+
+    def resident_counts(self, node: Node) -> np.ndarray:
+        """ :return: the number of instances of each workload on `node` """
+        row = self._row_of(node)    # this may grow the residents matrix
+        return self._residents[row]
+
+    def num_residents(self, node: Node) -> int:
+        order = self._resident_order.get(node)
+        return 0 if order is None else len(order)
+
+    def score(self, workload_name: str, nodes: Iterable[Node]) -> np.ndarray:
+        """
+        :return: the predicted slowdown of the workload itself plus the slowdown it causes to the residents,
+                 for each of `nodes`
+        """
+        return self.score_batch((workload_name,), nodes)[:, 0]
+
+    def score_batch(self, workload_names: Sequence[str], nodes: Iterable[Node]) -> np.ndarray:
+        """
+        :return: (len(nodes), len(workload_names)) matrix of the scores of placing each workload on each node
+        """
+        rows: List[int] = [self._row_of(node) for node in nodes]
+        wl_idxs = [self.workload_index(name) for name in workload_names]
+
+        # suffered[w, k] = slowdown of workload w by k, caused[w, k] = slowdown of k by workload w
+        pairwise = self._slowdown[wl_idxs, :] + self._slowdown[:, wl_idxs].T
+        return self._residents[rows] @ pairwise.T
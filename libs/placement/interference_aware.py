@@ -0,0 +1,63 @@
+# coding: UTF-8
+
+import sys
+from typing import List, Optional
+
+import numpy as np
+
+from .base import PlacementPolicy
+from .interference import InterferencePredictor
+from ..jobs import Job
+from ..node import Node
+from ..node_index import NodeIndex
+
+
+class InterferenceAwarePlacement(PlacementPolicy):
+    """
+    Places a job on the node where the predicted interference (the slowdown of the job itself plus the slowdown
+    it causes to the residents) is the lowest. Ties are broken by the effective contention.
+    If `max_workloads_per_node` is given, the nodes which host that many workloads are not considered.
+    """
+
+    def __init__(self, node_index: NodeIndex, predictor: InterferencePredictor,
+                 max_workloads_per_node: Optional[int] = None) -> None:
+        super().__init__(node_index)
+        self._predictor = predictor
+        self._max_workloads_per_node = max_workloads_per_node
+
+    @property
+    def predictor(self) -> InterferencePredictor:
+        return self._predictor
+
+    def free_slots(self, node: Node) -> int:
+        """ The number of workloads `node` can host more. Unlimited without `max_workloads_per_node` """
+        if self._max_workloads_per_node is None:
+            return sys.maxsize
+        num_workloads = max(self._predictor.num_residents(node), node.num_workloads or 0)
+        return max(self._max_workloads_per_node - num_workloads, 0)
+
+    def _candidates(self, node_class: str) -> List[Node]:
+        candidates = self._node_index.nodes(node_class)
+        for node in candidates:
+            # every dispatched job is reflected in the report once no reservation is left
+            if node.reserved_contention == 0 and node.num_workloads is not None:
+                self._predictor.reconcile(node, node.num_workloads)
+        if self._max_workloads_per_node is not None:
+            candidates = [node for node in candidates if self.free_slots(node) > 0]
+        return candidates
+
+    def select_node(self, job: Job) -> Optional[Node]:
+        candidates = self._candidates(job.preferences)
+        if len(candidates) == 0:
+            return None
+
+        scores = self._predictor.score(job.name, candidates)
+        contentions = np.array([node.effective_contention for node in candidates])
+        best = np.lexsort((contentions, scores))[0]
+
+        dest_node = candidates[best]
+        self._predictor.add_resident(dest_node, job.name)
+        return dest_node
+
+    def release(self, job: Job, node: Node) -> None:
+        self._predictor.remove_resident(node, job.name)
@@ -0,0 +1,14 @@
+# coding: UTF-8
+
+from typing import Optional
+
+from .base import PlacementPolicy
+from ..jobs import Job
+from ..node import Node
+
+
+class MinContentionPlacement(PlacementPolicy):
+    """ Always places a job on the least contended node of its preferred class """
+
+    def select_node(self, job: Job) -> Optional[Node]:
+        return self._node_index.find_min(job.preferences)
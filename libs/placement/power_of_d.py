@@ -0,0 +1,36 @@
+# coding: UTF-8
+
+from typing import Optional
+
+from .base import PlacementPolicy
+from ..jobs import Job
+from ..node import Node
+from ..node_index import NodeIndex
+
+
+class PowerOfDPlacement(PlacementPolicy):
+    """
+    Power-of-d-choices placement.
+    It samples `d` nodes of the preferred class and picks the least contended one among them.
+    Since jobs of a burst see different samples, they do not all pile onto the single global minimum
+    while the contentions are stale.
+    """
+
+    def __init__(self, node_index: NodeIndex, d: int = 2) -> None:
+        super().__init__(node_index)
+        if d < 1:
+            raise ValueError(f'd must be positive: {d}')
+        self._d = d
+
+    def __repr__(self) -> str:
+        return f'{self.__class__.__name__} (d: {self._d})'
+
+    @property
+    def d(self) -> int:
+        return self._d
+
+    def select_node(self, job: Job) -> Optional[Node]:
+        candidates = self._node_index.sample(job.preferences, self._d)
+        if len(candidates) == 0:
+            return None
+        return min(candidates, key=lambda node: node.effective_contention)
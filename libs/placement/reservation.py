@@ -0,0 +1,36 @@
+# coding: UTF-8
+
+from statistics import mean
+from typing import ClassVar, Dict, Mapping, Optional
+
+from ..jobs import Job
+from ..metric_container.basic_metric import BasicMetric
+
+
+class ContentionEstimator:
+    """
+    Predicts how much a job will add to the aggregated contention of its destination node.
+    The prediction is `base_delta` scaled by the memory intensity (LLC misses per second) of the job's solorun profile
+    relative to the average of all profiled workloads. Jobs without a profile add `base_delta`.
+    """
+    _MIN_SCALE: ClassVar[float] = 0.25
+    _MAX_SCALE: ClassVar[float] = 4.0
+
+    def __init__(self, solorun_profiles: Mapping[str, BasicMetric], base_delta: float = 1.0) -> None:
+        self._base_delta = base_delta
+        self._deltas: Dict[str, float] = dict()
+
+        if len(solorun_profiles) == 0:
+            return
+
+        avg_miss_ps = mean(profile.llc_miss_ps for profile in solorun_profiles.values())
+        for name, profile in solorun_profiles.items():
+            scale = profile.llc_miss_ps / avg_miss_ps if avg_miss_ps > 0 else 1.0
+            scale = min(max(scale, self._MIN_SCALE), self._MAX_SCALE)
+            self._deltas[name] = base_delta * scale
+
+    def predict(self, job: Job) -> float:
+        return self._deltas.get(job.name, self._base_delta)
+
+    def delta_of(self, workload_name: str) -> Optional[float]:
+        return self._deltas.get(workload_name)
@@ -1,43 +1,12 @@
 # coding: UTF-8
 
-import json
-from pathlib import Path
-from typing import Dict
-
-from ..metric_container.basic_metric import BasicMetric
+from .store import SoloRunProfiles, default_store
 from ..utils.machine_type import MachineChecker, NodeType
 
-data_map: Dict[str, BasicMetric] = dict()
-
 CUR_NODE_TYPE = MachineChecker.get_node_type()
 
+# FIXME: hard coded. Both the edge nodes and the desktops (SDC) use the profiles measured on Jetson TX2,
+#  and the desktops ignore their GPU counters
+PROFILE_NODE_CLASS = 'jetson_tx2'
 
-def _init() -> None:
-    for data in Path(__file__).parent.iterdir():  # type: Path
-        if data.match('*.json'):
-            metric = json.loads(data.read_text())
-            if CUR_NODE_TYPE == NodeType.IntegratedGPU:
-                item = BasicMetric(metric['llc_references'],
-                                   metric['llc_misses'],
-                                   metric['instructions'],
-                                   metric['cycles'],
-                                   metric['gpu_core_util'],
-                                   metric['gpu_core_freq'],
-                                   metric['gpu_emc_util'],
-                                   metric['gpu_emc_freq'],
-                                   1000)
-            elif CUR_NODE_TYPE == NodeType.CPU:
-                item = BasicMetric(metric['llc_references'],
-                                   metric['llc_misses'],
-                                   metric['instructions'],
-                                   metric['cycles'],
-                                   0,
-                                   0,
-                                   0,
-                                   0,
-                                   1000)
-
-            data_map[metric['name']] = item
-
-
-_init()
+data_map: SoloRunProfiles = default_store().profiles(PROFILE_NODE_CLASS, with_gpu=CUR_NODE_TYPE != NodeType.CPU)
@@ -0,0 +1,194 @@
+# coding: UTF-8
+
+"""
+The solorun profiles which the isolation policies measured online, kept across restarts.
+
+A profile is keyed by the workload, its number of threads, the node class and the number of cores it is bound to,
+so a recurring foreground workload reuses its baseline instead of pausing the backgrounds to profile it again.
+A profile is used only while it is fresh (younger than `max_age`) and confident (averaged over at least
+`min_samples` metrics, with a relative standard error of its instructions and cycles below `max_relative_error`).
+
+The profiles are saved as a JSON file, `~/.cache/isolation/solorun_profiles.json` by default.
+`SOLORUN_PROFILE_CACHE` overrides the path of the file, and an empty value keeps the profiles in memory only.
+"""
+
+import json
+import logging
+import math
+import os
+import time
+from pathlib import Path
+from threading import Lock
+from typing import ClassVar, Dict, NamedTuple, Optional, Sequence, Tuple
+
+from ..metric_container.basic_metric import BasicMetric
+from ..metric_container.metric_buffer import MetricRingBuffer
+
+_CACHE_VERSION = 1
+DEFAULT_PATH = Path.home() / '.cache' / 'isolation' / 'solorun_profiles.json'
+
+# the counters whose spread decides the confidence of a profile
+_CONFIDENCE_COLUMNS = tuple(MetricRingBuffer.COLUMNS.index(name) for name in ('instruction', 'cycles'))
+
+
+class ProfileCacheKey(NamedTuple):
+    workload: str
+    num_threads: int
+    node_class: str
+    num_cores: int
+
+
+class CachedProfile(NamedTuple):
+    mean: Tuple[float, ...]     # the average of the solorun metrics, in the order of `MetricRingBuffer.COLUMNS`
+    std: Tuple[float, ...]      # their standard deviation
+    num_samples: int
+    profiled_at: float          # seconds since the epoch
+
+    @property
+    def metric(self) -> BasicMetric:
+        return BasicMetric(*self.mean)
+
+    def age(self, now: Optional[float] = None) -> float:
+        return (time.time() if now is None else now) - self.profiled_at
+
+    def relative_error(self) -> float:
+        """ The largest relative standard error of the mean of the instructions and the cycles """
+        errors = (self.std[idx] / math.sqrt(self.num_samples) / abs(self.mean[idx])
+                  for idx in _CONFIDENCE_COLUMNS if self.mean[idx] != 0)
+        return max(errors, default=0.0)
+
+
+class ProfileCacheInfo(NamedTuple):
+    hits: int
+    misses: int
+    stale: int          # the lookups which found a profile too old or not confident enough
+    size: int
+
+
+class SoloRunProfileCache:
+    """ The online solorun profiles, loaded from `path` on the first lookup and saved on every change """
+
+    def __init__(self, path: Optional[Path] = DEFAULT_PATH, max_age: float = 7 * 24 * 60 * 60,
+                 min_samples: int = 10, max_relative_error: float = 0.05) -> None:
+        self._path = path
+        self._max_age = max_age
+        self._min_samples = min_samples
+        self._max_relative_error = max_relative_error
+
+        self._lock = Lock()
+        self._profiles: Optional[Dict[ProfileCacheKey, CachedProfile]] = None
+        self._hits: int = 0
+        self._misses: int = 0
+        self._stale: int = 0
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._loaded())
+
+    def __repr__(self) -> str:
+        return f'{self.__class__.__name__}({self._path})'
+
+    @property
+    def path(self) -> Optional[Path]:
+        return self._path
+
+    def is_usable(self, profile: CachedProfile, now: Optional[float] = None) -> bool:
+        """ Whether `profile` is fresh and confident enough to replace a solorun profiling """
+        return profile.age(now) <= self._max_age and \
+            profile.num_samples >= self._min_samples and \
+            profile.relative_error() <= self._max_relative_error
+
+    def get(self, key: ProfileCacheKey) -> Optional[CachedProfile]:
+        """ :return: the profile of `key` if it is usable, otherwise None """
+        with self._lock:
+            profile = self._loaded().get(key)
+            if profile is None:
+                self._misses += 1
+                return None
+            if not self.is_usable(profile):
+                self._stale += 1
+                return None
+            self._hits += 1
+            return profile
+
+    def put(self, key: ProfileCacheKey, mean: Sequence[float], std: Sequence[float], num_samples: int) -> None:
+        """ Keep the profile which has just been measured, replacing the old one of `key` """
+        profile = CachedProfile(tuple(mean), tuple(std), num_samples, time.time())
+        with self._lock:
+            self._loaded()[key] = profile
+            self._save()
+
+    def invalidate(self, key: ProfileCacheKey) -> bool:
+        """ Drop the profile of `key` (e.g. it fails to be verified against the current metrics) """
+        with self._lock:
+            if self._loaded().pop(key, None) is None:
+                return False
+            self._save()
+            return True
+
+    def cache_info(self) -> ProfileCacheInfo:
+        with self._lock:
+            return ProfileCacheInfo(self._hits, self._misses, self._stale, len(self._loaded()))
+
+    def _loaded(self) -> Dict[ProfileCacheKey, CachedProfile]:
+        if self._profiles is None:
+            self._profiles = self._load()
+        return self._profiles
+
+    def _load(self) -> Dict[ProfileCacheKey, CachedProfile]:
+        if self._path is None:
+            return dict()
+
+        try:
+            content = json.loads(self._path.read_text())
+        except FileNotFoundError:
+            return dict()
+        except (OSError, ValueError) as e:
+            logger = logging.getLogger(__name__)
+            logger.warning(f'ignore the broken solorun profile cache {self._path}: {e}')
+            return dict()
+
+        if content.get('version') != _CACHE_VERSION or tuple(content.get('columns', ())) != MetricRingBuffer.COLUMNS:
+            return dict()
+        return dict((ProfileCacheKey(*key), CachedProfile(tuple(mean), tuple(std), num_samples, profiled_at))
+                    for key, mean, std, num_samples, profiled_at in content['profiles'])
+
+    def _save(self) -> None:
+        if self._path is None:
+            return
+
+        content = {
+            'version': _CACHE_VERSION,
+            'columns': MetricRingBuffer.COLUMNS,
+            'profiles': [(key, *profile) for key, profile in self._profiles.items()]
+        }
+        tmp_path = self._path.with_name(f'{self._path.name}.{os.getpid()}.tmp')
+        try:
+            self._path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path.write_text(json.dumps(content))
+            tmp_path.replace(self._path)
+        except OSError as e:
+            logger = logging.getLogger(__name__)
+            logger.warning(f'failed to save the solorun profile cache to {self._path}: {e}')
+
+
+class _LazyCache:
+    _lock: ClassVar[Lock] = Lock()
+    _cache: ClassVar[Optional[SoloRunProfileCache]] = None
+
+    @classmethod
+    def get(cls) -> SoloRunProfileCache:
+        if cls._cache is None:
+            with cls._lock:
+                if cls._cache is None:
+                    path = os.environ.get('SOLORUN_PROFILE_CACHE')
+                    if path is None:
+                        cls._cache = SoloRunProfileCache()
+                    else:
+                        cls._cache = SoloRunProfileCache(Path(path) if path else None)
+        return cls._cache
+
+
+def default_profile_cache() -> SoloRunProfileCache:
+    """ The cache which the isolation policies share by default """
+    return _LazyCache.get()
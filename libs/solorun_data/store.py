@@ -0,0 +1,267 @@
+# coding: UTF-8
+
+"""
+The solorun profiles of every node class, compiled from the JSON files under `solorun_data/` into a single file.
+
+The profiles of the edge nodes (`jetson_tx2`, the same schema as `BasicMetric`) and of the servers (`8core`,
+`16core`: l2miss, l3miss, local_mem, ...) are normalized into the union of their counters, NaN where a schema
+does not have one. The file is a small header, a JSON index and a float64 matrix with a contiguous column per
+counter, which is mapped into memory on the first lookup, so a process never parses the JSON files.
+
+Rebuild it whenever the JSON files change:
+    python -m libs.solorun_data.store [--source solorun_data] [--output libs/solorun_data/solorun_profiles.bin]
+"""
+
+import argparse
+import json
+import logging
+import math
+import re
+import struct
+from collections.abc import Mapping
+from pathlib import Path
+from threading import Lock
+from typing import ClassVar, Dict, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+import numpy as np
+
+from ..metric_container.basic_metric import BasicMetric
+
+SOURCE_DIR = Path(__file__).resolve().parents[2] / 'solorun_data'
+STORE_PATH = Path(__file__).resolve().parent / 'solorun_profiles.bin'
+
+# the counters of `BasicMetric` followed by the ones only the server profiles have
+COLUMNS: Tuple[str, ...] = (
+    'llc_references', 'llc_misses', 'instructions', 'cycles',
+    'gpu_core_util', 'gpu_core_freq', 'gpu_emc_util', 'gpu_emc_freq',
+    'runtime', 'l2miss', 'l3miss', 'stall_cycles', 'wall_cycles', 'intra_coh', 'inter_coh', 'llc_size',
+    'local_mem', 'remote_mem',
+)
+_COLUMN_INDEX: Dict[str, int] = dict((name, idx) for idx, name in enumerate(COLUMNS))
+_GPU_COLUMNS = tuple(_COLUMN_INDEX[name] for name in ('gpu_core_util', 'gpu_core_freq', 'gpu_emc_util', 'gpu_emc_freq'))
+
+# The server profiles have no LLC references: the L2 misses are the references to the L3 (the LLC) there
+_DERIVED_COLUMNS: Tuple[Tuple[str, str], ...] = (('llc_references', 'l2miss'), ('llc_misses', 'l3miss'))
+
+_MAGIC = b'SRPS'
+_VERSION = 1
+_HEADER = struct.Struct('<4sHxxII')     # magic, version, length of the index, offset of the matrix
+_ALIGNMENT = 64
+
+_CORE_DIR = re.compile(r'(\d+)core')
+
+# the solorun profiles are measured over a second
+PROFILE_INTERVAL = 1000
+
+
+class ProfileKey(NamedTuple):
+    workload: str
+    node_class: str     # the machine which the profile was measured on (e.g. 'jetson_tx2', 'server')
+    num_cores: int      # 0 if it is not recorded
+
+
+def _source_of(directory: Path) -> Tuple[str, int]:
+    """ :return: the node class and the number of cores of the profiles in `directory` """
+    matched = _CORE_DIR.fullmatch(directory.name)
+    if matched is not None:
+        return 'server', int(matched.group(1))
+    return directory.name, 0
+
+
+def _normalize(profile: Dict[str, Union[str, float]]) -> List[float]:
+    row = [float(profile[name]) if name in profile else math.nan for name in COLUMNS]
+    for column, source in _DERIVED_COLUMNS:
+        idx = _COLUMN_INDEX[column]
+        if math.isnan(row[idx]) and source in profile:
+            row[idx] = float(profile[source])
+    return row
+
+
+def compile_profiles(source_dir: Path = SOURCE_DIR) -> Tuple[List[ProfileKey], np.ndarray]:
+    """
+    Read every JSON profile in the subdirectories of `source_dir`
+    :return: the keys of the profiles and their counters as a matrix of (len(COLUMNS), number of profiles)
+    """
+    keys: List[ProfileKey] = list()
+    rows: List[List[float]] = list()
+    for directory in sorted(path for path in source_dir.iterdir() if path.is_dir()):
+        node_class, num_cores = _source_of(directory)
+        for data in sorted(directory.glob('*.json')):
+            profile = json.loads(data.read_text())
+            keys.append(ProfileKey(profile['name'], node_class, num_cores))
+            rows.append(_normalize(profile))
+
+    matrix = np.array(rows, dtype=np.float64).reshape(len(rows), len(COLUMNS)).T
+    return keys, np.ascontiguousarray(matrix)
+
+
+def write_store(path: Path, keys: List[ProfileKey], matrix: np.ndarray) -> None:
+    index = json.dumps({'columns': COLUMNS, 'keys': keys}).encode()
+    offset = _HEADER.size + len(index)
+    offset += -offset % _ALIGNMENT
+
+    tmp_path = path.with_name(path.name + '.tmp')
+    with tmp_path.open('wb') as fp:
+        fp.write(_HEADER.pack(_MAGIC, _VERSION, len(index), offset))
+        fp.write(index)
+        fp.write(b'\0' * (offset - _HEADER.size - len(index)))
+        fp.write(matrix.astype('<f8').tobytes())
+    tmp_path.replace(path)
+
+
+class SoloRunStore:
+    """
+    The compiled solorun profiles, indexed by (workload, node class, number of cores).
+    A lookup is a dict access and a gather of a column per counter.
+    """
+
+    def __init__(self, keys: List[ProfileKey], matrix: np.ndarray) -> None:
+        self._keys = keys
+        self._matrix = matrix   # (len(COLUMNS), number of profiles)
+        self._index: Dict[ProfileKey, int] = dict((key, idx) for idx, key in enumerate(keys))
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, key: Tuple[str, str, int]) -> bool:
+        return key in self._index
+
+    def __repr__(self) -> str:
+        return f'{self.__class__.__name__}({len(self._keys)} profiles of {self.node_classes()})'
+
+    @classmethod
+    def load(cls, path: Path = STORE_PATH) -> 'SoloRunStore':
+        """ Map the compiled file into memory """
+        with path.open('rb') as fp:
+            magic, version, index_len, offset = _HEADER.unpack(fp.read(_HEADER.size))
+            if magic != _MAGIC or version != _VERSION:
+                raise ValueError(f'{path} is not a solorun profile store of version {_VERSION}')
+            index = json.loads(fp.read(index_len).decode())
+
+        if tuple(index['columns']) != COLUMNS:
+            raise ValueError(f'the columns of {path} are outdated. rebuild it')
+        keys = [ProfileKey(*key) for key in index['keys']]
+        if len(keys) == 0:
+            return cls(keys, np.zeros((len(COLUMNS), 0)))
+        matrix = np.memmap(path, dtype='<f8', mode='r', offset=offset, shape=(len(COLUMNS), len(keys)))
+        # a plain view on the mapped pages. slicing a memmap is several times slower
+        return cls(keys, matrix.view(np.ndarray))
+
+    @classmethod
+    def from_json(cls, source_dir: Path = SOURCE_DIR) -> 'SoloRunStore':
+        return cls(*compile_profiles(source_dir))
+
+    @property
+    def keys(self) -> List[ProfileKey]:
+        return self._keys
+
+    def node_classes(self) -> List[Tuple[str, int]]:
+        return sorted(set((key.node_class, key.num_cores) for key in self._keys))
+
+    def row(self, workload: str, node_class: str, num_cores: int = 0) -> Optional[np.ndarray]:
+        """ :return: the counters of the profile in the order of `COLUMNS` (NaN if it is not measured) or None """
+        idx = self._index.get(ProfileKey(workload, node_class, num_cores))
+        return None if idx is None else self._matrix[:, idx]
+
+    def get(self, workload: str, node_class: str, num_cores: int = 0, with_gpu: bool = True) \
+            -> Optional[BasicMetric]:
+        """ :return: the profile as a `BasicMetric` per second or None. the GPU counters are 0 without `with_gpu` """
+        row = self.row(workload, node_class, num_cores)
+        if row is None:
+            return None
+        return self._to_metric(row, with_gpu)
+
+    def value(self, workload: str, node_class: str, num_cores: int, column: str) -> Optional[float]:
+        idx = self._index.get(ProfileKey(workload, node_class, num_cores))
+        return None if idx is None else float(self._matrix[_COLUMN_INDEX[column], idx])
+
+    def profiles(self, node_class: str, num_cores: int = 0, with_gpu: bool = True) -> 'SoloRunProfiles':
+        return SoloRunProfiles(self, node_class, num_cores, with_gpu)
+
+    @staticmethod
+    def _to_metric(row: np.ndarray, with_gpu: bool) -> BasicMetric:
+        # the counters which are not measured are 0 as the old JSON loader had them
+        values = [0.0 if math.isnan(value) else value for value in row[:8].tolist()]
+        if not with_gpu:
+            for idx in _GPU_COLUMNS:
+                values[idx] = 0
+        return BasicMetric(*values, PROFILE_INTERVAL)
+
+
+class SoloRunProfiles(Mapping):
+    """ The profiles of a node class as a read-only mapping of the workload names to `BasicMetric`s """
+
+    def __init__(self, store: SoloRunStore, node_class: str, num_cores: int, with_gpu: bool) -> None:
+        self._store = store
+        self._node_class = node_class
+        self._num_cores = num_cores
+        self._with_gpu = with_gpu
+        self._workloads = tuple(key.workload for key in store.keys
+                                if key.node_class == node_class and key.num_cores == num_cores)
+        self._cache: Dict[str, BasicMetric] = dict()
+
+    def __getitem__(self, workload: str) -> BasicMetric:
+        metric = self._cache.get(workload)
+        if metric is None:
+            metric = self._store.get(workload, self._node_class, self._num_cores, self._with_gpu)
+            if metric is None:
+                raise KeyError(workload)
+            self._cache[workload] = metric
+        return metric
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._workloads)
+
+    def __len__(self) -> int:
+        return len(self._workloads)
+
+
+class _LazyStore:
+    _lock: ClassVar[Lock] = Lock()
+    _store: ClassVar[Optional[SoloRunStore]] = None
+
+    @classmethod
+    def get(cls) -> SoloRunStore:
+        if cls._store is None:
+            with cls._lock:
+                if cls._store is None:
+                    cls._store = cls._open()
+        return cls._store
+
+    @staticmethod
+    def _open() -> SoloRunStore:
+        try:
+            return SoloRunStore.load()
+        except (OSError, ValueError) as e:
+            logger = logging.getLogger(__name__)
+            logger.warning(f'fall back to the JSON solorun profiles ({e}). '
+                           f'run `python -m libs.solorun_data.store` to compile them')
+            return SoloRunStore.from_json()
+
+
+def default_store() -> SoloRunStore:
+    """ The compiled store, mapped into memory on the first call """
+    return _LazyStore.get()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Compile the solorun profiles into a memory-mappable store.')
+    parser.add_argument('-s', '--source', type=Path, default=SOURCE_DIR,
+                        help=f'directory of the profiles per node class. (default : {SOURCE_DIR})')
+    parser.add_argument('-o', '--output', type=Path, default=STORE_PATH,
+                        help=f'compiled store. (default : {STORE_PATH})')
+    args = parser.parse_args()
+
+    keys, matrix = compile_profiles(args.source)
+    write_store(args.output, keys, matrix)
+
+    store = SoloRunStore.load(args.output)
+    for idx, key in enumerate(keys):
+        stored, compiled = store.row(*key), matrix[:, idx]
+        if not ((stored == compiled) | (np.isnan(stored) & np.isnan(compiled))).all():
+            raise RuntimeError(f'{args.output} does not match the profile of {key}')
+    print(f'{len(keys)} profiles of {store.node_classes()} are compiled into {args.output}')
+
+
+if __name__ == '__main__':
+    main()
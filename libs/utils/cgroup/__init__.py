@@ -3,3 +3,4 @@
 from .base import BaseCgroup
 from .cpu import Cpu
 from .cpuset import CpuSet
+from .fs import CgroupFs
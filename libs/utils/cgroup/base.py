@@ -5,16 +5,26 @@ import grp
 import os
 import subprocess
 from abc import ABCMeta
-from typing import ClassVar, Iterable
+from typing import ClassVar, Iterable, Optional
+
+from .fs import DEFAULT_ROOT, CgroupFs, default_fs
 
 
 class BaseCgroup(metaclass=ABCMeta):
-    MOUNT_POINT: ClassVar[str] = '/sys/fs/cgroup'
+    MOUNT_POINT: ClassVar[str] = DEFAULT_ROOT
     CONTROLLER: ClassVar[str] = str()
 
-    def __init__(self, group_name: str) -> None:
+    def __init__(self, group_name: str, fs: Optional[CgroupFs] = None) -> None:
         self._group_name: str = group_name
         self._group_path: str = f'{self.CONTROLLER}:{group_name}'
+        # the control files are read and written directly. the other operations still use libcgroup tools
+        self._fs: CgroupFs = default_fs() if fs is None else fs
+
+    def _read(self, name: str) -> str:
+        return self._fs.read(self.CONTROLLER, self._group_name, name)
+
+    def _write(self, name: str, value: str) -> bool:
+        return self._fs.write(self.CONTROLLER, self._group_name, name, value)
 
     def create_group(self) -> None:
         uname: str = getpass.getuser()
@@ -24,9 +34,12 @@ class BaseCgroup(metaclass=ABCMeta):
         subprocess.check_call(args=(
             'sudo', 'cgcreate', '-a', f'{uname}:{gname}', '-d', '755', '-f',
             '644', '-t', f'{uname}:{gname}', '-s', '644', '-g', self._group_path))
+        # a group of the same name may have been removed without `delete()`, and the new one has the default values
+        self._fs.invalidate(self.CONTROLLER, self._group_name)
 
     def add_tasks(self, pids: Iterable[int]) -> None:
         subprocess.check_call(args=('cgclassify', '-g', self._group_path, '--sticky', *map(str, pids)))
 
     def delete(self) -> None:
         subprocess.check_call(args=('sudo', 'cgdelete', '-r', '-g', self._group_path))
+        self._fs.invalidate(self.CONTROLLER, self._group_name)
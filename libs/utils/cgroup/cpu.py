@@ -1,10 +1,9 @@
 # coding: UTF-8
 
-
-import subprocess
 from typing import ClassVar, Set
 
 from .base import BaseCgroup
+from .fs import default_fs
 from ..hyphen import convert_to_set
 
 
@@ -16,20 +15,17 @@ class Cpu(BaseCgroup):
 
     @staticmethod
     def limit_cpu_quota(group_name, quota: int, period: int) -> None:
-        subprocess.check_call(args=('cgset', '-r', f'cpu.cfs_quota_us={quota}', group_name))
-        subprocess.check_call(args=('cgset', '-r', f'cpu.cfs_period_us={period}', group_name))
+        fs = default_fs()
+        fs.write(Cpu.CONTROLLER, group_name, 'cpu.cfs_quota_us', str(quota))
+        fs.write(Cpu.CONTROLLER, group_name, 'cpu.cfs_period_us', str(period))
 
     @staticmethod
     def read_cpus(group_name) -> Set[int]:
-        cpus = subprocess.check_output(args=('cgget', '-nvr', 'cpuset.cpus', group_name), encoding='ASCII')
-        if cpus is '':
-            raise ProcessLookupError()
-        return convert_to_set(cpus)
+        return convert_to_set(default_fs().read('cpuset', group_name, 'cpuset.cpus'))
 
     @staticmethod
     def get_cfs_period_us(group_name) -> int:
-        period = subprocess.check_output(args=('cgget', '-nvr', 'cpu.cfs_period_us', group_name), encoding='ASCII')
-        return int(period)
+        return int(default_fs().read(Cpu.CONTROLLER, group_name, 'cpu.cfs_period_us'))
 
     @staticmethod
     def limit_cycle_percentage(group_name, limit_percentage, period=None) -> None:
@@ -1,35 +1,25 @@
 # coding: UTF-8
 
-
-import subprocess
 from typing import ClassVar, Iterable, Set
 
 from .base import BaseCgroup
-from ..hyphen import convert_to_set
+from ..hyphen import convert_to_hyphen, convert_to_set
 
 
 class CpuSet(BaseCgroup):
     CONTROLLER: ClassVar[str] = 'cpuset'
 
     def assign_cpus(self, core_set: Iterable[int]) -> None:
-        core_ids = ','.join(map(str, core_set))
-        subprocess.check_call(args=('cgset', '-r', f'cpuset.cpus={core_ids}', self._group_name))
+        self._write('cpuset.cpus', convert_to_hyphen(core_set))
 
     def assign_mems(self, socket_set: Iterable[int]) -> None:
-        mem_ids = ','.join(map(str, socket_set))
-        subprocess.check_call(args=('cgset', '-r', f'cpuset.mems={mem_ids}', self._group_name))
+        self._write('cpuset.mems', convert_to_hyphen(socket_set))
 
     def set_memory_migrate(self, flag: bool) -> None:
-        subprocess.check_call(args=('cgset', '-r', f'cpuset.memory_migrate={int(flag)}', self._group_name))
+        self._write('cpuset.memory_migrate', str(int(flag)))
 
     def read_cpus(self) -> Set[int]:
-        cpus = subprocess.check_output(args=('cgget', '-nvr', 'cpuset.cpus', self._group_name), encoding='ASCII')
-        if cpus is '':
-            raise ProcessLookupError()
-        return convert_to_set(cpus)
+        return convert_to_set(self._read('cpuset.cpus'))
 
     def read_mems(self) -> Set[int]:
-        mems = subprocess.check_output(args=('cgget', '-nvr', 'cpuset.mems', self._group_name), encoding='ASCII')
-        if mems is '':
-            raise ProcessLookupError()
-        return convert_to_set(mems)
+        return convert_to_set(self._read('cpuset.mems'))
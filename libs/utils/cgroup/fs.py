@@ -0,0 +1,107 @@
+# coding: UTF-8
+
+"""
+Read and write the control files of the cgroups (v1) directly, instead of forking `cgget` and `cgset`.
+
+A control file is `<root>/<controller>/<group>/<name>` (e.g. `/sys/fs/cgroup/cpuset/foo_42/cpuset.cpus`).
+The root is `CGROUP_ROOT` or `/sys/fs/cgroup`, and `set_root()` changes it.
+The last value written to or read from every file is kept, so writing the same value again is skipped.
+The cpusets are always written, since the kernel changes them by itself (e.g. when a CPU goes offline).
+"""
+
+import os
+from pathlib import Path
+from typing import Dict, FrozenSet, Optional, Tuple
+
+DEFAULT_ROOT = '/sys/fs/cgroup'
+
+_FileKey = Tuple[str, str, str]     # controller, group, name
+# the files whose last known value may be stale, so they are never skipped
+_KERNEL_MUTABLE: FrozenSet[str] = frozenset(('cpuset.cpus', 'cpuset.mems'))
+
+
+class CgroupFs:
+    def __init__(self, root: str = DEFAULT_ROOT) -> None:
+        self._root = Path(root)
+        # the last known value of every control file
+        self._values: Dict[_FileKey, str] = dict()
+
+    def __repr__(self) -> str:
+        return f'{self.__class__.__name__}({self._root})'
+
+    @property
+    def root(self) -> Path:
+        return self._root
+
+    def path(self, controller: str, group: str, name: str) -> Path:
+        return self._root / controller / group / name
+
+    def read(self, controller: str, group: str, name: str) -> str:
+        """
+        Read the file, since the kernel may change it (e.g. cpuset.cpus when a CPU goes offline)
+        :raises ProcessLookupError: the group does not exist or the value is empty
+        """
+        key = (controller, group, name)
+        try:
+            with open(self.path(*key)) as fp:
+                value = fp.read().strip()
+        except FileNotFoundError:
+            self._values.pop(key, None)
+            raise ProcessLookupError(f'cgroup {controller}:{group} does not exist')
+
+        if name not in _KERNEL_MUTABLE:
+            self._values[key] = value
+        if value == '':
+            raise ProcessLookupError(f'{name} of cgroup {controller}:{group} is empty')
+        return value
+
+    def write(self, controller: str, group: str, name: str, value: str) -> bool:
+        """
+        :return: False if the file already has `value`, so it is not written
+        :raises ProcessLookupError: the group does not exist
+        """
+        key = (controller, group, name)
+        if self._values.get(key) == value:
+            return False
+
+        # a single write(2) as `cgset` does. the kernel validates the value on it and ignores O_TRUNC
+        try:
+            fd = os.open(str(self.path(*key)), os.O_WRONLY | os.O_TRUNC)
+            try:
+                os.write(fd, value.encode('ASCII'))
+            finally:
+                os.close(fd)
+        except FileNotFoundError:
+            self._values.pop(key, None)
+            raise ProcessLookupError(f'cgroup {controller}:{group} does not exist')
+        except OSError:
+            # the value of the file is unknown after a failed write (e.g. the kernel rejects the value)
+            self._values.pop(key, None)
+            raise
+
+        if name not in _KERNEL_MUTABLE:
+            self._values[key] = value
+        return True
+
+    def invalidate(self, controller: Optional[str] = None, group: Optional[str] = None) -> None:
+        """ Forget the values of a group (e.g. it is deleted), or of every group if `group` is None """
+        if controller is None and group is None:
+            self._values.clear()
+            return
+
+        for key in tuple(self._values):
+            if (controller is None or key[0] == controller) and (group is None or key[1] == group):
+                del self._values[key]
+
+
+_default_fs = CgroupFs(os.environ.get('CGROUP_ROOT', DEFAULT_ROOT))
+
+
+def default_fs() -> CgroupFs:
+    return _default_fs
+
+
+def set_root(root: str) -> None:
+    """ Use the cgroups under `root` from now on (e.g. a mock tree in the tests) """
+    global _default_fs
+    _default_fs = CgroupFs(root)
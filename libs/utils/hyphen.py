@@ -18,5 +18,12 @@ def convert_to_set(hyphen_str: str) -> Set[int]:
 
 
 def convert_to_hyphen(core_ids: Iterable[int]) -> str:
-    # TODO
-    return ','.join(map(str, set(core_ids)))
+    """ The list format of the kernel (e.g. {0, 1, 2, 3, 6} -> '0-3,6'), as cpuset.cpus is read back """
+    ranges = list()
+    for core_id in sorted(set(core_ids)):
+        if ranges and ranges[-1][1] + 1 == core_id:
+            ranges[-1][1] = core_id
+        else:
+            ranges.append([core_id, core_id])
+
+    return ','.join(str(start) if start == end else f'{start}-{end}' for start, end in ranges)
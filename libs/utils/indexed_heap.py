@@ -0,0 +1,102 @@
+# coding: UTF-8
+
+from typing import Dict, Generic, Hashable, Iterator, List, Optional, Sized, Tuple, TypeVar
+
+T = TypeVar('T', bound=Hashable)
+
+
+class IndexedMinHeap(Generic[T], Sized):
+    """
+    Binary min-heap that also tracks the position of each item.
+    The priority of an item already in the heap can be changed or the item can be removed in O(log n),
+    and the item with the lowest priority is read in O(1).
+    """
+
+    def __init__(self) -> None:
+        self._heap: List[Tuple[float, T]] = list()
+        self._pos: Dict[T, int] = dict()
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def __contains__(self, item: T) -> bool:
+        return item in self._pos
+
+    def __iter__(self) -> Iterator[T]:
+        return (item for _, item in self._heap)
+
+    def priority(self, item: T) -> float:
+        return self._heap[self._pos[item]][0]
+
+    def peek(self) -> Optional[T]:
+        return self._heap[0][1] if self._heap else None
+
+    def peek_priority(self) -> Optional[float]:
+        return self._heap[0][0] if self._heap else None
+
+    def item_at(self, idx: int) -> T:
+        """ Return the item stored at `idx` of the underlying array. Used for O(1) random sampling """
+        return self._heap[idx][1]
+
+    def push(self, item: T, priority: float) -> None:
+        """ Insert `item`, or change its priority if it is already in the heap """
+        idx = self._pos.get(item)
+        if idx is None:
+            self._heap.append((priority, item))
+            self._pos[item] = len(self._heap) - 1
+            self._sift_up(len(self._heap) - 1)
+            return
+
+        old_priority = self._heap[idx][0]
+        self._heap[idx] = (priority, item)
+        if priority < old_priority:
+            self._sift_up(idx)
+        elif priority > old_priority:
+            self._sift_down(idx)
+
+    def remove(self, item: T) -> None:
+        idx = self._pos.pop(item)
+        last = self._heap.pop()
+        if idx == len(self._heap):
+            return
+
+        self._heap[idx] = last
+        self._pos[last[1]] = idx
+        self._sift_up(idx)
+        self._sift_down(self._pos[last[1]])
+
+    def discard(self, item: T) -> None:
+        if item in self._pos:
+            self.remove(item)
+
+    def _swap(self, i: int, j: int) -> None:
+        heap = self._heap
+        heap[i], heap[j] = heap[j], heap[i]
+        self._pos[heap[i][1]] = i
+        self._pos[heap[j][1]] = j
+
+    def _sift_up(self, idx: int) -> None:
+        heap = self._heap
+        while idx > 0:
+            parent = (idx - 1) >> 1
+            if heap[idx][0] < heap[parent][0]:
+                self._swap(idx, parent)
+                idx = parent
+            else:
+                break
+
+    def _sift_down(self, idx: int) -> None:
+        heap = self._heap
+        size = len(heap)
+        while True:
+            smallest = idx
+            left = 2 * idx + 1
+            right = left + 1
+            if left < size and heap[left][0] < heap[smallest][0]:
+                smallest = left
+            if right < size and heap[right][0] < heap[smallest][0]:
+                smallest = right
+            if smallest == idx:
+                break
+            self._swap(idx, smallest)
+            idx = smallest
@@ -0,0 +1,188 @@
+# coding: UTF-8
+
+"""
+The hardware profile of this machine, detected once per process and cached in a file per boot.
+
+The detection reads sysfs and procfs only. `cpuinfo.get_cpu_info()`, which takes seconds, is the fallback for the
+cache sizes when sysfs does not have them. The profile is persisted to
+`<temp dir>/machine-profile-<boot id>.json` so that the other processes of the same boot skip the detection too.
+`MACHINE_PROFILE_CACHE` overrides the path of the file, and an empty value turns the file off.
+"""
+
+import json
+import logging
+import os
+import platform
+import re
+import tempfile
+from pathlib import Path
+from threading import Lock
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from .hyphen import convert_to_set
+
+_CACHE_VERSION = 1
+_BOOT_ID_PATH = Path('/proc/sys/kernel/random/boot_id')
+_TEGRA_PATH = Path('/proc/device-tree/compatible')
+_CPU_CACHE_PATH = Path('/sys/devices/system/cpu/cpu0/cache')
+_NUMA_PATH = Path('/sys/devices/system/node')
+_RESCTRL_L3_PATH = Path('/sys/fs/resctrl/info/L3')
+_SIZE_REGEX = re.compile(r'(\d+)\s*([KMG]?)', re.IGNORECASE)
+_SIZE_UNITS = {'': 1, 'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+
+
+class MachineProfile(NamedTuple):
+    boot_id: str
+    arch: str                       # e.g. 'x86_64' or 'aarch64'
+    gpu_type: Optional[str]         # 'integrated', 'discrete' or None
+    num_cpus: int
+    l2_cache_size: Optional[int]    # bytes
+    l3_cache_size: Optional[int]    # bytes
+    numa_nodes: Dict[int, Tuple[int, ...]]  # NUMA node -> its cores
+    l3_cbm_mask: Optional[str]      # resctrl. None if it is not mounted
+    l3_min_cbm_bits: Optional[int]
+
+    @property
+    def llc_size(self) -> Optional[int]:
+        return self.l3_cache_size if self.l3_cache_size is not None else self.l2_cache_size
+
+    @property
+    def node_class(self) -> str:
+        """ The node class of the solorun profiles (`libs.solorun_data.store`) measured on this machine """
+        # FIXME: hard coded. tegra186 is Jetson TX2
+        return 'jetson_tx2' if self.gpu_type == 'integrated' else 'server'
+
+
+def _read(path: Path) -> Optional[str]:
+    try:
+        return path.read_text().strip()
+    except OSError:
+        return None
+
+
+def _parse_size(size: str) -> Optional[int]:
+    """ '2048K' (sysfs) or '2048 KB' (cpuinfo) to bytes """
+    matched = _SIZE_REGEX.match(size.strip())
+    if matched is None:
+        return None
+    return int(matched.group(1)) * _SIZE_UNITS[matched.group(2).upper()]
+
+
+def _detect_gpu_type() -> Optional[str]:
+    compatible = _read(_TEGRA_PATH)
+    if compatible is not None and 'tegra186' in compatible:
+        return 'integrated'
+    # TODO: Code for checking whether discrete GPU exist
+    return None
+
+
+def _detect_cache_sizes() -> Tuple[Optional[int], Optional[int]]:
+    sizes: Dict[int, int] = dict()
+    if _CPU_CACHE_PATH.is_dir():
+        for index in _CPU_CACHE_PATH.glob('index*'):
+            level, cache_type, size = _read(index / 'level'), _read(index / 'type'), _read(index / 'size')
+            if level is None or size is None or cache_type == 'Instruction':
+                continue
+            parsed = _parse_size(size)
+            if parsed is not None:
+                sizes[int(level)] = parsed
+
+    if 2 not in sizes:
+        # slow. sysfs of some ARM kernels does not have the caches
+        from cpuinfo import cpuinfo
+        info = cpuinfo.get_cpu_info()
+        for level in (2, 3):
+            size = info.get(f'l{level}_cache_size')
+            if size:
+                sizes[level] = _parse_size(str(size))
+
+    return sizes.get(2), sizes.get(3)
+
+
+def _detect_numa_nodes() -> Dict[int, Tuple[int, ...]]:
+    nodes: Dict[int, Tuple[int, ...]] = dict()
+    online = _read(_NUMA_PATH / 'online')
+    if online is None:
+        return nodes
+    for node in sorted(convert_to_set(online)):
+        cpulist = _read(_NUMA_PATH / f'node{node}' / 'cpulist')
+        nodes[node] = tuple(sorted(convert_to_set(cpulist))) if cpulist else tuple()
+    return nodes
+
+
+def detect(boot_id: str) -> MachineProfile:
+    l2_cache_size, l3_cache_size = _detect_cache_sizes()
+    min_cbm_bits = _read(_RESCTRL_L3_PATH / 'min_cbm_bits')
+    return MachineProfile(
+            boot_id=boot_id,
+            arch=platform.machine(),
+            gpu_type=_detect_gpu_type(),
+            num_cpus=os.cpu_count() or 1,
+            l2_cache_size=l2_cache_size,
+            l3_cache_size=l3_cache_size,
+            numa_nodes=_detect_numa_nodes(),
+            l3_cbm_mask=_read(_RESCTRL_L3_PATH / 'cbm_mask'),
+            l3_min_cbm_bits=None if min_cbm_bits is None else int(min_cbm_bits),
+    )
+
+
+def _boot_id() -> str:
+    # the hardware can only change across reboots
+    return _read(_BOOT_ID_PATH) or 'unknown'
+
+
+def cache_path(boot_id: str) -> Optional[Path]:
+    path = os.environ.get('MACHINE_PROFILE_CACHE')
+    if path is None:
+        return Path(tempfile.gettempdir()) / f'machine-profile-{boot_id}.json'
+    return Path(path) if path else None
+
+
+def _load(path: Path, boot_id: str) -> Optional[MachineProfile]:
+    try:
+        cached = json.loads(path.read_text())
+    except (OSError, ValueError):
+        return None
+    if cached.get('version') != _CACHE_VERSION or cached.get('boot_id') != boot_id:
+        return None
+
+    try:
+        fields = dict((name, cached[name]) for name in MachineProfile._fields)
+    except KeyError:
+        return None
+    fields['numa_nodes'] = dict((int(node), tuple(cores)) for node, cores in fields['numa_nodes'].items())
+    return MachineProfile(**fields)
+
+
+def _store(path: Path, profile: MachineProfile) -> None:
+    content = dict(profile._asdict(), version=_CACHE_VERSION)
+    tmp_path = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+    try:
+        tmp_path.write_text(json.dumps(content))
+        tmp_path.replace(path)
+    except OSError as e:
+        logger = logging.getLogger(__name__)
+        logger.debug(f'failed to cache the machine profile to {path}: {e}')
+
+
+_lock = Lock()
+_profile: Optional[MachineProfile] = None
+
+
+def get_machine_profile() -> MachineProfile:
+    """ The profile of this machine. It is detected (or loaded from the cache file) on the first call """
+    global _profile
+    if _profile is not None:
+        return _profile
+
+    with _lock:
+        if _profile is None:
+            boot_id = _boot_id()
+            path = cache_path(boot_id)
+            profile = None if path is None else _load(path, boot_id)
+            if profile is None:
+                profile = detect(boot_id)
+                if path is not None:
+                    _store(path, profile)
+            _profile = profile
+    return _profile
@@ -1,10 +1,9 @@
 # coding: UTF-8
 
 from enum import IntEnum
-from pathlib import Path
 from typing import Optional
 
-from cpuinfo import cpuinfo
+from .machine_profile import get_machine_profile
 
 
 class NodeType(IntEnum):
@@ -19,6 +18,8 @@ class ArchType(IntEnum):
 
 
 class MachineChecker:
+    """ The answers come from the machine profile, which is detected once per boot (see `get_machine_profile()`) """
+
     @staticmethod
     def get_node_type() -> Optional[NodeType]:
         """
@@ -59,9 +60,7 @@ class MachineChecker:
 
         :return: the CPU type which is either Intel (x86_64) or ARM (aarch64)
         """
-        info = cpuinfo.get_cpu_info()
-        cpu_arch = info['raw_arch_string']
-        return cpu_arch
+        return get_machine_profile().arch
 
     @staticmethod
     def get_gpu_type() -> Optional[str]:
@@ -69,15 +68,4 @@ class MachineChecker:
 
         :return: the GPU type which is either integrated or discrete one
         """
-        gpu_type = None
-        tegra_path = Path('/proc/device-tree/compatible')
-        if tegra_path.exists():
-            with tegra_path.open() as fp:
-                tegra_info = fp.readline()
-                if 'tegra186' in tegra_info:
-                    gpu_type = 'integrated'
-
-        # TODO: Code for checking whether discrete GPU exist
-        #gpu_type = 'discrete'
-
-        return gpu_type
+        return get_machine_profile().gpu_type
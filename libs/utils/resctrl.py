@@ -5,6 +5,8 @@ import subprocess
 from pathlib import Path
 from typing import ClassVar, List, Pattern, Tuple
 
+from .machine_profile import MachineProfile, get_machine_profile
+
 
 def len_of_mask(mask: str) -> int:
     cnt = 0
@@ -19,12 +21,35 @@ def bits_to_mask(bits: int) -> str:
     return f'{bits:x}'
 
 
-class ResCtrl:
+def _resctrl_profile() -> MachineProfile:
+    profile = get_machine_profile()
+    if profile.l3_cbm_mask is None or profile.l3_min_cbm_bits is None:
+        raise FileNotFoundError('resctrl is not mounted on /sys/fs/resctrl')
+    return profile
+
+
+class _ResCtrlMeta(type):
+    """ The limits of the cache allocation come from the machine profile when they are first used, not at import """
+
+    @property
+    def MAX_MASK(cls) -> str:
+        return _resctrl_profile().l3_cbm_mask
+
+    @property
+    def MAX_BITS(cls) -> int:
+        return len_of_mask(_resctrl_profile().l3_cbm_mask)
+
+    @property
+    def MIN_BITS(cls) -> int:
+        return _resctrl_profile().l3_min_cbm_bits
+
+    @property
+    def MIN_MASK(cls) -> str:
+        return bits_to_mask(cls.MIN_BITS)
+
+
+class ResCtrl(metaclass=_ResCtrlMeta):
     MOUNT_POINT: ClassVar[Path] = Path('/sys/fs/resctrl')
-    MAX_MASK: ClassVar[str] = Path('/sys/fs/resctrl/info/L3/cbm_mask').read_text(encoding='ASCII').strip()
-    MAX_BITS: ClassVar[int] = len_of_mask((MOUNT_POINT / 'info' / 'L3' / 'cbm_mask').read_text())
-    MIN_BITS: ClassVar[int] = int((MOUNT_POINT / 'info' / 'L3' / 'min_cbm_bits').read_text())
-    MIN_MASK: ClassVar[str] = bits_to_mask(MIN_BITS)
     STEP: ClassVar[int] = 1
     _read_regex: ClassVar[Pattern] = re.compile(r'L3:((\d+=[0-9a-fA-F]+;?)*)', re.MULTILINE)
 
@@ -0,0 +1,4 @@
+# coding: UTF-8
+
+from .log import WriteAheadLog
+from .state import NodeStatus, SchedulerState, job_submitted, job_transited, node_reported
@@ -0,0 +1,229 @@
+# coding: UTF-8
+
+import json
+import logging
+import os
+import struct
+import zlib
+from pathlib import Path
+from threading import Condition, Thread
+from typing import Any, ClassVar, Dict, Iterator, List, Optional, Tuple, Union
+
+from .state import SchedulerState
+
+
+class WriteAheadLog:
+    """
+    Append-only log of the scheduler state changes with periodic snapshots.
+
+    Each record is a JSON array prefixed by its length and CRC32, so a torn write at the tail is detected on recovery.
+    `append()` only copies the record into a buffer. A background thread writes and fsyncs the buffer every
+    `sync_interval` seconds, so a burst of records costs a single fsync (group commit).
+    Every record is also applied to `state`. Once `snapshot_every` records are appended after the last snapshot,
+    the state is written to a snapshot and the log segments it covers are deleted,
+    so the recovery replays at most about `snapshot_every` records on top of the latest snapshot.
+    """
+    _HEADER: ClassVar[struct.Struct] = struct.Struct('<II')    # payload length, CRC32 of the payload
+
+    def __init__(self, directory: Union[str, Path], state: SchedulerState, sync_interval: float = 0.01,
+                 snapshot_every: int = 50000) -> None:
+        self._dir = Path(directory)
+        self._dir.mkdir(parents=True, exist_ok=True)
+        self._state = state
+        self._sync_interval = sync_interval
+        self._snapshot_every = snapshot_every
+
+        self._cond = Condition()
+        self._buffer = bytearray()
+        self._last_seq: int = 0
+        self._synced_seq: int = 0
+        self._num_since_snapshot: int = 0
+        self._closed: bool = False
+
+        self._num_recovered: int = self._recover()
+        self._synced_seq = self._last_seq
+        # A new segment is started on every open, so the records are never appended after a torn tail
+        self._segment = self._open_segment(self._last_seq + 1)
+
+        self._flusher = Thread(target=self._flush_loop, name='wal-flusher', daemon=True)
+        self._flusher.start()
+
+    @property
+    def state(self) -> SchedulerState:
+        return self._state
+
+    @property
+    def sync_interval(self) -> float:
+        return self._sync_interval
+
+    @property
+    def last_seq(self) -> int:
+        return self._last_seq
+
+    @property
+    def synced_seq(self) -> int:
+        """ The sequence number of the last record which is on the disk """
+        return self._synced_seq
+
+    @property
+    def num_recovered(self) -> int:
+        """ The number of the records replayed on top of the snapshot when this log was opened """
+        return self._num_recovered
+
+    def append(self, record: List[Any]) -> int:
+        """
+        :param record: JSON serializable list whose first item is the kind of the record
+        :return: the sequence number of the record
+        """
+        with self._cond:
+            if self._closed:
+                raise ValueError('append to a closed write-ahead log')
+            seq = self._last_seq + 1
+            payload = json.dumps([seq] + record, separators=(',', ':')).encode()
+            self._buffer += self._HEADER.pack(len(payload), zlib.crc32(payload))
+            self._buffer += payload
+            self._state.apply(record)
+            self._last_seq = seq
+            self._num_since_snapshot += 1
+            return seq
+
+    def wait_synced(self, seq: int, timeout: Optional[float] = None) -> bool:
+        """ Block until the record of `seq` is on the disk """
+        with self._cond:
+            return self._cond.wait_for(lambda: self._synced_seq >= seq, timeout)
+
+    def close(self) -> None:
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        self._flusher.join()
+        self._segment.close()
+
+    # Recovery
+
+    def _recover(self) -> int:
+        logger = logging.getLogger(__name__)
+
+        snapshot_seq = 0
+        for path in sorted(self._dir.glob('snapshot-*.json'), reverse=True):
+            try:
+                with path.open('rb') as fp:
+                    snapshot = json.load(fp)
+            except (OSError, ValueError) as e:
+                logger.warning(f'skip the broken snapshot {path}: {e}')
+                continue
+            self._state.load(snapshot['state'])
+            snapshot_seq = snapshot['seq']
+            break
+
+        self._last_seq = snapshot_seq
+        num_replayed = 0
+        state = self._state
+        for path in sorted(self._dir.glob('wal-*.log')):
+            for seq, record in self._read_segment(path):
+                if seq <= snapshot_seq:
+                    continue
+                state.apply(record)
+                self._last_seq = seq
+                num_replayed += 1
+
+        self._num_since_snapshot = num_replayed
+        logger.info(f'recovered up to #{self._last_seq} from {self._dir} '
+                    f'(snapshot #{snapshot_seq} + {num_replayed} records)')
+        return num_replayed
+
+    def _read_segment(self, path: Path) -> Iterator[Tuple[int, List[Any]]]:
+        with path.open('rb') as fp:
+            data = memoryview(fp.read())
+
+        header = self._HEADER
+        header_size = header.size
+        loads = json.loads
+        crc32 = zlib.crc32
+        offset = 0
+        end = len(data)
+        while offset + header_size <= end:
+            length, checksum = header.unpack_from(data, offset)
+            payload = data[offset + header_size:offset + header_size + length]
+            if len(payload) < length or crc32(payload) != checksum:
+                break
+            decoded = loads(bytes(payload))
+            yield decoded[0], decoded[1:]
+            offset += header_size + length
+
+        if offset != end:
+            logger = logging.getLogger(__name__)
+            logger.warning(f'{path} has a torn or corrupted record at {offset}. the rest ({end - offset} bytes) '
+                           f'is ignored')
+
+    # Writing
+
+    def _open_segment(self, first_seq: int):
+        # If the segment exists, it only has a torn record because none of its records was recovered
+        return (self._dir / f'wal-{first_seq:020d}.log').open('wb')
+
+    def _flush_loop(self) -> None:
+        while True:
+            with self._cond:
+                if not self._closed:
+                    self._cond.wait(self._sync_interval)
+                closed = self._closed
+            self._sync()
+            if closed:
+                return
+
+    def _sync(self) -> None:
+        with self._cond:
+            if not self._buffer:
+                return
+            data, self._buffer = self._buffer, bytearray()
+            seq = self._last_seq
+            state: Optional[Dict[str, Any]] = None
+            if self._num_since_snapshot >= self._snapshot_every:
+                # only the copy is taken under the lock, so `append()` is not blocked by the serialization
+                state = self._state.dump()
+                self._num_since_snapshot = 0
+
+        segment = self._segment
+        segment.write(data)
+        segment.flush()
+        os.fsync(segment.fileno())
+
+        with self._cond:
+            self._synced_seq = seq
+            self._cond.notify_all()
+
+        if state is not None:
+            snapshot = json.dumps({'seq': seq, 'state': state}, separators=(',', ':')).encode()
+            self._write_snapshot(seq, snapshot)
+
+    def _write_snapshot(self, seq: int, snapshot: bytes) -> None:
+        # Only this thread writes the segments, and every record up to `seq` is in the current segment now
+        self._segment.close()
+        self._segment = self._open_segment(seq + 1)
+
+        path = self._dir / f'snapshot-{seq:020d}.json'
+        tmp_path = path.with_suffix('.tmp')
+        with tmp_path.open('wb') as fp:
+            fp.write(snapshot)
+            fp.flush()
+            os.fsync(fp.fileno())
+        os.replace(str(tmp_path), str(path))
+        dir_fd = os.open(str(self._dir), os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+        # The older snapshots and segments are covered by the new snapshot
+        for old_path in self._dir.glob('snapshot-*.json'):
+            if old_path != path:
+                old_path.unlink()
+        for old_path in self._dir.glob('wal-*.log'):
+            if int(old_path.stem[len('wal-'):]) <= seq:
+                old_path.unlink()
+
+        logger = logging.getLogger(__name__)
+        logger.debug(f'snapshot #{seq} is written to {path}')
@@ -0,0 +1,126 @@
+# coding: UTF-8
+
+from collections import OrderedDict
+from typing import Any, ClassVar, Dict, FrozenSet, List, NamedTuple, Optional
+
+from ..jobs import Job, JobState
+from ..node import Node
+
+# Record kinds. A record is a list whose first item is its kind
+JOB_SUBMITTED = 'job'
+JOB_TRANSITED = 'state'
+NODE_REPORTED = 'node'
+
+
+def job_submitted(job: Job) -> List[Any]:
+    return [JOB_SUBMITTED, job.job_id, job.name, job.type, job.preferences, job.objective, job.submit_time,
+            job.submit_id]
+
+
+def job_transited(job: Job) -> List[Any]:
+    return [JOB_TRANSITED, job.job_id, int(job.state), job.dest_ip, job.dest_port, job.dispatch_attempts]
+
+
+def node_reported(node: Node) -> List[Any]:
+    return [NODE_REPORTED, node.ip_addr, node.node_type, node.aggr_contention,
+            node.num_workloads, node.num_of_fg_wls, node.num_of_bg_wls]
+
+
+class NodeStatus(NamedTuple):
+    ip_addr: str
+    node_type: str
+    aggr_contention: Optional[float]
+    num_workloads: Optional[int]
+    num_of_fg_wls: Optional[int]
+    num_of_bg_wls: Optional[int]
+
+
+class SchedulerState:
+    """
+    The jobs and the node view of the scheduler rebuilt from the records of the write-ahead log.
+    Jobs are kept as flat lists ([job_id, name, type, preferences, objective, submit_time, submit_id, state, dest_ip,
+    dest_port, dispatch_attempts]) so that replaying and snapshotting do not create any objects per record.
+    Only the last `history_size` retired jobs (acked, finished or failed) are kept, like `JobTable`,
+    so the snapshots and the recovery do not grow with the whole history of the scheduler.
+    """
+    _RETIRED_STATES: ClassVar[FrozenSet[int]] = frozenset(int(state) for state in JobState if state.is_retired)
+
+    def __init__(self, history_size: int = 1000) -> None:
+        self._history_size = history_size
+        self._jobs: Dict[int, List[Any]] = dict()
+        self._history: 'OrderedDict[int, List[Any]]' = OrderedDict()
+        self._nodes: Dict[str, List[Any]] = dict()
+        self._next_job_id: int = 0
+
+    @property
+    def num_jobs(self) -> int:
+        return len(self._jobs)
+
+    @property
+    def next_job_id(self) -> int:
+        return self._next_job_id
+
+    def apply(self, record: List[Any]) -> None:
+        kind = record[0]
+        if kind == JOB_TRANSITED:
+            job = self._jobs.get(record[1])
+            if job is None:
+                # a retired job which is still in the history, or has left it
+                job = self._history.get(record[1])
+                if job is not None:
+                    job[7:] = record[2:]
+                return
+            job[7:] = record[2:]
+            if record[2] in self._RETIRED_STATES:
+                del self._jobs[record[1]]
+                history = self._history
+                history[record[1]] = job
+                if len(history) > self._history_size:
+                    history.popitem(last=False)
+
+        elif kind == NODE_REPORTED:
+            self._nodes[record[1]] = record[1:]
+
+        elif kind == JOB_SUBMITTED:
+            job_id = record[1]
+            self._jobs[job_id] = record[1:] + [int(JobState.PENDING), None, None, 0]
+            if job_id >= self._next_job_id:
+                self._next_job_id = job_id + 1
+
+    def dump(self) -> Dict[str, Any]:
+        """ A copy of the state, which can be serialized while the records keep being applied to the state """
+        # the rows of the jobs are updated in place, but the rows of the nodes are replaced
+        return {
+            'next_job_id': self._next_job_id,
+            'jobs': [list(job) for job in self._jobs.values()],
+            'history': [list(job) for job in self._history.values()],
+            'nodes': list(self._nodes.values()),
+        }
+
+    def load(self, dumped: Dict[str, Any]) -> None:
+        self._next_job_id = dumped['next_job_id']
+        self._jobs = dict((job[0], job) for job in dumped['jobs'])
+        self._history = OrderedDict((job[0], job) for job in dumped['history'][-self._history_size:])
+        self._nodes = dict((node[0], node) for node in dumped['nodes'])
+
+    def restore_jobs(self) -> List[Job]:
+        """
+        Create the recorded jobs (the jobs in the history first) with their original ids.
+        The ids of the jobs created after this do not collide with them.
+        """
+        Job.advance_id_counter(self._next_job_id)
+
+        jobs: List[Job] = list()
+        for records in (self._history.values(), self._jobs.values()):
+            for job_id, name, job_type, preferences, objective, submit_time, submit_id, state, dest_ip, dest_port, \
+                    attempts in records:
+                job = Job(name, job_type, preferences, objective, submit_time, job_id=job_id, submit_id=submit_id)
+                job.state = JobState(state)
+                job.dest_ip = dest_ip
+                job.dest_port = dest_port
+                job.dispatch_attempts = attempts
+                jobs.append(job)
+        return jobs
+
+    def restore_nodes(self) -> List[NodeStatus]:
+        return [NodeStatus(*node) for node in self._nodes.values()]
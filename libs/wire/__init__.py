@@ -0,0 +1,5 @@
+# coding: UTF-8
+
+from .frame import MAGIC, VERSION, Frame, MessageType, WireFormatError, is_binary, iter_frames
+from .messages import TrackingReport, decode_jobs, decode_metrics, decode_tracking, encode_jobs, encode_metrics, \
+    encode_tracking, job_to_csv, parse_job_message, parse_metric_message, parse_tracking_message
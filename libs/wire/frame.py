@@ -0,0 +1,86 @@
+# coding: UTF-8
+
+import struct
+from enum import IntEnum
+from typing import ClassVar, Iterator, NamedTuple, Union
+
+Buffer = Union[bytes, bytearray, memoryview]
+
+# The magic is not valid as the first bytes of a CSV or JSON message, so old messages are told apart by it
+MAGIC = b'\xe1\x50'
+VERSION = 1
+
+# magic, version, message type, number of records, payload length
+HEADER = struct.Struct('<2sBBII')
+
+
+class WireFormatError(ValueError):
+    pass
+
+
+class MessageType(IntEnum):
+    JOB = 1
+    TRACKING = 2
+    METRIC = 3
+
+
+_MESSAGE_TYPES = dict((message_type.value, message_type) for message_type in MessageType)
+
+
+class Frame(NamedTuple):
+    version: int
+    message_type: MessageType
+    num_records: int
+    payload: memoryview     # a view of the received message, not a copy
+
+
+class FrameWriter:
+    """
+    Builds a message of frames. Each frame holds the records of a single message type.
+    """
+    _MAX_RECORDS: ClassVar[int] = 0xFFFFFFFF
+
+    def __init__(self) -> None:
+        self._buffer = bytearray()
+
+    def add_frame(self, message_type: MessageType, num_records: int, payload: Buffer) -> None:
+        if num_records > self._MAX_RECORDS:
+            raise WireFormatError(f'too many records in a frame: {num_records}')
+        self._buffer += HEADER.pack(MAGIC, VERSION, message_type, num_records, len(payload))
+        self._buffer += payload
+
+    def getvalue(self) -> bytes:
+        return bytes(self._buffer)
+
+
+def is_binary(data: Buffer) -> bool:
+    return data[:len(MAGIC)] == MAGIC
+
+
+def iter_frames(data: Buffer) -> Iterator[Frame]:
+    """
+    Iterate the frames of a message without copying their payloads
+    :raises WireFormatError: if the message is truncated or its version is newer than this decoder
+    """
+    view = memoryview(data)
+    header_size = HEADER.size
+    offset = 0
+    end = len(view)
+    while offset < end:
+        if offset + header_size > end:
+            raise WireFormatError(f'truncated frame header at {offset}')
+        magic, version, message_type, num_records, length = HEADER.unpack_from(view, offset)
+        if magic != MAGIC:
+            raise WireFormatError(f'bad magic {magic!r} at {offset}')
+        if version > VERSION:
+            raise WireFormatError(f'unsupported version {version} (supported up to {VERSION})')
+
+        offset += header_size
+        if offset + length > end:
+            raise WireFormatError(f'truncated frame payload at {offset} ({length} bytes expected)')
+        known_type = _MESSAGE_TYPES.get(message_type)
+        if known_type is None:
+            raise WireFormatError(f'unknown message type {message_type}')
+
+        yield Frame(version, known_type, num_records, view[offset:offset + length])
+        offset += length
@@ -0,0 +1,256 @@
+# coding: UTF-8
+
+import json
+import struct
+from typing import Dict, Iterable, List, NamedTuple, Tuple
+
+from .frame import Buffer, FrameWriter, MessageType, WireFormatError, is_binary, iter_frames
+from ..jobs import Job
+from ..metric_container.basic_metric import BasicMetric
+
+# The strings which are sent as a single byte
+_JOB_TYPES: Tuple[str, ...] = ('fg', 'bg')
+_NODE_CLASSES: Tuple[str, ...] = ('cpu', 'gpu')
+_OBJECTIVES: Tuple[str, ...] = ('latency', 'throughput')
+
+
+def _code_table(values: Tuple[str, ...]) -> Dict[str, int]:
+    return dict((value, code) for code, value in enumerate(values))
+
+
+_JOB_TYPE_CODES = _code_table(_JOB_TYPES)
+_NODE_CLASS_CODES = _code_table(_NODE_CLASSES)
+_OBJECTIVE_CODES = _code_table(_OBJECTIVES)
+
+# Every variable length record starts with the length of the rest, so a decoder skips the fields added later
+_RECORD_LENGTH = struct.Struct('<H')
+# submit time, type, preferences, objective, length of the name
+# (followed by the name, the length of the submit id and the submit id)
+_JOB = struct.Struct('<dBBBB')
+_STRING_LENGTH = struct.Struct('<B')
+# aggregated contention, number of workloads, fg workloads, bg workloads, node class, length of the ip address
+_TRACKING = struct.Struct('<dHHHBB')
+# llc references, llc misses, instructions, cycles, gpu core util, gpu core freq, gpu emc util, gpu emc freq, interval
+_METRIC = struct.Struct('<QQQQddddd')
+
+
+class TrackingReport(NamedTuple):
+    ip_addr: str
+    aggr_contention: float
+    num_workloads: int
+    num_of_fg_wls: int
+    num_of_bg_wls: int
+    node_type: str      # 'gpu' or 'cpu'
+
+
+def _lookup(table: Dict[str, int], value: str, field: str) -> int:
+    try:
+        return table[value]
+    except KeyError:
+        raise WireFormatError(f'unknown {field}: {value}')
+
+
+def _frames_of(data: Buffer, message_type: MessageType):
+    for frame in iter_frames(data):
+        if frame.message_type is not message_type:
+            raise WireFormatError(f'{frame.message_type.name} frame in a {message_type.name} message')
+        yield frame
+
+
+def _check_length(record: memoryview, length: int, field: str) -> None:
+    if len(record) < length:
+        raise WireFormatError(f'truncated {field}: {len(record)} bytes of {length}')
+
+
+def _iter_records(payload: memoryview, num_records: int):
+    length_size = _RECORD_LENGTH.size
+    offset = 0
+    for _ in range(num_records):
+        if offset + length_size > len(payload):
+            raise WireFormatError('truncated record')
+        length, = _RECORD_LENGTH.unpack_from(payload, offset)
+        offset += length_size
+        if offset + length > len(payload):
+            raise WireFormatError('truncated record')
+        yield payload[offset:offset + length]
+        offset += length
+
+
+# Jobs
+
+def encode_jobs(jobs: Iterable[Job]) -> bytes:
+    payload = bytearray()
+    num_records = 0
+    for job in jobs:
+        name = job.name.encode()
+        submit_id = b'' if job.submit_id is None else job.submit_id.encode()
+        record = _JOB.pack(job.submit_time,
+                           _lookup(_JOB_TYPE_CODES, job.type, 'job type'),
+                           _lookup(_NODE_CLASS_CODES, job.preferences, 'job preferences'),
+                           _lookup(_OBJECTIVE_CODES, job.objective, 'job objective'),
+                           len(name)) + name + _STRING_LENGTH.pack(len(submit_id)) + submit_id
+        payload += _RECORD_LENGTH.pack(len(record))
+        payload += record
+        num_records += 1
+
+    writer = FrameWriter()
+    writer.add_frame(MessageType.JOB, num_records, payload)
+    return writer.getvalue()
+
+
+def decode_jobs(data: Buffer) -> List[Job]:
+    jobs: List[Job] = list()
+    header_size = _JOB.size
+    for frame in _frames_of(data, MessageType.JOB):
+        for record in _iter_records(frame.payload, frame.num_records):
+            _check_length(record, header_size, 'job record')
+            submit_time, job_type, preferences, objective, name_len = _JOB.unpack_from(record)
+            offset = header_size + name_len
+            _check_length(record, offset, 'job name')
+            name = str(record[header_size:offset], 'utf-8')
+            submit_id = None
+            if len(record) > offset:
+                submit_id_len = record[offset]
+                _check_length(record, offset + 1 + submit_id_len, 'submit id')
+                submit_id = str(record[offset + 1:offset + 1 + submit_id_len], 'utf-8') or None
+            try:
+                jobs.append(Job(name, _JOB_TYPES[job_type], _NODE_CLASSES[preferences], _OBJECTIVES[objective],
+                                submit_time, submit_id=submit_id))
+            except IndexError:
+                raise WireFormatError(f'unknown code in the job record: {(job_type, preferences, objective)}')
+    return jobs
+
+
+def job_to_csv(job: Job) -> str:
+    """ The format of the old job submitters. The submit id is appended as the fifth field if it is given """
+    if job.submit_id is None:
+        return f'{job.name},{job.type},{job.preferences},{job.objective}'
+    return f'{job.name},{job.type},{job.preferences},{job.objective},{job.submit_id}'
+
+
+def parse_job_message(body: Buffer) -> List[Job]:
+    """
+    Decode either a binary job message or an old CSV one (`name,type,preferences,objective[,submit_id]`)
+    :return: the submitted jobs. It is empty if the CSV message is malformed
+    """
+    if is_binary(body):
+        return decode_jobs(body)
+
+    arr = bytes(body).decode().strip().split(',')
+    if len(arr) == 4:
+        return [Job(*arr)]
+    if len(arr) == 5:
+        return [Job(*arr[:4], submit_id=arr[4])]
+    return []
+
+
+# Tracking reports
+
+def encode_tracking(reports: Iterable[TrackingReport]) -> bytes:
+    payload = bytearray()
+    num_records = 0
+    for report in reports:
+        ip_addr = report.ip_addr.encode()
+        record = _TRACKING.pack(report.aggr_contention, report.num_workloads, report.num_of_fg_wls,
+                                report.num_of_bg_wls, _lookup(_NODE_CLASS_CODES, report.node_type, 'node type'),
+                                len(ip_addr)) + ip_addr
+        payload += _RECORD_LENGTH.pack(len(record))
+        payload += record
+        num_records += 1
+
+    writer = FrameWriter()
+    writer.add_frame(MessageType.TRACKING, num_records, payload)
+    return writer.getvalue()
+
+
+def decode_tracking(data: Buffer) -> List[TrackingReport]:
+    reports: List[TrackingReport] = list()
+    header_size = _TRACKING.size
+    for frame in _frames_of(data, MessageType.TRACKING):
+        for record in _iter_records(frame.payload, frame.num_records):
+            _check_length(record, header_size, 'tracking record')
+            aggr_contention, num_workloads, num_fg, num_bg, node_class, ip_len = _TRACKING.unpack_from(record)
+            _check_length(record, header_size + ip_len, 'ip address')
+            ip_addr = str(record[header_size:header_size + ip_len], 'utf-8')
+            if node_class >= len(_NODE_CLASSES):
+                raise WireFormatError(f'unknown node type code: {node_class}')
+            reports.append(TrackingReport(ip_addr, aggr_contention, num_workloads, num_fg, num_bg,
+                                          _NODE_CLASSES[node_class]))
+    return reports
+
+
+def parse_tracking_message(body: Buffer) -> List[TrackingReport]:
+    """
+    Decode either a binary tracking message or an old CSV one
+    (`ip_addr,aggr_contention,num_workloads,num_of_fg_wls,num_of_bg_wls,node_type`)
+    :return: the reports. It is empty if the CSV message is malformed
+    """
+    if is_binary(body):
+        return decode_tracking(body)
+
+    arr = bytes(body).decode().strip().split(',')
+    if len(arr) != 6:
+        return []
+    ip_addr, aggr_contention, num_workloads, num_of_fg_wls, num_of_bg_wls, node_type = arr
+    return [TrackingReport(ip_addr, float(aggr_contention), int(num_workloads), int(num_of_fg_wls),
+                           int(num_of_bg_wls), node_type)]
+
+
+# Metrics
+
+def encode_metrics(metrics: Iterable[BasicMetric]) -> bytes:
+    payload = bytearray()
+    num_records = 0
+    for metric in metrics:
+        payload += _METRIC.pack(int(metric.llc_references), int(metric.llc_misses), int(metric.instruction),
+                                int(metric.cycles), metric.gpu_core_util, metric.gpu_core_freq,
+                                metric.gpu_mem_util, metric.gpu_emc_freq, metric.interval)
+        num_records += 1
+
+    writer = FrameWriter()
+    writer.add_frame(MessageType.METRIC, num_records, payload)
+    return writer.getvalue()
+
+
+def decode_metrics(data: Buffer) -> List[BasicMetric]:
+    metrics: List[BasicMetric] = list()
+    for frame in _frames_of(data, MessageType.METRIC):
+        payload = frame.payload
+        if frame.num_records == 0:
+            continue
+
+        # metric records have a fixed size. A newer version may append fields to them
+        stride, remainder = divmod(len(payload), frame.num_records)
+        if remainder != 0 or stride < _METRIC.size:
+            raise WireFormatError(f'bad metric frame: {len(payload)} bytes for {frame.num_records} records')
+
+        if stride == _METRIC.size:
+            metrics.extend(BasicMetric(*values) for values in _METRIC.iter_unpack(payload))
+        else:
+            metrics.extend(BasicMetric(*_METRIC.unpack_from(payload, offset))
+                           for offset in range(0, len(payload), stride))
+    return metrics
+
+
+def parse_metric_message(body: Buffer, interval: float = 200) -> List[BasicMetric]:
+    """
+    Decode either a binary metric message or an old JSON one.
+    The old messages do not carry the sampling interval, so `interval` (ms) is used for them.
+    :raises WireFormatError: (a `ValueError`) if the message is malformed or lacks a field
+    """
+    if is_binary(body):
+        return decode_metrics(body)
+
+    metric = json.loads(bytes(body).decode())
+    try:
+        return [BasicMetric(metric['llc_references'],
+                            metric['llc_misses'],
+                            metric['instructions'],
+                            metric['cycles'],
+                            metric['gpu_core_util'],
+                            metric['gpu_core_freq'],
+                            metric['gpu_emc_util'],
+                            metric['gpu_emc_freq'],
+                            interval)]
+    except (KeyError, TypeError) as e:
+        raise WireFormatError(f'incomplete metric message: {e!r}')
@@ -1,28 +1,46 @@
 # coding: UTF-8
 
-from collections import deque
 from itertools import chain
-from typing import Deque, Iterable, Optional, Set, Tuple
+from typing import ClassVar, Dict, Iterable, NamedTuple, Optional, Set, Tuple
 
 import psutil
 
 from .metric_container.basic_metric import BasicMetric, MetricDiff
+from .metric_container.metric_buffer import MetricRingBuffer
+from .metric_container.metric_stats import MetricStats
 from .solorun_data.datas import data_map
 from .utils import DVFS, GPUDVFS  # , ResCtrl, numa_topology
 from .utils.cgroup import Cpu, CpuSet
 
 
+class MetricDiffCacheInfo(NamedTuple):
+    hits: int
+    misses: int
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total != 0 else 0.0
+
+
 class Workload:
     """
     This class abstracts the process and contains the related metrics to represent its characteristics
     Controller schedules the groups of `Workload' instances to enforce their scheduling decisions
     """
 
-    def __init__(self, name: str, wl_type: str, pid: int, perf_pid: int, perf_interval: int) -> None:
+    # the number of the last metrics which the isolators average
+    METRIC_WINDOWS: ClassVar[Tuple[int, ...]] = (30,)
+
+    def __init__(self, name: str, wl_type: str, pid: int, perf_pid: int, perf_interval: int,
+                 metric_buf_size: int = 1024) -> None:
         self._name = name
         self._wl_type = wl_type
         self._pid = pid
-        self._metrics: Deque[BasicMetric] = deque()
+        # the statistics cover every metric since the buffer is cleared (e.g. since a solorun profiling starts)
+        self._metrics: MetricRingBuffer = MetricRingBuffer(
+                metric_buf_size, (window for window in self.METRIC_WINDOWS if window <= metric_buf_size),
+                MetricStats(len(MetricRingBuffer.COLUMNS)))
         self._perf_pid = perf_pid
         self._perf_interval = perf_interval
 
@@ -41,6 +59,14 @@ class Workload:
         if wl_type == 'bg':
             self._avg_solorun_data = data_map[name]
 
+        # `MetricDiff`s of the newest metric per core_norm, valid while the newest metric and the solorun data are
+        # the same (the epoch of the metric buffer, the version of the solorun data)
+        self._solorun_data_version: int = 0
+        self._metric_diff_key: Tuple[int, int] = (-1, -1)
+        self._metric_diffs: Dict[float, MetricDiff] = dict()
+        self._metric_diff_hits: int = 0
+        self._metric_diff_misses: int = 0
+
         self._orig_bound_cores: Tuple[int, ...] = tuple(self._cgroup_cpuset.read_cpus())
         self._orig_bound_mems: Set[int] = self._cgroup_cpuset.read_mems()
 
@@ -83,7 +109,7 @@ class Workload:
         return self._wl_type
 
     @property
-    def metrics(self) -> Deque[BasicMetric]:
+    def metrics(self) -> MetricRingBuffer:
         return self._metrics
 
     @property
@@ -148,10 +174,27 @@ class Workload:
     @avg_solorun_data.setter
     def avg_solorun_data(self, new_data: BasicMetric) -> None:
         self._avg_solorun_data = new_data
+        self._solorun_data_version += 1
 
     def calc_metric_diff(self, core_norm: float = 1) -> MetricDiff:
+        """ It is computed once per newest metric, solorun data and `core_norm` """
+        key = (self._metrics.epoch, self._solorun_data_version)
+        if key != self._metric_diff_key:
+            self._metric_diff_key = key
+            self._metric_diffs.clear()
+
+        metric_diff = self._metric_diffs.get(core_norm)
+        if metric_diff is not None:
+            self._metric_diff_hits += 1
+            return metric_diff
+
+        self._metric_diff_misses += 1
         curr_metric: BasicMetric = self._metrics[0]
-        return MetricDiff(curr_metric, self._avg_solorun_data, core_norm)
+        metric_diff = self._metric_diffs[core_norm] = MetricDiff(curr_metric, self._avg_solorun_data, core_norm)
+        return metric_diff
+
+    def metric_diff_cache_info(self) -> MetricDiffCacheInfo:
+        return MetricDiffCacheInfo(self._metric_diff_hits, self._metric_diff_misses)
 
     def all_child_tid(self) -> Tuple[int, ...]:
         try:
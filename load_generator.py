@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+# coding: UTF-8
+
+"""
+Open-loop load generator for the cluster scheduler.
+
+`run` submits jobs at the arrival times of a trace or of a synthesized Poisson/bursty arrival process.
+The arrival times are fixed in advance and never depend on how fast the scheduler takes the jobs (open-loop).
+Jobs which are due at the same time are published as a batch. Every submission is timestamped in a submission log.
+The batches are handed over to a publisher thread, so waiting for the publisher confirms of the broker never delays
+the following arrivals: a slow broker makes the batches queue up in the generator, not arrive later.
+
+`report` joins the submission log with the ack log of the scheduler (`cluster_scheduler.py --ack-log`) by the
+submit id, and reports the throughput and the latency percentiles.
+The latency is measured from the time when each job was scheduled to arrive, not from when it was actually published,
+so the time a job waits behind the publisher is counted instead of being hidden (coordinated omission).
+The latency is the difference between two wall clocks, so the generator and the scheduler should run on the same
+host or on hosts with synchronized clocks.
+"""
+
+import argparse
+import csv
+import logging
+import math
+import queue
+import random
+import sys
+import time
+from functools import partial
+from pathlib import Path
+from threading import Event, Thread
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+from job_submit import JobSubmitter
+from libs.jobs import Job
+
+
+class Arrival(NamedTuple):
+    offset: float       # seconds from the start of the run
+    name: str
+    type: str
+    preferences: str
+    objective: str
+
+
+SUBMISSION_LOG_FIELDS = ('submit_id', 'name', 'objective', 'scheduled_at', 'submitted_at')
+
+
+def preferences_of(workload_name: str) -> str:
+    # the solorun profiles are named after the device they ran on (e.g., SparkGPULRGpu, SparkGPULRCpu)
+    return 'gpu' if workload_name.endswith('Gpu') else 'cpu'
+
+
+def default_workloads() -> List[str]:
+    from libs.solorun_data.datas import data_map
+    return sorted(data_map)
+
+
+class ArrivalSynthesizer:
+    """ Synthesizes arrivals over `workloads` at `rate` jobs per second on average """
+
+    def __init__(self, workloads: Sequence[str], rate: float, duration: float, job_type: str = 'bg',
+                 latency_fraction: float = 0.5, seed: Optional[int] = None) -> None:
+        self._workloads = workloads
+        self._rate = rate
+        self._duration = duration
+        self._job_type = job_type
+        self._latency_fraction = latency_fraction
+        self._rng = random.Random(seed)
+
+    def _arrival_at(self, offset: float) -> Arrival:
+        name = self._rng.choice(self._workloads)
+        objective = 'latency' if self._rng.random() < self._latency_fraction else 'throughput'
+        return Arrival(offset, name, self._job_type, preferences_of(name), objective)
+
+    def poisson(self) -> Iterator[Arrival]:
+        offset = self._rng.expovariate(self._rate)
+        while offset < self._duration:
+            yield self._arrival_at(offset)
+            offset += self._rng.expovariate(self._rate)
+
+    def bursty(self, burst_factor: float, burst_fraction: float, burst_period: float) -> Iterator[Arrival]:
+        """
+        Two-state Markov-modulated Poisson arrivals.
+        Bursts take `burst_fraction` of the time on average with `burst_factor` times the average rate,
+        and the rate between the bursts is lowered so that the average rate stays `rate`.
+        The mean length of a burst and a quiet period together is `burst_period` seconds.
+        """
+        if not 0 < burst_fraction < 1 or burst_factor * burst_fraction > 1:
+            raise ValueError(f'burst factor {burst_factor} and fraction {burst_fraction} '
+                             f'can not keep the average rate')
+
+        rates = (self._rate * (1 - burst_factor * burst_fraction) / (1 - burst_fraction),    # quiet
+                 self._rate * burst_factor)                                                # burst
+        mean_lengths = ((1 - burst_fraction) * burst_period, burst_fraction * burst_period)
+
+        rng = self._rng
+        in_burst = rng.random() < burst_fraction
+        period_start = 0.0
+        while period_start < self._duration:
+            period_end = min(period_start + rng.expovariate(1 / mean_lengths[in_burst]), self._duration)
+            rate = rates[in_burst]
+            if rate > 0:
+                offset = period_start + rng.expovariate(rate)
+                while offset < period_end:
+                    yield self._arrival_at(offset)
+                    offset += rng.expovariate(rate)
+            period_start = period_end
+            in_burst = not in_burst
+
+
+def read_trace(trace_file: Path, speedup: float = 1.0) -> Iterator[Arrival]:
+    """
+    Stream a trace of the arrivals. Each line is `offset,name[,type,preferences,objective]` where the offset is
+    in seconds from the start of the trace and sorted. The missing fields default to a bg throughput job.
+    """
+    with trace_file.open() as trace_fp:
+        for line_num, line in enumerate(trace_fp, 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            arr = line.split(',')
+            if len(arr) not in (2, 5):
+                raise ValueError(f'{trace_file}:{line_num} is not an arrival: {line}')
+            if len(arr) == 2:
+                arr += ['bg', preferences_of(arr[1]), 'throughput']
+            yield Arrival(float(arr[0]) / speedup, *arr[1:])
+
+
+def _publish_batches(make_submitter: Callable[[], JobSubmitter], batches: 'queue.Queue[Optional[List[Job]]]',
+                     log_writer, lags: List[float], connected: Event) -> None:
+    """
+    Publish the batches until None is given, and log each submission with its delay from the schedule.
+    The submitter is created and connected here, since a broker channel must be used only by the thread which opened it
+    """
+    with make_submitter() as submitter:
+        connected.set()
+        while True:
+            jobs = batches.get()
+            if jobs is None:
+                return
+
+            submitted_at = time.time()
+            submitter.publish(jobs)
+            for job in jobs:
+                log_writer.writerow((job.submit_id, job.name, job.objective,
+                                     f'{job.submit_time:.6f}', f'{submitted_at:.6f}'))
+            # how late the oldest job of the batch is published, including the publisher confirm
+            lags.append(time.time() - jobs[0].submit_time)
+
+
+def run(make_submitter: Callable[[], JobSubmitter], arrivals: Iterator[Arrival], submission_log: Path, run_id: str,
+        max_batch: int) -> None:
+    logger = logging.getLogger(__name__)
+
+    with submission_log.open('w', newline='') as log_fp:
+        log_writer = csv.writer(log_fp)
+        log_writer.writerow(SUBMISSION_LOG_FIELDS)
+
+        batches: 'queue.Queue[Optional[List[Job]]]' = queue.Queue()
+        lags: List[float] = list()
+        connected = Event()
+        publisher = Thread(target=_publish_batches, args=(make_submitter, batches, log_writer, lags, connected),
+                           name='publisher', daemon=True)
+        publisher.start()
+        # the arrivals are paced from when the broker can take them
+        while not connected.wait(0.1):
+            if not publisher.is_alive():
+                raise RuntimeError('the publisher has failed to connect to the broker')
+
+        due: List[Arrival] = list()
+        num_submitted = 0
+        start = time.perf_counter()
+        start_wall = time.time()
+
+        def submit_due() -> None:
+            nonlocal num_submitted
+            if not publisher.is_alive():
+                raise RuntimeError('the publisher has stopped')
+            # the submit time of a job is when it is scheduled to arrive, however late it is published
+            batches.put([Job(arrival.name, arrival.type, arrival.preferences, arrival.objective,
+                             start_wall + arrival.offset, submit_id=f'{run_id}-{num_submitted + idx}')
+                         for idx, arrival in enumerate(due)])
+            num_submitted += len(due)
+            due.clear()
+
+        try:
+            for arrival in arrivals:
+                wait = start + arrival.offset - time.perf_counter()
+                if wait > 0:
+                    if due:
+                        submit_due()
+                        wait = start + arrival.offset - time.perf_counter()
+                    if wait > 0:
+                        time.sleep(wait)
+
+                due.append(arrival)
+                if len(due) >= max_batch:
+                    submit_due()
+
+            if due:
+                submit_due()
+            paced = time.perf_counter() - start
+        finally:
+            batches.put(None)
+            publisher.join()
+        elapsed = time.perf_counter() - start
+
+    if not batches.empty():
+        raise RuntimeError(f'the publisher has stopped with {batches.qsize() - 1} batches unpublished')
+    max_lag = max(lags, default=0.0)
+    logger.info(f'{num_submitted} jobs are submitted in {elapsed:.3f}s (paced in {paced:.3f}s, '
+                f'{num_submitted / elapsed if elapsed > 0 else 0:.1f} jobs/s, max lag: {max_lag * 1e3:.1f}ms)')
+
+
+def report(submission_log: Path, ack_log: Path) -> None:
+    submitted_at: Dict[str, float] = dict()
+    scheduled_at: Dict[str, float] = dict()
+    with submission_log.open(newline='') as log_fp:
+        for row in csv.DictReader(log_fp):
+            submitted_at[row['submit_id']] = float(row['submitted_at'])
+            scheduled_at[row['submit_id']] = float(row['scheduled_at'])
+
+    latencies: List[float] = list()
+    publish_delays: List[float] = list()
+    acked_at: List[float] = list()
+    with ack_log.open(newline='') as log_fp:
+        for row in csv.DictReader(log_fp):
+            intended_at = scheduled_at.get(row['submit_id'])
+            if intended_at is None:
+                continue    # a job of another run
+            ack_time = float(row['acked_at'])
+            # from the intended arrival, so the delay of a late publish is not omitted
+            latencies.append(ack_time - intended_at)
+            publish_delays.append(submitted_at[row['submit_id']] - intended_at)
+            acked_at.append(ack_time)
+
+    num_submitted = len(submitted_at)
+    if num_submitted == 0:
+        print(f'no submission in {submission_log}', file=sys.stderr)
+        return
+
+    first = min(scheduled_at.values())
+    offered = num_submitted / max(max(scheduled_at.values()) - first, sys.float_info.epsilon)
+    print(f'submitted: {num_submitted}, acked: {len(latencies)}, not acked: {num_submitted - len(latencies)}')
+    print(f'offered load: {offered:.1f} jobs/s')
+    if not latencies:
+        return
+
+    throughput = len(acked_at) / max(max(acked_at) - first, sys.float_info.epsilon)
+    p50, p99, p999 = np.percentile(np.array(latencies), (50, 99, 99.9))
+    print(f'throughput: {throughput:.1f} jobs/s')
+    print(f'submit-to-dispatch latency (ms, from the scheduled arrival): p50 {p50 * 1e3:.2f}, p99 {p99 * 1e3:.2f}, '
+          f'p999 {p999 * 1e3:.2f}, max {max(latencies) * 1e3:.2f}')
+    # the part of the latency spent in the generator. it should be small, or the generator is the bottleneck
+    p50, p99 = np.percentile(np.array(publish_delays), (50, 99))
+    print(f'publish delay (ms): p50 {p50 * 1e3:.2f}, p99 {p99 * 1e3:.2f}, max {max(publish_delays) * 1e3:.2f}')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Open-loop load generator for the cluster scheduler.')
+    subparsers = parser.add_subparsers(dest='command')
+
+    run_parser = subparsers.add_parser('run', help='submit jobs')
+    run_parser.add_argument('--trace', dest='trace', default=None, type=str,
+                            help='replay this arrival trace (offset,name[,type,preferences,objective] per line) '
+                                 'instead of synthesizing arrivals')
+    run_parser.add_argument('--speedup', dest='speedup', default=1.0, type=float,
+                            help='replay the trace this many times faster. (default : 1.0)')
+    run_parser.add_argument('--arrival', dest='arrival', default='poisson', choices=('poisson', 'bursty'),
+                            help='synthesized arrival process. (default : poisson)')
+    run_parser.add_argument('-r', '--rate', dest='rate', default=100.0, type=float,
+                            help='average arrival rate in jobs per second. (default : 100.0)')
+    run_parser.add_argument('-t', '--duration', dest='duration', default=60.0, type=float,
+                            help='seconds to generate arrivals. (default : 60.0)')
+    run_parser.add_argument('--burst-factor', dest='burst_factor', default=4.0, type=float,
+                            help='arrival rate in a burst relative to the average rate. (default : 4.0)')
+    run_parser.add_argument('--burst-fraction', dest='burst_fraction', default=0.1, type=float,
+                            help='fraction of the time in bursts. (default : 0.1)')
+    run_parser.add_argument('--burst-period', dest='burst_period', default=10.0, type=float,
+                            help='mean seconds of a burst and the following quiet period. (default : 10.0)')
+    run_parser.add_argument('-w', '--workloads', dest='workloads', nargs='+', default=None,
+                            help='workload names. (default : the workloads which have a solorun profile)')
+    run_parser.add_argument('--job-type', dest='job_type', default='bg', choices=('fg', 'bg'))
+    run_parser.add_argument('--latency-fraction', dest='latency_fraction', default=0.5, type=float,
+                            help='fraction of the latency jobs. (default : 0.5)')
+    run_parser.add_argument('--max-batch', dest='max_batch', default=256, type=int,
+                            help='most jobs published at once when they are due together. (default : 256)')
+    run_parser.add_argument('--wire-format', dest='wire_format', default='binary', choices=('csv', 'binary'),
+                            help='csv: a message per job, binary: a message per batch. (default : binary)')
+    run_parser.add_argument('--no-confirm', dest='confirm', action='store_false',
+                            help='do not wait for the publisher confirms of the broker')
+    run_parser.add_argument('--host', dest='host', default='localhost', type=str)
+    run_parser.add_argument('--run-id', dest='run_id', default=None, type=str,
+                            help='prefix of the submit ids. (default : the start time)')
+    run_parser.add_argument('--seed', dest='seed', default=None, type=int)
+    run_parser.add_argument('-o', '--submission-log', dest='submission_log', default='submissions.csv', type=str,
+                            help='CSV file to log the submissions. (default : submissions.csv)')
+
+    report_parser = subparsers.add_parser('report', help='join the submissions with the dispatch acks')
+    report_parser.add_argument('-s', '--submission-log', dest='submission_log', default='submissions.csv', type=str)
+    report_parser.add_argument('-a', '--ack-log', dest='ack_log', required=True, type=str,
+                               help='the ack log of cluster_scheduler.py --ack-log')
+
+    args = parser.parse_args()
+    logging.basicConfig(format='%(asctime)s [%(levelname)s]: %(message)s', level=logging.INFO)
+
+    if args.command == 'report':
+        report(Path(args.submission_log), Path(args.ack_log))
+        return
+    if args.command != 'run':
+        parser.print_help()
+        sys.exit(1)
+
+    if args.trace is not None:
+        arrivals = read_trace(Path(args.trace), args.speedup)
+    else:
+        synthesizer = ArrivalSynthesizer(args.workloads or default_workloads(), args.rate, args.duration,
+                                         args.job_type, args.latency_fraction, args.seed)
+        if args.arrival == 'poisson':
+            arrivals = synthesizer.poisson()
+        else:
+            arrivals = synthesizer.bursty(args.burst_factor, args.burst_fraction, args.burst_period)
+
+    run_id = args.run_id or str(math.floor(time.time()))
+    # submit_interval is not used. Each batch is published when its jobs are due
+    make_submitter = partial(JobSubmitter, 0, args.wire_format, args.max_batch, args.host, confirm=args.confirm)
+    run(make_submitter, arrivals, Path(args.submission_log), run_id, args.max_batch)
+
+
+if __name__ == '__main__':
+    main()
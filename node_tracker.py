@@ -1,19 +1,17 @@
 # coding: UTF-8
 
 import functools
-import json
 import logging
-from threading import Thread
+from threading import Event, Thread
 
-from typing import Dict
+from typing import ClassVar, Dict, List, Optional, Set, Tuple
 
-import pika
-from pika import BasicProperties
-from pika.adapters.blocking_connection import BlockingChannel
-from pika.spec import Basic
-
-from libs.metric_container.basic_metric import BasicMetric
+from libs.broker import BatchConsumer, Broker, BrokerChannel, rabbitmq_broker
 from libs.node import Node
+from libs.node_index import NodeIndex
+from libs.node_registry import NodeRegistry
+from libs.wal import WriteAheadLog, node_reported
+from libs.wire import TrackingReport, parse_metric_message, parse_tracking_message
 
 
 class Singleton(type):
@@ -26,28 +24,52 @@ class Singleton(type):
 
 
 class NodeTracker(Thread, metaclass=Singleton):
-    def __init__(self, metric_buf_size: int) -> None:
+    _EXPIRY_CHECKS_PER_TIMEOUT: ClassVar[int] = 4    # a node is expired at most 1/4 of the timeout late
+
+    def __init__(self, metric_buf_size: int, wakeup: Optional[Event] = None,
+                 reservation_settle_time: float = 2.0, wal: Optional[WriteAheadLog] = None,
+                 broker: Optional[Broker] = None, prefetch_count: int = 1000,
+                 delivery_batch: Tuple[int, float] = (256, 0.01), heartbeat_timeout: float = 10.0) -> None:
         super().__init__(daemon=True)
         self._metric_buf_size = metric_buf_size
+        # contention reserved for a dispatched job is dropped once a report arrives this long after the dispatch
+        self._reservation_settle_time = reservation_settle_time
 
-        self._rmq_host = 'localhost'
+        self._broker: Broker = rabbitmq_broker('localhost') if broker is None else broker
         self._rmq_tracking_node_queue = 'tracking_nodes'    # edge-profiler should use this queue
+        # the reports and the metrics are handed over in batches of up to `max_batch` messages or after `max_delay`
+        # seconds, and acknowledged at once after a batch is processed
+        self._prefetch_count = prefetch_count
+        self._max_batch, self._max_delay = delivery_batch
+        BatchConsumer.check_batch_size(prefetch_count, self._max_batch)
+        self._consumer: Optional[BatchConsumer] = None
+
+        # a node which does not report for `heartbeat_timeout` seconds is taken out of the node index
+        self._registry: NodeRegistry = NodeRegistry(heartbeat_timeout, metric_buf_size=metric_buf_size)
+        self._monitored_queues: Set[str] = set()    # the metric queues which are consumed already
+        self._node_index: NodeIndex = NodeIndex()   # nodes ordered by their contention per node class
+        self._wakeup = wakeup   # set whenever the state of a node is changed to wake the scheduler up
+        self._wal = wal         # the reports of the nodes are logged to restore the node view on restart
 
-        self._cluster_nodes: Dict[str, Node] = dict()
-        self._node_contentions: Dict[Node, float] = None
-        self._min_aggr_cont_node: Node = None
+    @property
+    def cluster_nodes(self) -> Dict[str, Node]:
+        return self._registry.nodes
+
+    @property
+    def registry(self) -> NodeRegistry:
+        return self._registry
 
     @property
-    def cluster_nodes(self):
-        return self._cluster_nodes
+    def node_index(self) -> NodeIndex:
+        return self._node_index
 
     @property
-    def node_contentions(self):
-        return self._node_contentions
+    def node_contentions(self) -> Dict[Node, float]:
+        return self._node_index.contentions
 
     @property
-    def min_aggr_cont_node(self):
-        return self._min_aggr_cont_node
+    def min_aggr_cont_node(self) -> Optional[Node]:
+        return self.find_min_aggr_cont_node()
 
     def setup_cluster_nodes(self) -> None:
         # FIXME: hard coded
@@ -63,96 +85,128 @@ class NodeTracker(Thread, metaclass=Singleton):
             elif node_ipaddr in cpu_nodes:
                 node_type = 'cpu_node'
 
-            self._cluster_nodes[node_ipaddr] = Node(node_ipaddr, node_ports[idx], node_type)
-
-    def update_node_contention(self) -> None:
-        for node in self._cluster_nodes.values():
-            self._node_contentions[node] = node.aggr_contention()
-
-    def find_min_aggr_cont_node(self) -> None:
-        self.update_node_contention()
-        min_cont_node = None
-        min_cont = None
-        for node, node_cont in self._node_contentions.items():
-            if min_cont_node is None:
-                min_cont_node = node
-                min_cont = node_cont
-            elif min_cont_node is not None:
-                if min_cont > node_cont:
-                    min_cont_node = node
-
-        self._min_aggr_cont_node = min_cont_node
+            self._registry.register(node_ipaddr, node_type, node_ports[idx])
+
+    def restore_nodes(self) -> None:
+        """ Apply the last reports of the nodes which were recorded in the write-ahead log before the restart """
+        logger = logging.getLogger('tracking')
+        for status in self._wal.state.restore_nodes():
+            node, _ = self._registry.register(status.ip_addr, status.node_type)
+            prev_node_class = node.node_class
+            node.aggr_contention = status.aggr_contention
+            node.num_workloads = status.num_workloads
+            node.num_of_fg_wls = status.num_of_fg_wls
+            node.num_of_bg_wls = status.num_of_bg_wls
+            node.node_type = status.node_type
+            self._node_index.update(node, prev_node_class)
+            # it is expired unless it reports again within the timeout after the restart
+            self._registry.heartbeat(node)
+            logger.info(f'{node.ip_addr} is restored (contention: {node.aggr_contention})')
+
+    def find_min_aggr_cont_node(self, node_class: Optional[str] = None) -> Optional[Node]:
+        """
+        Find the least contended node which has reported its contention
+        :param node_class: 'gpu' or 'cpu' (same as `Job.preferences`). Every node is considered if it is None
+        :return: the least contended node or None if there is no candidate
+        """
+        return self._node_index.find_min(node_class)
 
     # Tracking nodes related ...
 
-    def _cbk_connecting_nodes(self, ch: BlockingChannel, method: Basic.Deliver, _: BasicProperties, body: bytes) \
-            -> None:
-        ch.basic_ack(method.delivery_tag)
-
-        arr = body.decode().strip().split(',')
-
+    def _cbk_connecting_nodes(self, _: BrokerChannel, __: int, bodies: List[bytes]) -> None:
         logger = logging.getLogger('monitoring.tracking_nodes')
-        logger.debug(f'{arr} is received from tracking_node queue')
-
-        if len(arr) != 6:
-            return
-
-        ip_addr, aggr_contention, num_workloads, num_of_fg_wls, num_of_bg_wls, node_type = arr
-        aggr_contention = float(aggr_contention)
-        num_workloads = int(num_workloads)
-        num_of_fg_wls = int(num_of_fg_wls)
-        num_of_bg_wls = int(num_of_bg_wls)
+        num_reports = 0
+        for body in bodies:
+            try:
+                # old profilers send a CSV message per report, new ones send binary frames of reports
+                reports = parse_tracking_message(body)
+            except ValueError as e:
+                logger.warning(f'a malformed message is received from tracking_node queue: {e}')
+                continue
+
+            for report in reports:
+                logger.debug(f'{report} is received from tracking_node queue')
+                self._apply_report(report)
+            num_reports += len(reports)
+
+        if num_reports > 0 and self._wakeup is not None:
+            self._wakeup.set()
+
+    def _apply_report(self, report: TrackingReport) -> None:
         # node_type is either 'gpu' or 'cpu'
-
-        tracked_node = self._cluster_nodes[ip_addr]
-        tracked_node.aggr_contention = aggr_contention
-        tracked_node.num_workloads = num_workloads
-        tracked_node.num_of_fg_wls = num_of_fg_wls
-        tracked_node.num_of_bg_wls = num_of_bg_wls
-        tracked_node.node_type = node_type
+        tracked_node, is_new = self._registry.register(report.ip_addr, report.node_type)
+        if is_new:
+            logger = logging.getLogger('tracking')
+            logger.info(f'{tracked_node.ip_addr} joins the cluster as a {report.node_type} node')
+        if self._registry.heartbeat(tracked_node) and not is_new:
+            logger = logging.getLogger('tracking')
+            logger.info(f'{tracked_node.ip_addr} is alive')
+
+        prev_node_class = tracked_node.node_class
+        tracked_node.aggr_contention = report.aggr_contention
+        tracked_node.num_workloads = report.num_workloads
+        tracked_node.num_of_fg_wls = report.num_of_fg_wls
+        tracked_node.num_of_bg_wls = report.num_of_bg_wls
+        tracked_node.node_type = report.node_type
+        self._node_index.update(tracked_node, prev_node_class)
+        self._node_index.reconcile(tracked_node, self._reservation_settle_time)
+        if self._wal is not None:
+            self._wal.append(node_reported(tracked_node))
 
         node_queue_name = '{}_node_({})'.format(tracked_node.node_type, tracked_node.ip_addr)
-        ch.queue_declare(node_queue_name)
-        ch.basic_consume(functools.partial(self._cbk_node_monitor, tracked_node), node_queue_name)
-
-    def _cbk_node_monitor(self, node: Node,
-                          ch: BlockingChannel, method: Basic.Deliver, _: BasicProperties, body: bytes) -> None:
-        metric = json.loads(body.decode())      # Through json format, node monitor can get aggr contention info
-        ch.basic_ack(method.delivery_tag)
-
-        # FIXME: Hard coded (200ms as interval)
-        item = BasicMetric(metric['llc_references'],
-                           metric['llc_misses'],
-                           metric['instructions'],
-                           metric['cycles'],
-                           metric['gpu_core_util'],
-                           metric['gpu_core_freq'],
-                           metric['gpu_emc_util'],
-                           metric['gpu_emc_freq'],
-                           200)
+        if node_queue_name not in self._monitored_queues:
+            self._monitored_queues.add(node_queue_name)
+            self._consumer.channel.queue_declare(node_queue_name)
+            self._consumer.consume(node_queue_name, functools.partial(self._cbk_node_monitor, tracked_node))
+
+    def _expire_nodes(self) -> None:
+        expired = self._registry.expire()
+        if expired:
+            logger = logging.getLogger('tracking')
+            for node in expired:
+                logger.warning(f'{node.ip_addr} missed its heartbeats for {self._registry.heartbeat_timeout}s. '
+                               f'stop placing jobs on it')
+                self._node_index.discard(node)
+            if self._wakeup is not None:
+                self._wakeup.set()
 
-        logger = logging.getLogger(f'monitoring.metric.{node}')
-        logger.debug(f'{metric} is given from ')
+        self._consumer.channel.add_timeout(self._registry.heartbeat_timeout / self._EXPIRY_CHECKS_PER_TIMEOUT,
+                                           self._expire_nodes)
 
+    def _cbk_node_monitor(self, node: Node, _: BrokerChannel, __: int, bodies: List[bytes]) -> None:
+        logger = logging.getLogger(f'monitoring.metric.{node}')
         metric_que = node.metrics
+        for body in bodies:
+            try:
+                # FIXME: Hard coded (200ms as interval) for the old JSON messages. The binary ones carry their interval
+                items = parse_metric_message(body, 200)
+            except ValueError as e:
+                logger.warning(f'a malformed metric message is given: {e}')
+                continue
+            logger.debug(f'{items} is given from ')
 
-        if len(metric_que) == self._metric_buf_size:
-            metric_que.pop()
+            for item in items:
+                # the oldest one is dropped once `metric_buf_size` metrics are kept
+                metric_que.appendleft(item)
 
-        metric_que.appendleft(item)
+        self._node_index.reconcile(node, self._reservation_settle_time)
 
     def run(self) -> None:
-        connection = pika.BlockingConnection(pika.ConnectionParameters(host=self._rmq_host))
-        channel = connection.channel()
+        self.setup_cluster_nodes()
+        if self._wal is not None:
+            self.restore_nodes()
+
+        channel = self._broker.channel()
+        self._consumer = BatchConsumer(channel, self._prefetch_count, self._max_batch, self._max_delay)
 
         channel.queue_declare(self._rmq_tracking_node_queue)
-        channel.basic_consume(self._cbk_connecting_nodes, self._rmq_tracking_node_queue)
+        self._consumer.consume(self._rmq_tracking_node_queue, self._cbk_connecting_nodes)
+        channel.add_timeout(self._registry.heartbeat_timeout / self._EXPIRY_CHECKS_PER_TIMEOUT, self._expire_nodes)
 
         try:
             logger = logging.getLogger('tracking')
-            logger.info('starting node tracker thread')
+            logger.info(f'starting node tracker thread ({self._broker})')
             channel.start_consuming()
 
         except KeyboardInterrupt:
             channel.close()
-            connection.close()
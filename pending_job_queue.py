@@ -1,48 +1,109 @@
 # coding: UTF-8
 
+import heapq
 import logging
-from typing import List, Sized
+from itertools import count
+from threading import Lock
+from typing import ClassVar, Dict, Iterable, List, Optional, Sized, Tuple
+
 from libs.jobs import Job
 
 
 class PendingJobQueue(Sized):
-    def __init__(self):
+    """
+    Thread-safe priority queue of the submitted jobs.
+    Jobs are ordered by their submission time, but throughput jobs are ordered as if they were submitted
+    `THROUGHPUT_AGING` seconds later. So latency jobs go first, and a throughput job which has waited longer than
+    that is not overtaken by newly arrived latency jobs anymore (aging).
+    The jobs which the scheduler has taken but holds back (see `num_held`) are not in the queue,
+    but they count as waiting in `num_waiting`, which the back-pressure looks at.
+    """
+    THROUGHPUT_AGING: ClassVar[float] = 5.0     # seconds
+    _OBJECTIVE_DELAYS: ClassVar[Dict[str, float]] = {'latency': 0.0, 'throughput': THROUGHPUT_AGING}
+
+    def __init__(self, throughput_aging: Optional[float] = None) -> None:
+        self._lock = Lock()
+        self._heap: List[Tuple[float, int, Job]] = list()     # (priority, seq, job)
+        self._seq = count()
+        self._num_jobs: Dict[str, int] = {'latency': 0, 'throughput': 0}
+        self._num_held: int = 0
 
-        self._pending_list_latency: List[Job] = list()      # pending latency-critical workload pairs
-        self._pending_list_throughput: List[Job] = list()   # pending throughput-oriented workload pairs
+        self._objective_delays: Dict[str, float] = dict(self._OBJECTIVE_DELAYS)
+        if throughput_aging is not None:
+            self._objective_delays['throughput'] = throughput_aging
 
     def __len__(self) -> int:
-        num_lat_job = len(self._pending_list_latency)
-        num_thr_job = len(self._pending_list_throughput)
-        num_of_pending_jobs = num_lat_job + num_thr_job
-        if num_lat_job > 0 or num_thr_job > 0:
-            num_of_pending_jobs = num_lat_job + num_thr_job
-            return num_of_pending_jobs
-        else:
-            return num_of_pending_jobs
+        return len(self._heap)
+
+    @property
+    def lat_jobs(self) -> int:
+        return self._num_jobs['latency']
 
     @property
-    def lat_jobs(self):
-        return len(self._pending_list_latency)
+    def thr_jobs(self) -> int:
+        return self._num_jobs['throughput']
+
+    @property
+    def num_held(self) -> int:
+        return self._num_held
+
+    @num_held.setter
+    def num_held(self, num_jobs: int) -> None:
+        self._num_held = num_jobs
 
     @property
-    def thr_jobs(self):
-        return len(self._pending_list_throughput)
+    def num_waiting(self) -> int:
+        """ The jobs in the queue and the jobs held by the scheduler """
+        return len(self._heap) + self._num_held
 
-    def add(self, job: Job):
+    def priority_of(self, job: Job) -> Optional[float]:
+        """ The key which the jobs are ordered by. None if the objective of `job` is unknown """
+        delay = self._objective_delays.get(job.objective)
+        return None if delay is None else job.submit_time + delay
+
+    def add(self, job: Job) -> None:
         logger = logging.getLogger('pending')
+
+        priority = self.priority_of(job)
+        if priority is None:
+            logger.warning(f'Job ({job.name}) has unknown objective: {job.objective}')
+            return
+
         logger.info(f'Job ({job.name}) is added...')
+        with self._lock:
+            heapq.heappush(self._heap, (priority, next(self._seq), job))
+            self._num_jobs[job.objective] += 1
+
+    def _pop_locked(self) -> Job:
+        _, _, job = heapq.heappop(self._heap)
+        self._num_jobs[job.objective] -= 1
+        return job
+
+    def pop(self) -> Job:
+        with self._lock:
+            if len(self._heap) == 0:
+                raise IndexError(f'{self} is empty')
+            return self._pop_locked()
+
+    def drain(self, max_jobs: Optional[int] = None) -> List[Job]:
+        """
+        Pop up to `max_jobs` jobs at once in priority order
+        :param max_jobs: the number of jobs to pop. All pending jobs are popped if it is None
+        :return: the popped jobs
+        """
+        with self._lock:
+            if max_jobs is None or max_jobs >= len(self._heap):
+                jobs = [job for _, _, job in sorted(self._heap)]
+                self._heap.clear()
+                for objective in self._num_jobs:
+                    self._num_jobs[objective] = 0
+                return jobs
+
+            return [self._pop_locked() for _ in range(max_jobs)]
 
-        # Always latency pending list is firstly checked!
-        if job.objective == 'latency':
-            self._pending_list_latency.append(job)
-        elif job.objective == 'throughput':
-            self._pending_list_throughput.append(job)
-
-    def pop(self, job_obj) -> Job:
-        if len(self) is 0:
-            raise IndexError(f'{self} is empty')
-        if job_obj == 'latency':
-            return self._pending_list_latency.pop()
-        elif job_obj == 'throughput':
-            return self._pending_list_throughput.pop()
+    def push_back(self, jobs: Iterable[Job]) -> None:
+        """ Return the drained but not placed jobs. They keep their original priority """
+        with self._lock:
+            for job in jobs:
+                heapq.heappush(self._heap, (self.priority_of(job), next(self._seq), job))
+                self._num_jobs[job.objective] += 1
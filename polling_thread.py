@@ -1,14 +1,13 @@
 # coding: UTF-8
 
 import logging
-from threading import Thread
+from collections import deque
+from threading import Event, Thread
+from typing import ClassVar, Deque, List, Optional, Tuple
 
-import pika
-from pika import BasicProperties
-from pika.adapters.blocking_connection import BlockingChannel
-from pika.spec import Basic
-
-from libs.jobs import Job
+from libs.broker import BatchConsumer, Broker, BrokerChannel, rabbitmq_broker
+from libs.wal import WriteAheadLog, job_submitted
+from libs.wire import parse_job_message
 from pending_job_queue import PendingJobQueue
 from libs.utils.machine_type import MachineChecker, NodeType
 
@@ -24,49 +23,140 @@ class Singleton(type):
 
 # Polling new job
 class PollingThread(Thread, metaclass=Singleton):
-    def __init__(self, metric_buf_size: int, pending_job_queue: PendingJobQueue) -> None:
+    _BACKPRESSURE_CHECK_INTERVAL: ClassVar[float] = 0.1     # seconds
+
+    def __init__(self, metric_buf_size: int, pending_job_queue: PendingJobQueue,
+                 wakeup: Optional[Event] = None, backpressure_watermarks: Tuple[int, int] = (1000, 500),
+                 prefetch_count: int = 100, wal: Optional[WriteAheadLog] = None,
+                 broker: Optional[Broker] = None, delivery_batch: Tuple[int, float] = (64, 0.005)) -> None:
         super().__init__(daemon=True)
         self._metric_buf_size = metric_buf_size
         self._node_type = MachineChecker.get_node_type()
 
-        self._rmq_host = 'localhost'
+        self._broker: Broker = rabbitmq_broker('localhost') if broker is None else broker
         self._rmq_job_submission_queue = 'job_submission'
 
         self._pending_jobs = pending_job_queue
-
-    def _cbk_job_submission(self, ch: BlockingChannel, method: Basic.Deliver, _: BasicProperties, body: bytes) -> None:
-        ch.basic_ack(method.delivery_tag)
-
-        arr = body.decode().strip().split(',')
-
-        logger = logging.getLogger('monitoring.job_submission')
-        logger.debug(f'{arr} is received from job_submission queue')
-
-        if len(arr) != 4:
-            return
-
-        job_name, job_type, job_preferences, job_objective = arr
-
-        job = Job(job_name, job_type, job_preferences, job_objective)
-        if job_type == 'bg':
-            logger.info(f'{job_name} is background job')
+        self._wakeup = wakeup   # set whenever a new job arrives to wake the scheduler up
+
+        # Backpressure: while too many jobs are pending, submissions are not acknowledged.
+        # The broker stops delivering once `prefetch_count` submissions are unacknowledged,
+        # so the rest of them stay in the job_submission queue until the pending jobs drop to the low watermark.
+        self._high_watermark, self._low_watermark = backpressure_watermarks
+        self._prefetch_count = prefetch_count
+        self._backpressured: bool = False
+        self._last_unacked_tag: Optional[int] = None
+        self._num_unacked: int = 0
+        self._channel: Optional[BrokerChannel] = None
+        # submissions are handed over in batches of up to `max_batch` messages or after `max_delay` seconds
+        self._max_batch, self._max_delay = delivery_batch
+        BatchConsumer.check_batch_size(prefetch_count, self._max_batch)
+
+        # With the write-ahead log, a submission is acknowledged only after its job is on the disk,
+        # so the submissions which are not logged yet are redelivered after a crash
+        self._wal = wal
+        self._unsynced_acks: Deque[Tuple[int, int]] = deque()     # (seq of the log record, delivery tag)
+
+    @property
+    def backpressured(self) -> bool:
+        return self._backpressured
+
+    @property
+    def num_unacked(self) -> int:
+        return self._num_unacked
+
+    def _ack_or_defer(self, ch: BrokerChannel, delivery_tag: int, num_messages: int) -> None:
+        """ Acknowledge the submissions up to `delivery_tag` at once, or defer it under backpressure """
+        if not self._backpressured and self._pending_jobs.num_waiting >= self._high_watermark:
+            logger = logging.getLogger('monitoring.job_submission')
+            logger.warning(f'{self._pending_jobs.num_waiting} jobs are pending. apply backpressure to job submissions')
+            self._backpressured = True
+
+        if self._backpressured:
+            self._last_unacked_tag = delivery_tag
+            self._num_unacked += num_messages
+        elif self._wal is not None:
+            self._unsynced_acks.append((self._wal.last_seq, delivery_tag))
         else:
-            logger.info(f'{job_name} is foreground job')
-
-        self._pending_jobs.add(job)
+            ch.basic_ack(delivery_tag, multiple=True)
+
+    def _check_backpressure(self) -> None:
+        if self._backpressured and self._pending_jobs.num_waiting <= self._low_watermark:
+            logger = logging.getLogger('monitoring.job_submission')
+            logger.info(f'{self._pending_jobs.num_waiting} jobs are pending. release backpressure '
+                        f'({self._num_unacked} deferred acks)')
+            if self._last_unacked_tag is None:
+                pass
+            elif self._wal is not None:
+                self._unsynced_acks.append((self._wal.last_seq, self._last_unacked_tag))
+            else:
+                self._channel.basic_ack(self._last_unacked_tag, multiple=True)
+            self._backpressured = False
+            self._last_unacked_tag = None
+            self._num_unacked = 0
+
+        self._channel.add_timeout(self._BACKPRESSURE_CHECK_INTERVAL, self._check_backpressure)
+
+    def _ack_synced_submissions(self) -> None:
+        synced_seq = self._wal.synced_seq
+        unsynced_acks = self._unsynced_acks
+        last_tag: Optional[int] = None
+        while unsynced_acks and unsynced_acks[0][0] <= synced_seq:
+            _, last_tag = unsynced_acks.popleft()
+        if last_tag is not None:
+            self._channel.basic_ack(last_tag, multiple=True)
+
+        self._channel.add_timeout(self._wal.sync_interval, self._ack_synced_submissions)
+
+    def _cbk_job_submissions(self, ch: BrokerChannel, last_delivery_tag: int, bodies: List[bytes]) -> None:
+        num_jobs = 0
+        try:
+            for body in bodies:
+                num_jobs += self._handle_job_submission(body)
+        finally:
+            self._ack_or_defer(ch, last_delivery_tag, len(bodies))
+            if num_jobs > 0 and self._wakeup is not None:
+                self._wakeup.set()
+
+    def _handle_job_submission(self, body: bytes) -> int:
+        """ :return: the number of the submitted jobs in `body` """
+        logger = logging.getLogger('monitoring.job_submission')
+        try:
+            # old submitters send a CSV message per job, new ones send binary frames of jobs
+            jobs = parse_job_message(body)
+        except ValueError as e:
+            logger.warning(f'a malformed message is received from job_submission queue: {e}')
+            return 0
+
+        for job in jobs:
+            logger.debug(f'{job} is received from job_submission queue')
+            if job.type == 'bg':
+                logger.info(f'{job.name} is background job')
+            else:
+                logger.info(f'{job.name} is foreground job')
+
+            if self._wal is not None:
+                # logged before the scheduler can see the job, so that its transitions follow this record in the log
+                self._wal.append(job_submitted(job))
+            self._pending_jobs.add(job)
+
+        return len(jobs)
 
     def run(self) -> None:
-        connection = pika.BlockingConnection(pika.ConnectionParameters(host=self._rmq_host))
-        channel = connection.channel()
+        channel = self._channel = self._broker.channel()
 
         channel.queue_declare(self._rmq_job_submission_queue)
-        channel.basic_consume(self._cbk_job_submission, self._rmq_job_submission_queue)
+        # the acks are sent here (deferred under backpressure or until the jobs are logged), not by the consumer
+        consumer = BatchConsumer(channel, self._prefetch_count, self._max_batch, self._max_delay, auto_ack=False)
+        channel.add_timeout(self._BACKPRESSURE_CHECK_INTERVAL, self._check_backpressure)
+        if self._wal is not None:
+            channel.add_timeout(self._wal.sync_interval, self._ack_synced_submissions)
+        consumer.consume(self._rmq_job_submission_queue, self._cbk_job_submissions)
 
         try:
             logger = logging.getLogger('monitoring')
-            logger.info('starting job submission queue')
+            logger.info(f'starting job submission queue ({self._broker})')
             channel.start_consuming()
 
         except KeyboardInterrupt:
             channel.close()
-            connection.close()
@@ -0,0 +1,108 @@
+# coding: UTF-8
+
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from libs.jobs import Job, JobState, JobTable  # noqa: E402
+from libs.jobs.state import ALLOWED_TRANSITIONS  # noqa: E402
+
+
+def _job_in(table: JobTable, state: JobState) -> Job:
+    """ A new job of `table` which is moved to `state` through the shortest legal path """
+    paths = {
+        JobState.PENDING: (),
+        JobState.PLACING: (JobState.PLACING,),
+        JobState.DISPATCHED: (JobState.PLACING, JobState.DISPATCHED),
+        JobState.ACKED: (JobState.PLACING, JobState.DISPATCHED, JobState.ACKED),
+        JobState.RUNNING: (JobState.PLACING, JobState.DISPATCHED, JobState.ACKED, JobState.RUNNING),
+        JobState.FINISHED: (JobState.PLACING, JobState.DISPATCHED, JobState.ACKED, JobState.FINISHED),
+        JobState.FAILED: (JobState.FAILED,),
+    }
+    job = Job('canneal', 'bg', 'cpu', 'throughput', 0.0)
+    table.add(job)
+    for state in paths[state]:
+        table.transition(job, state)
+    return job
+
+
+class TransitionTest(unittest.TestCase):
+    def test_allowed(self) -> None:
+        for cur_state, next_states in ALLOWED_TRANSITIONS.items():
+            for next_state in next_states:
+                with self.subTest(cur_state=cur_state, next_state=next_state):
+                    table = JobTable()
+                    job = _job_in(table, cur_state)
+                    table.transition(job, next_state)
+                    self.assertIs(job.state, next_state)
+                    self.assertIn(job, table.jobs_in(next_state))
+                    if not cur_state.is_retired:
+                        self.assertNotIn(job, table.jobs_in(cur_state))
+
+    def test_not_allowed(self) -> None:
+        for cur_state, next_states in ALLOWED_TRANSITIONS.items():
+            for next_state in set(JobState) - next_states:
+                with self.subTest(cur_state=cur_state, next_state=next_state):
+                    table = JobTable()
+                    job = _job_in(table, cur_state)
+                    with self.assertRaises(ValueError):
+                        table.transition(job, next_state)
+                    self.assertIs(job.state, cur_state)
+                    self.assertIn(job, table.jobs_in(cur_state))
+
+    def test_terminal(self) -> None:
+        for state in JobState:
+            with self.subTest(state=state):
+                self.assertEqual(state.is_terminal, len(ALLOWED_TRANSITIONS[state]) == 0)
+
+
+class JobTableTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.transited = list()
+        self.table = JobTable(history_size=2, on_transition=self.transited.append)
+
+    def test_arrival_order(self) -> None:
+        jobs = [_job_in(self.table, JobState.PENDING) for _ in range(3)]
+        self.table.transition(jobs[1], JobState.PLACING)
+        self.table.transition(jobs[1], JobState.PENDING)
+        self.assertEqual(self.table.jobs_in(JobState.PENDING), (jobs[0], jobs[2], jobs[1]))
+        self.assertEqual(self.table.num_jobs_in(JobState.PENDING), 3)
+        self.assertEqual(len(self.table), 3)
+
+    def test_get_and_remove(self) -> None:
+        job = _job_in(self.table, JobState.PLACING)
+        self.assertIs(self.table.get(job.job_id), job)
+        self.table.remove(job)
+        self.assertIsNone(self.table.get(job.job_id))
+        self.assertNotIn(job, self.table)
+        self.assertEqual(len(self.table), 0)
+
+    def test_retire_into_history(self) -> None:
+        job = _job_in(self.table, JobState.ACKED)
+        self.assertNotIn(job, self.table)
+        self.assertEqual(len(self.table), 0)
+        self.assertEqual(self.table.history, (job,))
+        self.assertEqual(self.table.jobs_in(JobState.ACKED), (job,))
+
+        # a retired job moves on in the history without being appended again
+        self.table.transition(job, JobState.RUNNING)
+        self.assertEqual(self.table.history, (job,))
+        self.assertEqual(self.table.num_jobs_in(JobState.ACKED), 0)
+        self.assertEqual(self.table.num_jobs_in(JobState.RUNNING), 1)
+
+    def test_history_bound(self) -> None:
+        jobs = [_job_in(self.table, JobState.FAILED) for _ in range(3)]
+        self.assertEqual(self.table.history, tuple(jobs[1:]))
+
+    def test_on_transition(self) -> None:
+        job = _job_in(self.table, JobState.DISPATCHED)
+        self.assertEqual(self.transited, [job, job])
+        with self.assertRaises(ValueError):
+            self.table.transition(job, JobState.RUNNING)
+        self.assertEqual(len(self.transited), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
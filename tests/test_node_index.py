@@ -0,0 +1,86 @@
+# coding: UTF-8
+
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from libs.node import Node  # noqa: E402
+from libs.node_index import NodeIndex  # noqa: E402
+
+
+def _node(ip_addr: str, aggr_contention: float, node_type: str = 'cpu') -> Node:
+    node = Node(ip_addr, '10010', node_type)
+    node.aggr_contention = aggr_contention
+    return node
+
+
+class NodeIndexTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.index = NodeIndex()
+        self.low = _node('10.0.0.1', 0.1)
+        self.high = _node('10.0.0.2', 0.3)
+        self.gpu = _node('10.0.0.3', 0.0, 'gpu')
+        for node in (self.low, self.high, self.gpu):
+            self.index.update(node)
+
+    def test_find_min(self) -> None:
+        self.assertEqual(len(self.index), 3)
+        self.assertIs(self.index.find_min('cpu'), self.low)
+        self.assertIs(self.index.find_min('gpu'), self.gpu)
+        self.assertIs(self.index.find_min(), self.gpu)
+        self.assertIsNone(self.index.find_min('npu'))
+
+    def test_reserve(self) -> None:
+        version = self.index.version
+        self.index.reserve(self.low, 0.5, now=0.0)
+        self.assertAlmostEqual(self.low.effective_contention, 0.6)
+        self.assertAlmostEqual(self.index.contentions[self.low], 0.6)
+        self.assertIs(self.index.find_min('cpu'), self.high)
+        # a reservation only makes the node busier, so the held jobs are not retried
+        self.assertEqual(self.index.version, version)
+
+    def test_release(self) -> None:
+        self.index.reserve(self.low, 0.5, now=0.0)
+        version = self.index.version
+        self.index.release(self.low, 0.5)
+        self.assertEqual(self.low.reserved_contention, 0.0)
+        self.assertIs(self.index.find_min('cpu'), self.low)
+        self.assertGreater(self.index.version, version)
+
+    def test_release_reconciled(self) -> None:
+        self.index.reserve(self.low, 0.5, now=0.0)
+        self.index.reconcile(self.low, settle_time=1.0, now=1.0)
+        version = self.index.version
+        self.index.release(self.low, 0.5)
+        self.assertEqual(self.low.reserved_contention, 0.0)
+        self.assertEqual(self.index.version, version)
+
+    def test_reconcile(self) -> None:
+        self.index.reserve(self.low, 0.2, now=0.0)
+        self.index.reserve(self.low, 0.3, now=2.0)
+
+        version = self.index.version
+        self.index.reconcile(self.low, settle_time=1.0, now=0.5)
+        self.assertAlmostEqual(self.low.reserved_contention, 0.5)
+        self.assertEqual(self.index.version, version)
+
+        self.index.reconcile(self.low, settle_time=1.0, now=1.5)
+        self.assertAlmostEqual(self.low.reserved_contention, 0.3)
+        self.assertAlmostEqual(self.index.contentions[self.low], 0.4)
+        self.assertGreater(self.index.version, version)
+
+    def test_update(self) -> None:
+        version = self.index.version
+        self.low.aggr_contention = 0.5
+        self.index.update(self.low)
+        self.assertIs(self.index.find_min('cpu'), self.high)
+        self.assertGreater(self.index.version, version)
+
+        self.index.discard(self.high)
+        self.assertEqual(self.index.nodes('cpu'), [self.low])
+
+
+if __name__ == '__main__':
+    unittest.main()
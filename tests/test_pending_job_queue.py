@@ -0,0 +1,96 @@
+# coding: UTF-8
+
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from libs.jobs import Job  # noqa: E402
+from pending_job_queue import PendingJobQueue  # noqa: E402
+
+
+def _job(name: str, objective: str, submit_time: float) -> Job:
+    return Job(name, 'bg', 'cpu', objective, submit_time)
+
+
+class PendingJobQueueTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.queue = PendingJobQueue(throughput_aging=5.0)
+
+    def test_latency_first(self) -> None:
+        thr = _job('thr', 'throughput', 0.0)
+        lat = _job('lat', 'latency', 1.0)
+        self.queue.add(thr)
+        self.queue.add(lat)
+        self.assertEqual((self.queue.lat_jobs, self.queue.thr_jobs), (1, 1))
+        self.assertIs(self.queue.pop(), lat)
+        self.assertIs(self.queue.pop(), thr)
+        self.assertEqual((self.queue.lat_jobs, self.queue.thr_jobs), (0, 0))
+
+    def test_aging(self) -> None:
+        # the throughput job has waited longer than the aging, so it is not overtaken by the later latency job
+        thr = _job('thr', 'throughput', 0.0)
+        early_lat = _job('early', 'latency', 4.0)
+        late_lat = _job('late', 'latency', 6.0)
+        for job in (late_lat, thr, early_lat):
+            self.queue.add(job)
+        self.assertEqual(self.queue.drain(), [early_lat, thr, late_lat])
+
+    def test_aging_parameter(self) -> None:
+        queue = PendingJobQueue(throughput_aging=0.0)
+        thr = _job('thr', 'throughput', 0.0)
+        lat = _job('lat', 'latency', 1.0)
+        queue.add(lat)
+        queue.add(thr)
+        self.assertEqual(queue.drain(), [thr, lat])
+
+    def test_fifo_on_ties(self) -> None:
+        jobs = [_job(f'lat{idx}', 'latency', 1.0) for idx in range(3)]
+        for job in jobs:
+            self.queue.add(job)
+        self.assertEqual(self.queue.drain(), jobs)
+
+    def test_unknown_objective(self) -> None:
+        job = _job('x', 'unknown', 0.0)
+        self.assertIsNone(self.queue.priority_of(job))
+        self.queue.add(job)
+        self.assertEqual(len(self.queue), 0)
+
+    def test_drain(self) -> None:
+        jobs = [_job(f'lat{idx}', 'latency', float(idx)) for idx in range(5)]
+        for job in reversed(jobs):
+            self.queue.add(job)
+        self.assertEqual(self.queue.drain(2), jobs[:2])
+        self.assertEqual(self.queue.lat_jobs, 3)
+        self.assertEqual(self.queue.drain(10), jobs[2:])
+        self.assertEqual(self.queue.drain(), [])
+        self.assertEqual(self.queue.lat_jobs, 0)
+        with self.assertRaises(IndexError):
+            self.queue.pop()
+
+    def test_push_back(self) -> None:
+        jobs = [_job('thr', 'throughput', 0.0), _job('lat', 'latency', 2.0)]
+        for job in jobs:
+            self.queue.add(job)
+        drained = self.queue.drain()
+        self.assertEqual(drained, [jobs[1], jobs[0]])
+
+        # a later job does not overtake the returned ones, which keep their original priority
+        later = _job('later', 'latency', 3.0)
+        self.queue.add(later)
+        self.queue.push_back(drained)
+        self.assertEqual((self.queue.lat_jobs, self.queue.thr_jobs), (2, 1))
+        self.assertEqual(self.queue.drain(), [jobs[1], later, jobs[0]])
+
+    def test_num_waiting(self) -> None:
+        for idx in range(3):
+            self.queue.add(_job(f'lat{idx}', 'latency', float(idx)))
+        self.queue.drain(2)
+        self.queue.num_held = 2
+        self.assertEqual(len(self.queue), 1)
+        self.assertEqual(self.queue.num_waiting, 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
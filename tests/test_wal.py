@@ -0,0 +1,115 @@
+# coding: UTF-8
+
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from libs.jobs import Job, JobState  # noqa: E402
+from libs.node import Node  # noqa: E402
+from libs.wal import SchedulerState, WriteAheadLog, job_submitted, job_transited, node_reported  # noqa: E402
+
+
+class WriteAheadLogTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        self.dir = Path(self._tmp_dir.name)
+
+        self.jobs = [Job('canneal', 'bg', 'cpu', 'throughput', 1.5, submit_id='s-1'),
+                     Job('lud', 'fg', 'gpu', 'latency', 2.5)]
+        self.node = Node('10.0.0.1', '10010', 'cpu')
+        self.node.aggr_contention = 0.25
+        self.node.num_workloads = 2
+
+    def tearDown(self) -> None:
+        self._tmp_dir.cleanup()
+
+    def _open(self, snapshot_every: int = 50000) -> WriteAheadLog:
+        return WriteAheadLog(self.dir, SchedulerState(), sync_interval=0.001, snapshot_every=snapshot_every)
+
+    def _write(self, wal: WriteAheadLog) -> int:
+        """ Log the submission of the jobs, the dispatch of the first one and the report of the node """
+        for job in self.jobs:
+            wal.append(job_submitted(job))
+        job = self.jobs[0]
+        job.dest_ip, job.dest_port = self.node.ip_addr, self.node.port
+        for state in (JobState.PLACING, JobState.DISPATCHED, JobState.ACKED):
+            job.state = state
+            wal.append(job_transited(job))
+        return wal.append(node_reported(self.node))
+
+    def _assert_recovered(self, state: SchedulerState) -> None:
+        acked, pending = state.restore_jobs()
+        self.assertEqual((acked.job_id, acked.state, acked.dest_ip, acked.submit_id),
+                         (self.jobs[0].job_id, JobState.ACKED, '10.0.0.1', 's-1'))
+        self.assertEqual((pending.job_id, pending.state, pending.name), (self.jobs[1].job_id, JobState.PENDING, 'lud'))
+        self.assertEqual(state.next_job_id, self.jobs[1].job_id + 1)
+
+        node, = state.restore_nodes()
+        self.assertEqual((node.ip_addr, node.aggr_contention, node.num_workloads), ('10.0.0.1', 0.25, 2))
+
+    def test_round_trip(self) -> None:
+        wal = self._open()
+        seq = self._write(wal)
+        self.assertTrue(wal.wait_synced(seq, timeout=5))
+        wal.close()
+
+        wal = self._open()
+        self.addCleanup(wal.close)
+        self.assertEqual((wal.last_seq, wal.num_recovered), (seq, seq))
+        self._assert_recovered(wal.state)
+        # the ids of the new jobs do not collide with the restored ones
+        self.assertGreater(Job('x', 'bg', 'cpu', 'latency').job_id, self.jobs[1].job_id)
+
+    def test_truncated_tail(self) -> None:
+        wal = self._open()
+        seq = self._write(wal)
+        wal.close()
+
+        # a record torn in the middle of its write
+        wal = self._open()
+        wal.append(job_transited(self.jobs[1]))
+        wal.close()
+        segment = sorted(self.dir.glob('wal-*.log'))[-1]
+        data = segment.read_bytes()
+        for length in range(1, len(data)):
+            with self.subTest(length=length):
+                segment.write_bytes(data[:length])
+                wal = self._open()
+                wal.close()
+                self.assertEqual((wal.last_seq, wal.num_recovered), (seq, seq))
+                self._assert_recovered(wal.state)
+
+    def test_corrupted_tail(self) -> None:
+        wal = self._open()
+        seq = self._write(wal)
+        wal.close()
+
+        segment, = self.dir.glob('wal-*.log')
+        data = bytearray(segment.read_bytes())
+        data[-2] ^= 0xFF
+        segment.write_bytes(bytes(data))
+        wal = self._open()
+        self.addCleanup(wal.close)
+        self.assertEqual(wal.last_seq, seq - 1)
+
+        # the new records are appended after the last valid one
+        self.assertEqual(wal.append(node_reported(self.node)), seq)
+
+    def test_snapshot(self) -> None:
+        wal = self._open(snapshot_every=3)
+        seq = self._write(wal)
+        wal.close()
+        self.assertTrue(any(self.dir.glob('snapshot-*.json')))
+
+        wal = self._open()
+        self.addCleanup(wal.close)
+        self.assertEqual(wal.last_seq, seq)
+        self.assertLess(wal.num_recovered, seq)
+        self._assert_recovered(wal.state)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,137 @@
+# coding: UTF-8
+
+import json
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from libs.jobs import Job  # noqa: E402
+from libs.metric_container.basic_metric import BasicMetric  # noqa: E402
+from libs.wire import TrackingReport, WireFormatError, decode_jobs, decode_metrics, decode_tracking, encode_jobs, \
+    encode_metrics, encode_tracking, parse_job_message, parse_metric_message, parse_tracking_message  # noqa: E402
+from libs.wire.frame import HEADER, MAGIC, VERSION, MessageType  # noqa: E402
+from libs.wire.messages import _RECORD_LENGTH  # noqa: E402
+
+
+def _message(message_type: MessageType, *records: bytes) -> bytes:
+    """ A message of a single frame whose records are given as they are, with correct lengths """
+    payload = b''.join(_RECORD_LENGTH.pack(len(record)) + record for record in records)
+    return HEADER.pack(MAGIC, VERSION, message_type, len(records), len(payload)) + payload
+
+
+def _records_of(message: bytes):
+    """ The records of a message which `_message()` rebuilds """
+    payload = memoryview(message)[HEADER.size:]
+    records = list()
+    offset = 0
+    while offset < len(payload):
+        length, = _RECORD_LENGTH.unpack_from(payload, offset)
+        offset += _RECORD_LENGTH.size
+        records.append(bytes(payload[offset:offset + length]))
+        offset += length
+    return records
+
+
+class JobMessageTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.jobs = [Job('canneal', 'bg', 'cpu', 'throughput', 1.5, submit_id='s-1'),
+                     Job('lud', 'fg', 'gpu', 'latency', 2.5)]
+        self.message = encode_jobs(self.jobs)
+
+    def test_round_trip(self) -> None:
+        decoded = decode_jobs(self.message)
+        self.assertEqual([(job.name, job.type, job.preferences, job.objective, job.submit_time, job.submit_id)
+                          for job in decoded],
+                         [(job.name, job.type, job.preferences, job.objective, job.submit_time, job.submit_id)
+                          for job in self.jobs])
+
+    def test_csv(self) -> None:
+        job, = parse_job_message(b'canneal,bg,cpu,throughput,s-1')
+        self.assertEqual((job.name, job.submit_id), ('canneal', 's-1'))
+        self.assertEqual(parse_job_message(b'canneal,bg'), [])
+
+    def test_truncated_message(self) -> None:
+        for length in range(len(MAGIC), len(self.message)):
+            with self.subTest(length=length), self.assertRaises(WireFormatError):
+                parse_job_message(self.message[:length])
+
+    def test_truncated_record(self) -> None:
+        record = _records_of(self.message)[0]
+        # every prefix which cuts the fixed fields, the name or the submit id
+        for length in range(len(record)):
+            if length == len(record) - len(b's-1') - 1:
+                continue    # a record without the submit id is valid
+            with self.subTest(length=length), self.assertRaises(WireFormatError):
+                decode_jobs(_message(MessageType.JOB, record[:length]))
+
+    def test_unknown_code(self) -> None:
+        record = bytearray(_records_of(self.message)[0])
+        record[8] = 0xFF    # job type
+        with self.assertRaises(WireFormatError):
+            decode_jobs(_message(MessageType.JOB, bytes(record)))
+
+    def test_other_message_type(self) -> None:
+        with self.assertRaises(WireFormatError):
+            decode_jobs(encode_metrics([]))
+
+
+class TrackingMessageTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.reports = [TrackingReport('10.0.0.1', 0.25, 3, 1, 2, 'cpu'),
+                        TrackingReport('10.0.0.2', 0.0, 0, 0, 0, 'gpu')]
+        self.message = encode_tracking(self.reports)
+
+    def test_round_trip(self) -> None:
+        self.assertEqual(decode_tracking(self.message), self.reports)
+
+    def test_csv(self) -> None:
+        self.assertEqual(parse_tracking_message(b'10.0.0.1,0.25,3,1,2,cpu'), self.reports[:1])
+        self.assertEqual(parse_tracking_message(b'10.0.0.1,0.25'), [])
+
+    def test_truncated_message(self) -> None:
+        for length in range(len(MAGIC), len(self.message)):
+            with self.subTest(length=length), self.assertRaises(WireFormatError):
+                parse_tracking_message(self.message[:length])
+
+    def test_truncated_record(self) -> None:
+        record = _records_of(self.message)[0]
+        for length in range(len(record)):
+            with self.subTest(length=length), self.assertRaises(WireFormatError):
+                decode_tracking(_message(MessageType.TRACKING, record[:length]))
+
+
+class MetricMessageTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.metrics = [BasicMetric(1, 2, 3, 4, 0.5, 0.5, 0.5, 0.5, 100), BasicMetric(5, 6, 7, 8, 0, 0, 0, 0, 200)]
+        self.message = encode_metrics(self.metrics)
+        self.json_metric = {'llc_references': 1, 'llc_misses': 2, 'instructions': 3, 'cycles': 4,
+                            'gpu_core_util': 0.5, 'gpu_core_freq': 0.5, 'gpu_emc_util': 0.5, 'gpu_emc_freq': 0.5}
+
+    def test_round_trip(self) -> None:
+        self.assertEqual([metric.as_tuple() for metric in decode_metrics(self.message)],
+                         [metric.as_tuple() for metric in self.metrics])
+
+    def test_json(self) -> None:
+        metric, = parse_metric_message(json.dumps(self.json_metric).encode(), 100)
+        self.assertEqual(metric.as_tuple(), self.metrics[0].as_tuple())
+
+    def test_truncated_message(self) -> None:
+        for length in range(len(MAGIC), len(self.message)):
+            with self.subTest(length=length), self.assertRaises(WireFormatError):
+                parse_metric_message(self.message[:length])
+
+    def test_incomplete_json(self) -> None:
+        del self.json_metric['cycles']
+        for body in (json.dumps(self.json_metric), '[1, 2, 3]', '42', 'null'):
+            with self.subTest(body=body), self.assertRaises(WireFormatError):
+                parse_metric_message(body.encode())
+
+    def test_malformed_json(self) -> None:
+        with self.assertRaises(ValueError):
+            parse_metric_message(b'{"llc_references": ')
+
+
+if __name__ == '__main__':
+    unittest.main()